@@ -0,0 +1,97 @@
+"""
+Helpers shared by the benchmark scripts.
+
+The ``example/project`` directory ships cameras, shots and the orthophoto, but not the 2.5D model. We therefore
+build a synthetic height field over the orthophoto extent, so the benchmarks can run on the real shot poses.
+"""
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from odm_report_shot_coverage.models.reconstruction import Reconstruction, _parse_camera_shotgeojson, \
+    _parse_point_cloud_boundaries, _native_to_model_25d_coordinates  # noqa: E402
+from odm_report_shot_coverage.models.shot import Shot, ShotTable  # noqa: E402
+from odm_report_shot_coverage.models.wavefront_25d import Wavefront25D  # noqa: E402
+from odm_report_shot_coverage.scripts.synthetic_project import synthetic_height_field, write_obj  # noqa: E402
+
+EXAMPLE_PROJECT = os.path.join(os.path.dirname(__file__), '..', 'example', 'project')
+
+
+def synthetic_wavefront(x_range: (float, float), y_range: (float, float), z_range: (float, float),
+                        nb_vertices: int, seed: int = 42) -> Wavefront25D:
+    """A wavy height field of about nb_vertices vertices on a regular grid, two facets per grid cell"""
+    wf = Wavefront25D()
+    (wf.points, wf.facets) = synthetic_height_field(x_range, y_range, z_range, nb_vertices, seed)
+    wf._compute_boundaries()
+    wf._compute_paving()
+    return wf
+
+
+def synthetic_survey(nb_shots: int, nb_vertices: int, altitude: float = 10, overlap: float = 0.7,
+                     seed: int = 42) -> Reconstruction:
+    """
+    A nadir lawnmower survey over a synthetic mesh, sized so that consecutive shots overlap by about the given ratio.
+    Cameras are taken from the example project.
+    """
+    reconstruction = Reconstruction()
+    _parse_camera_shotgeojson(EXAMPLE_PROJECT, reconstruction, (lambda x: x, lambda y: y, lambda z: z))
+    camera = reconstruction.shots[0].camera
+    footprint = 2 * altitude * min(camera._width_rel_max, camera._height_rel_max) / camera.focal
+    step = footprint * (1 - overlap)
+    nb_x = max(1, int(np.ceil(np.sqrt(nb_shots))))
+    nb_y = max(1, int(np.ceil(nb_shots / nb_x)))
+
+    shots = reconstruction.shots[:1] * nb_shots
+    reconstruction.shot_table = ShotTable()
+    for i, template in enumerate(shots):
+        shot = Shot()
+        shot.image_name = 'SYNTH%05d.jpeg' % i
+        shot.camera = template.camera
+        shot.rotation = (np.pi, 0, 0)
+        shot.translation = ((i % nb_x) * step, (i // nb_x) * step, altitude)
+        reconstruction.add_shot(shot)
+
+    wf = synthetic_wavefront((-footprint, nb_x * step + footprint), (-footprint, nb_y * step + footprint),
+                             (-1, 1), nb_vertices, seed)
+    reconstruction.mesh = wf
+    reconstruction.orthophoto_boundaries = wf.boundaries
+    return reconstruction
+
+
+def example_reconstruction(nb_vertices: int) -> Reconstruction:
+    """The example project shots and cameras, over a synthetic mesh of nb_vertices"""
+    native = _parse_point_cloud_boundaries(EXAMPLE_PROJECT)
+    wf = synthetic_wavefront((native.x_min, native.x_max), (native.y_min, native.y_max),
+                             (native.z_min, native.z_max), nb_vertices)
+    reconstruction = Reconstruction()
+    reconstruction.mesh = wf
+    reconstruction.orthophoto_boundaries = wf.boundaries
+    _parse_camera_shotgeojson(EXAMPLE_PROJECT, reconstruction, _native_to_model_25d_coordinates(native, wf.boundaries))
+    return reconstruction
+
+
+def write_wavefront_obj(wf: Wavefront25D, filename: str):
+    """The vertices and facets of a 2.5d model, as a wavefront .obj file"""
+    write_obj(wf.points, wf.facets, filename)
+
+
+def example_project_copy(target_dir: str, nb_vertices: int):
+    """A copy of the example project, with a synthetic 2.5d model of nb_vertices and without any previous report"""
+    shutil.copytree(EXAMPLE_PROJECT, target_dir, ignore=shutil.ignore_patterns('shot_coverage'))
+    native = _parse_point_cloud_boundaries(EXAMPLE_PROJECT)
+    wf = synthetic_wavefront((native.x_min, native.x_max), (native.y_min, native.y_max),
+                             (native.z_min, native.z_max), nb_vertices)
+    os.makedirs(os.path.join(target_dir, 'odm_texturing_25d'))
+    write_wavefront_obj(wf, os.path.join(target_dir, 'odm_texturing_25d', 'odm_textured_model_geo.obj'))
+
+
+def timed(fn, *args, **kwargs) -> (float, object):
+    """Returns the elapsed seconds and the function result"""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
@@ -0,0 +1,48 @@
+"""
+Processes copies of the example project, with a synthetic 2.5d model, either through one report process per project,
+or all of them in one batch process sharing its worker pool, and reports the throughput in projects per hour.
+
+    python benchmarks/bench_batch.py [--projects 4] [--vertices 200000] [--workers 2]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+from _example import example_project_copy, timed
+
+SRC_DIR = os.path.join(os.path.dirname(__file__), '..', 'src')
+
+
+def _run(args: 'list[str]'):
+    subprocess.run([sys.executable, '-c', 'from odm_report_shot_coverage.scripts.cli import main; main()'] + args,
+                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                   env=dict(os.environ, PYTHONPATH=os.path.abspath(SRC_DIR)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the batch mode')
+    parser.add_argument('--projects', type=int, default=4, help='number of projects')
+    parser.add_argument('--vertices', type=int, default=200000, help='2.5d model vertices per project')
+    parser.add_argument('--workers', type=int, default=2, help='shot boundary worker processes')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        projects = [os.path.join(tmp_dir, 'flight-%02d' % i) for i in range(args.projects)]
+        for project in projects:
+            example_project_copy(project, args.vertices)
+        options = ['--workers', str(args.workers), '--no-cache']
+
+        separate_elapsed, _ = timed(lambda: [_run([p] + options) for p in projects])
+        batch_elapsed, _ = timed(_run, ['batch'] + projects + options + ['--output', tmp_dir])
+
+    print('%d projects x %d vertices, %d workers' % (args.projects, args.vertices, args.workers))
+    print('  one process per project  %6.1f s  %7.1f projects/hour' % (
+        separate_elapsed, 3600 * args.projects / separate_elapsed))
+    print('  batch                    %6.1f s  %7.1f projects/hour' % (
+        batch_elapsed, 3600 * args.projects / batch_elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Measures the shot boundary builders over the in frame points of one shot: the former per point star polygon loop,
+the vectorized star polygon, and the exact convex hull, and checks that both star polygons are the same.
+
+    python benchmarks/bench_boundaries.py [--points 100000,1000000,3000000]
+"""
+import argparse
+
+import numpy as np
+
+from _example import timed
+from odm_report_shot_coverage.models.shot import shot_boundaries_from_points, shot_convex_hull_from_points
+
+
+def _legacy_star(points: 'list[(float, float)]', nb_path_points: int = 24) -> 'list[(float, float)]':
+    """The star polygon, as it was"""
+    midpoint = (sum([p[0] for p in points]) / len(points), sum([p[1] for p in points]) / len(points))
+    dist_slices = [0 for i in range(nb_path_points)]
+    furthest_slices = [midpoint for i in range(nb_path_points)]
+
+    def slice_index_dist(p: (float, float)):
+        vx = p[0] - midpoint[0]
+        vy = p[1] - midpoint[1]
+        if vx == 0:
+            alpha = np.pi / 2 if vy >= 0 else - np.pi / 2
+        else:
+            alpha = np.arctan(vy / vx)
+        i_slice = int(nb_path_points / 2 * (alpha / np.pi + 0.5))
+        if vx < 0:
+            i_slice += int(nb_path_points / 2)
+        return i_slice, vx * vx + vy * vy
+
+    for p in points:
+        (i, d) = slice_index_dist(p)
+        if d > dist_slices[i]:
+            furthest_slices[i] = p
+            dist_slices[i] = d
+    return [(p[0], p[1]) for p in furthest_slices]
+
+
+def _frame_points(nb_points: int, seed: int = 42) -> np.ndarray:
+    """a noisy, slightly rotated rectangle of ground points, as seen by a nadir shot"""
+    rng = np.random.default_rng(seed)
+    points = rng.uniform((-20, -15, -1), (20, 15, 1), (nb_points, 3))
+    rotation = np.array([[np.cos(0.3), -np.sin(0.3), 0], [np.sin(0.3), np.cos(0.3), 0], [0, 0, 1]])
+    return points @ rotation.T
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the shot boundary builders')
+    parser.add_argument('--points', type=str, default='100000,1000000,3000000',
+                        help='comma separated numbers of in frame points')
+    args = parser.parse_args()
+
+    for nb_points in [int(p) for p in args.points.split(',')]:
+        points = _frame_points(nb_points)
+        legacy_elapsed, legacy = timed(_legacy_star, points.tolist())
+        star_elapsed, star = timed(shot_boundaries_from_points, points)
+        hull_elapsed, hull = timed(shot_convex_hull_from_points, points)
+        assert legacy == star.path, 'vectorized star polygon differs from the legacy one'
+
+        print('%d points' % nb_points)
+        print('  legacy star   %7.3f s' % legacy_elapsed)
+        print('  star          %7.3f s  speedup %6.1fx' % (star_elapsed, legacy_elapsed / star_elapsed))
+        print('  convex hull   %7.3f s  speedup %6.1fx  (%d vertices)' % (
+            hull_elapsed, legacy_elapsed / hull_elapsed, len(hull.path)))
+
+
+if __name__ == '__main__':
+    main()
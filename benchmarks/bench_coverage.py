@@ -0,0 +1,47 @@
+"""
+Measures the coverage raster accumulation: shots per second, and the peak memory next to the raster size, which should
+not grow with the number of shots.
+
+    python benchmarks/bench_coverage.py [--shots 100,1000] [--raster 2000,8000]
+"""
+import argparse
+import tracemalloc
+
+import numpy as np
+
+from _example import timed
+from odm_report_shot_coverage.models.coverage import coverage_raster_from_shots
+from odm_report_shot_coverage.models.shot import Boundaries, ShotBoundaries
+
+
+def _shot_boundaries(nb_shots: int, extent: float, seed: int = 42):
+    """nb_shots 24 points star polygons, about a tenth of the extent wide, scattered over the extent"""
+    rng = np.random.default_rng(seed)
+    angles = np.linspace(0, 2 * np.pi, 24, endpoint=False)
+    for _ in range(nb_shots):
+        center = rng.uniform(0, extent, 2)
+        radii = extent / 20 * rng.uniform(0.8, 1.2, len(angles))
+        yield ShotBoundaries(list(zip(center[0] + radii * np.cos(angles), center[1] + radii * np.sin(angles))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the coverage raster')
+    parser.add_argument('--shots', type=str, default='100,1000', help='comma separated numbers of shots')
+    parser.add_argument('--raster', type=str, default='2000,8000', help='comma separated raster sides, in cells')
+    args = parser.parse_args()
+
+    extent = 100.0
+    boundaries = Boundaries(x_min=0, x_max=extent, y_min=0, y_max=extent)
+    for side in [int(r) for r in args.raster.split(',')]:
+        for nb_shots in [int(s) for s in args.shots.split(',')]:
+            elapsed, _ = timed(coverage_raster_from_shots, _shot_boundaries(nb_shots, extent), boundaries, side, side)
+            tracemalloc.start()
+            coverage_raster_from_shots(_shot_boundaries(nb_shots, extent), boundaries, side, side)
+            (_, peak) = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print('%5d x %5d raster (%4.0f MB), %5d shots: %6.2f s  %7.1f shots/s  peak memory %5.0f MB' % (
+                side, side, side * side * 2 / 1e6, nb_shots, elapsed, nb_shots / elapsed, peak / 1e6))
+
+
+if __name__ == '__main__':
+    main()
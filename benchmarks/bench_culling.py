@@ -0,0 +1,59 @@
+"""
+Measures the speedup of culling mesh vertices through the paving index, versus projecting all of them, and checks
+that both give the same shot boundaries.
+
+    python benchmarks/bench_culling.py [--shots 100] [--vertices 100000,500000,2000000]
+"""
+import argparse
+
+import numpy as np
+
+from _example import example_reconstruction, synthetic_survey, timed
+from odm_report_shot_coverage.models.wavefront_25d import paving_points_from_ranges
+
+
+def _in_frame_indices(reconstruction, cull_vertices: bool) -> 'list[np.ndarray]':
+    """The projection part only: per shot, the indices of the vertices within the frame"""
+    mesh = reconstruction.mesh
+    in_frame = []
+    for shot in reconstruction.shots:
+        ranges = reconstruction._shot_paving_ranges(reconstruction.mesh, shot) if cull_vertices else None
+        if ranges is None:
+            candidates = np.arange(len(mesh.points))
+        else:
+            candidates = paving_points_from_ranges(mesh.paving_point_order, ranges)
+        in_frame.append(candidates[shot.camera.in_frame_mask(shot.camera_pixels(mesh.points[candidates]))])
+    return in_frame
+
+
+def bench(title: str, reconstruction):
+    brute_projection_elapsed, brute_in_frame = timed(_in_frame_indices, reconstruction, False)
+    culled_projection_elapsed, culled_in_frame = timed(_in_frame_indices, reconstruction, True)
+    assert all(np.array_equal(b, c) for b, c in zip(brute_in_frame, culled_in_frame)), 'in frame vertices differ'
+
+    brute_elapsed, _ = timed(reconstruction.compute_shot_boundaries, cull_vertices=False)
+    brute = [s.boundaries.path for s in reconstruction.shots]
+    culled_elapsed, _ = timed(reconstruction.compute_shot_boundaries, cull_vertices=True)
+    culled = [s.boundaries.path for s in reconstruction.shots]
+    assert brute == culled, 'culled boundaries differ from the brute force ones'
+
+    print('%s: %d shots x %d vertices' % (title, len(reconstruction.shots), len(reconstruction.mesh.points)))
+    print('  projection  brute %7.2f s  culled %7.2f s  speedup %5.1fx' % (
+        brute_projection_elapsed, culled_projection_elapsed, brute_projection_elapsed / culled_projection_elapsed))
+    print('  boundaries  brute %7.2f s  culled %7.2f s  speedup %5.1fx' % (
+        brute_elapsed, culled_elapsed, brute_elapsed / culled_elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the mesh vertex culling')
+    parser.add_argument('--shots', type=int, default=100, help='number of shots of the synthetic survey')
+    parser.add_argument('--vertices', type=str, default='100000,500000,2000000', help='comma separated mesh sizes')
+    args = parser.parse_args()
+
+    for nb_vertices in [int(v) for v in args.vertices.split(',')]:
+        bench('example/project', example_reconstruction(nb_vertices))
+        bench('synthetic survey', synthetic_survey(args.shots, nb_vertices))
+
+
+if __name__ == '__main__':
+    main()
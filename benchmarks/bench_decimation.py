@@ -0,0 +1,52 @@
+"""
+Trades the shot boundaries accuracy for speed by decimating the 2.5d model (--sample-spacing), on the example/project
+shots: time and speedup against the full resolution mesh, and the boundaries error, as the intersection over union
+with the full resolution boundaries and the relative area difference.
+
+    python benchmarks/bench_decimation.py [--vertices 1000000] [--spacings 0.05,0.1,0.2,0.5,1] [--grid 400]
+"""
+import argparse
+
+import numpy as np
+
+from _example import example_reconstruction, timed
+from bench_frustum import intersection_over_union
+
+
+def _area(path: 'list[(float, float)]') -> float:
+    if len(path) < 3:
+        return 0
+    (x, y) = np.asarray(path).T
+    return abs(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1))) / 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the mesh decimation')
+    parser.add_argument('--vertices', type=int, default=1000000, help='vertices of the synthetic mesh')
+    parser.add_argument('--spacings', type=str, default='0.05,0.1,0.2,0.5,1', help='comma separated grid spacings')
+    parser.add_argument('--boundary-mode', type=str, default='star', help='star or hull')
+    parser.add_argument('--grid', type=int, default=400, help='IoU rasterization grid side')
+    args = parser.parse_args()
+
+    reconstruction = example_reconstruction(args.vertices)
+    nb_shots = len(reconstruction.shots)
+    full_elapsed, _ = timed(reconstruction.compute_shot_boundaries, boundary_mode=args.boundary_mode)
+    full = [s.boundaries.path for s in reconstruction.shots]
+    print('example/project: %d shots x %d vertices, %.1f ms/shot' % (nb_shots, len(reconstruction.mesh.points),
+                                                                     1000 * full_elapsed / nb_shots))
+    print('  spacing  vertices  decimation  ms/shot  speedup  IoU mean    min  area error mean    max')
+    for spacing in [float(s) for s in args.spacings.split(',')]:
+        decimation_elapsed, mesh = timed(reconstruction.sampled_mesh, spacing)
+        elapsed, _ = timed(reconstruction.compute_shot_boundaries, boundary_mode=args.boundary_mode,
+                           sample_spacing=spacing)
+        sampled = [s.boundaries.path for s in reconstruction.shots]
+        ious = np.array([intersection_over_union(a, b, args.grid) for a, b in zip(sampled, full)])
+        ious = ious[~np.isnan(ious)]
+        area_errors = np.array([abs(_area(a) / _area(b) - 1) for a, b in zip(sampled, full) if _area(b) > 0])
+        print('  %7.2f  %8d  %8.2f s  %7.1f  %6.1fx  %8.3f  %5.3f  %14.1f%%  %5.1f%%' % (
+            spacing, len(mesh.points), decimation_elapsed, 1000 * elapsed / nb_shots, full_elapsed / elapsed,
+            ious.mean(), ious.min(), 100 * area_errors.mean(), 100 * area_errors.max()))
+
+
+if __name__ == '__main__':
+    main()
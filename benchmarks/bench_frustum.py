@@ -0,0 +1,60 @@
+"""
+Compares the frustum footprint with the vertex projection boundaries (star polygon and convex hull) on the
+example/project shots: time per shot, and the intersection over union of the footprints, rasterized on a common grid.
+
+    python benchmarks/bench_frustum.py [--vertices 100000,1000000] [--grid 400]
+"""
+import argparse
+
+import numpy as np
+
+from _example import example_reconstruction, timed
+from odm_report_shot_coverage.models.coverage import polygon_mask
+
+
+def _boundaries(reconstruction, **kwargs) -> (float, 'list[list[(float, float)]]'):
+    elapsed, _ = timed(reconstruction.compute_shot_boundaries, **kwargs)
+    return elapsed, [s.boundaries.path for s in reconstruction.shots]
+
+
+def intersection_over_union(path_a: 'list[(float, float)]', path_b: 'list[(float, float)]', grid: int) -> float:
+    if len(path_a) < 3 or len(path_b) < 3:
+        return np.nan
+    vertices = np.concatenate([path_a, path_b])
+    (x_min, y_min) = vertices.min(axis=0)
+    (x_max, y_max) = vertices.max(axis=0)
+    x_centers = x_min + (np.arange(grid) + 0.5) * (x_max - x_min) / grid
+    y_centers = y_min + (np.arange(grid) + 0.5) * (y_max - y_min) / grid
+    mask_a = polygon_mask(path_a, x_centers, y_centers)
+    mask_b = polygon_mask(path_b, x_centers, y_centers)
+    return (mask_a & mask_b).sum() / max(1, (mask_a | mask_b).sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the frustum footprint')
+    parser.add_argument('--vertices', type=str, default='100000,1000000', help='comma separated mesh sizes')
+    parser.add_argument('--grid', type=int, default=400, help='IoU rasterization grid side')
+    args = parser.parse_args()
+
+    for nb_vertices in [int(v) for v in args.vertices.split(',')]:
+        reconstruction = example_reconstruction(nb_vertices)
+        nb_shots = len(reconstruction.shots)
+        star_elapsed, star = _boundaries(reconstruction, boundary_mode='star')
+        hull_elapsed, hull = _boundaries(reconstruction, boundary_mode='hull')
+        (height_field_elapsed, _) = timed(reconstruction.mesh.height_field)
+        frustum_elapsed, frustum = _boundaries(reconstruction, footprint='frustum')
+
+        print('example/project: %d shots x %d vertices' % (nb_shots, len(reconstruction.mesh.points)))
+        print('  vertices, star   %7.1f ms/shot' % (1000 * star_elapsed / nb_shots))
+        print('  vertices, hull   %7.1f ms/shot' % (1000 * hull_elapsed / nb_shots))
+        print('  frustum          %7.1f ms/shot  (height field %.2f s, once)' % (
+            1000 * (frustum_elapsed - height_field_elapsed) / nb_shots, height_field_elapsed))
+        for (name, reference) in [('hull', hull), ('star', star)]:
+            ious = np.array([intersection_over_union(f, r, args.grid) for f, r in zip(frustum, reference)])
+            ious = ious[~np.isnan(ious)]
+            print('  frustum vs %s IoU: mean %.3f  median %.3f  min %.3f  (%d shots)' % (
+                name, ious.mean(), np.median(ious), ious.min(), len(ious)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Peak memory of the shot boundaries (--memory-budget) on a copy of example/project over a synthetic 2.5d model: each
+budget runs in a fresh process, parsing the model from its binary cache (memory-mapped, as the report does), and
+reports its peak RSS, time per shot and the largest difference of the boundaries with the unbudgeted ones.
+
+    python benchmarks/bench_memory_budget.py [--vertices 2000000] [--budgets 400,300,250]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+from _example import example_project_copy, timed
+from odm_report_shot_coverage.models.reconstruction import parse_reconstruction
+from odm_report_shot_coverage.scripts.timings import peak_rss_mb
+
+
+def _setup(project_dir: str, cache_dir: str, nb_vertices: int):
+    """in a child process, as the peak RSS of a process is inherited by the processes it starts"""
+    example_project_copy(project_dir, nb_vertices)
+    parse_reconstruction(project_dir, cache_dir=cache_dir)
+
+
+def _run(project_dir: str, cache_dir: str, memory_budget: float, boundaries_file: str):
+    """in the child process: compute the boundaries and print the peak RSS and elapsed time"""
+    reconstruction = parse_reconstruction(project_dir, cache_dir=cache_dir, compact=memory_budget is not None)
+    (before, _) = peak_rss_mb()
+    (elapsed, _) = timed(reconstruction.compute_shot_boundaries, memory_budget=memory_budget)
+    np.save(boundaries_file, np.array([s.boundaries.path for s in reconstruction.shots]))
+    print(json.dumps({'parsedRssMB': before, 'peakRssMB': peak_rss_mb()[0], 'elapsed': elapsed,
+                      'shots': len(reconstruction.shots), 'vertices': len(reconstruction.mesh.points)}))
+
+
+def _child(project_dir: str, cache_dir: str, memory_budget: float, boundaries_file: str) -> dict:
+    command = [sys.executable, __file__, '--child', project_dir, cache_dir, boundaries_file]
+    if memory_budget is not None:
+        command += ['--budget', str(memory_budget)]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the shot boundaries peak memory')
+    parser.add_argument('--vertices', type=int, default=2000000, help='vertices of the synthetic mesh')
+    parser.add_argument('--budgets', type=str, default='400,300,250', help='comma separated memory budgets, in MB')
+    parser.add_argument('--setup', nargs=2, help=argparse.SUPPRESS)
+    parser.add_argument('--child', nargs=3, help=argparse.SUPPRESS)
+    parser.add_argument('--budget', type=float, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.setup is not None:
+        _setup(*args.setup, args.vertices)
+        return
+    if args.child is not None:
+        _run(*args.child[:2], args.budget, args.child[2])
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        project_dir = os.path.join(tmp_dir, 'project')
+        cache_dir = os.path.join(tmp_dir, 'cache')
+        subprocess.run([sys.executable, __file__, '--setup', project_dir, cache_dir, '--vertices', str(args.vertices)],
+                       check=True, capture_output=True)
+
+        full_file = os.path.join(tmp_dir, 'full.npy')
+        full = _child(project_dir, cache_dir, None, full_file)
+        print('example/project: %d shots x %d vertices' % (full['shots'], full['vertices']))
+        print('  budget  parsed RSS  peak RSS  ms/shot  max boundaries difference')
+        print('  %6s  %7.0f MB  %5.0f MB  %7.1f' % ('none', full['parsedRssMB'], full['peakRssMB'],
+                                                    1000 * full['elapsed'] / full['shots']))
+        for budget in [float(b) for b in args.budgets.split(',')]:
+            budget_file = os.path.join(tmp_dir, 'budget.npy')
+            got = _child(project_dir, cache_dir, budget, budget_file)
+            difference = np.max(np.abs(np.load(budget_file) - np.load(full_file)))
+            print('  %6.0f  %7.0f MB  %5.0f MB  %7.1f  %g' % (
+                budget, got['parsedRssMB'], got['peakRssMB'], 1000 * got['elapsed'] / got['shots'], difference))
+
+
+if __name__ == '__main__':
+    main()
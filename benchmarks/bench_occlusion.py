@@ -0,0 +1,34 @@
+"""
+Measures how the occlusion depth test cost scales with the depth buffer resolution and the mesh size, versus the
+boundaries computed without occlusion.
+
+    python benchmarks/bench_occlusion.py [--shots 20] [--vertices 100000,1000000] [--resolutions 256,512,1024,2048]
+"""
+import argparse
+
+from _example import synthetic_survey, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the occlusion depth buffer')
+    parser.add_argument('--shots', type=int, default=20, help='number of shots of the synthetic survey')
+    parser.add_argument('--vertices', type=str, default='100000,1000000', help='comma separated mesh sizes')
+    parser.add_argument('--resolutions', type=str, default='256,512,1024,2048',
+                        help='comma separated depth buffer sizes')
+    args = parser.parse_args()
+
+    for nb_vertices in [int(v) for v in args.vertices.split(',')]:
+        reconstruction = synthetic_survey(args.shots, nb_vertices)
+        nb_shots = len(reconstruction.shots)
+        print('synthetic survey: %d shots x %d vertices, %d facets' % (
+            nb_shots, len(reconstruction.mesh.points), len(reconstruction.mesh.facets)))
+        reference_elapsed, _ = timed(reconstruction.compute_shot_boundaries)
+        print('  no occlusion      %7.2f s  %7.1f ms/shot' % (reference_elapsed, 1000 * reference_elapsed / nb_shots))
+        for resolution in [int(r) for r in args.resolutions.split(',')]:
+            elapsed, _ = timed(reconstruction.compute_shot_boundaries, occlusion_resolution=resolution)
+            print('  occlusion %5d   %7.2f s  %7.1f ms/shot  x%.1f' % (
+                resolution, elapsed, 1000 * elapsed / nb_shots, elapsed / reference_elapsed))
+
+
+if __name__ == '__main__':
+    main()
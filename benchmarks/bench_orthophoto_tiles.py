@@ -0,0 +1,81 @@
+"""
+Measures the orthophoto stage: the former full decoding into one PNG, versus the windowed tile pyramid.
+Each variant runs in a forked process, so that its peak resident memory can be reported.
+
+    python benchmarks/bench_orthophoto_tiles.py [--megapixels 25,100] [--workers 4]
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from _example import timed  # noqa: F401 (sets up the import path)
+from odm_report_shot_coverage.scripts.orthophoto_tiles import build_orthophoto_tiles
+
+Image.MAX_IMAGE_PIXELS = 1000000000
+
+
+def _legacy_png(src_file: str, target_dir: str):
+    """The orthophoto copy, as it was"""
+    im = Image.open(src_file)
+    im.save(target_dir + '/odm_orthophoto.png')
+
+
+def _write_orthophoto(filename: str, megapixels: float):
+    """a deflate compressed RGBA orthophoto, written by strips of rows to keep the benchmark itself light"""
+    width = int(np.sqrt(megapixels * 1e6))
+    gradient = np.linspace(0, 200, width, dtype=np.uint8)
+    pixels = np.empty((width, width, 4), dtype=np.uint8)
+    pixels[:, :, 0] = gradient[np.newaxis, :]
+    pixels[:, :, 1] = gradient[:, np.newaxis]
+    pixels[:, :, 2] = 128
+    pixels[:, :, 3] = 255
+    pixels[:, :width // 10, 3] = 0
+    Image.fromarray(pixels, 'RGBA').save(filename, compression='tiff_adobe_deflate')
+
+
+def _run(queue, fn, args):
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    fn(*args)
+    elapsed = time.perf_counter() - start
+    queue.put((elapsed, (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024))
+
+
+def _measured(fn, *args) -> (float, float):
+    """(elapsed seconds, peak resident memory increase in MB) of fn(*args), run in a child process"""
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_run, args=(queue, fn, args))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the orthophoto stage')
+    parser.add_argument('--megapixels', type=str, default='25,100', help='comma separated orthophoto sizes')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='tile encoding threads')
+    args = parser.parse_args()
+
+    for megapixels in [float(m) for m in args.megapixels.split(',')]:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            src_file = tmp_dir + '/odm_orthophoto.tif'
+            _write_orthophoto(src_file, megapixels)
+
+            legacy_elapsed, legacy_rss = _measured(_legacy_png, src_file, tmp_dir)
+            elapsed, rss = _measured(build_orthophoto_tiles, src_file, tmp_dir, args.workers)
+
+        print('orthophoto of %.0f MP' % megapixels)
+        print('  legacy png          %6.2f s  peak +%6.0f MB' % (legacy_elapsed, legacy_rss))
+        print('  tiles, %2d workers   %6.2f s  peak +%6.0f MB  speedup %4.1fx' % (
+            args.workers, elapsed, rss, legacy_elapsed / elapsed))
+
+
+if __name__ == '__main__':
+    main()
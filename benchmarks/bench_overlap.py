@@ -0,0 +1,51 @@
+"""
+Times the shot overlap graph on synthetic lawnmower surveys (frustum footprints): the bounding box grid index, against
+clipping every pair of shots, whose overlaps must be the same.
+
+    python benchmarks/bench_overlap.py [--shots 1000,10000] [--naive-max 2000]
+"""
+import argparse
+
+import numpy as np
+
+from _example import synthetic_survey, timed
+from odm_report_shot_coverage.models.overlap import overlap_graph_from_boundaries, padded_convex_hulls, \
+    polygon_areas, clip_convex_polygons, simplified_convex_polygons
+
+
+def _naive_pairs(boundaries) -> int:
+    """the number of overlapping pairs, clipping every pair of shot hulls by batches"""
+    (hulls, counts) = simplified_convex_polygons(*padded_convex_hulls([b.path for b in boundaries]))
+    (i, j) = np.triu_indices(len(hulls), 1)
+    nb_overlapping = 0
+    for start in range(0, len(i), 8192):
+        (a, b) = (i[start:start + 8192], j[start:start + 8192])
+        areas = polygon_areas(*clip_convex_polygons(hulls[a], counts[a], hulls[b], counts[b]))
+        nb_overlapping += np.count_nonzero(areas > 0)
+    return nb_overlapping
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the shot overlap graph')
+    parser.add_argument('--shots', type=str, default='1000,10000', help='comma separated numbers of shots')
+    parser.add_argument('--naive-max', type=int, default=2000, help='largest number of shots to clip all pairs of')
+    args = parser.parse_args()
+
+    for nb_shots in [int(s) for s in args.shots.split(',')]:
+        reconstruction = synthetic_survey(nb_shots, 20000)
+        reconstruction.compute_shot_boundaries(footprint='frustum')
+        shots = reconstruction.shots
+        boundaries = [s.boundaries for s in shots]
+        positions = np.array([s.translation for s in shots])
+
+        elapsed, graph = timed(overlap_graph_from_boundaries, boundaries, positions)
+        stats = graph.stats()
+        print('%d shots: %d overlapping pairs in %.2f s (forward %.0f%%, side %.0f%% on average)' % (
+            nb_shots, stats['pairs'], elapsed, 100 * stats['meanForwardOverlap'], 100 * stats['meanSideOverlap']))
+        if nb_shots <= args.naive_max:
+            naive_elapsed, nb_pairs = timed(_naive_pairs, boundaries)
+            print('  all pairs clipped: %d overlapping pairs in %.2f s' % (nb_pairs, naive_elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Measures the wavefront .obj parsing throughput and peak memory, against the former two pass parser.
+
+    python benchmarks/bench_parser.py [--vertices 1000000] [--obj FILE] [--no-legacy]
+
+Without --obj, a textured ODM like model (v, vt, vn lines and f v/vt/vn facets) is written in a temporary directory.
+"""
+import argparse
+import os
+import re
+import tempfile
+import tracemalloc
+
+import numpy as np
+
+from _example import timed
+from odm_report_shot_coverage.models.wavefront_25d import parse_wavefront_25d_obj
+
+_legacy_facet_pattern = re.compile('f (\\d+)/\\d+/\\d+ (\\d+)/\\d+/\\d+ (\\d+)/\\d+/\\d+')
+
+
+def _legacy_parse(filename: str) -> ('list[(float, float, float)]', 'list[(int, int, int)]'):
+    """The parser as it was: whole file read twice, tuples per vertex and a regex per facet"""
+    points = []
+    facets = []
+    with open(filename) as fd:
+        for line in [ln for ln in fd.readlines() if ln.startswith('v ')]:
+            v = line.replace('v ', '').split(' ')
+            points.append((float(v[0]), float(v[1]), float(v[2])))
+    with open(filename) as fd:
+        for line in [ln for ln in fd.readlines() if ln.startswith('f ')]:
+            m = _legacy_facet_pattern.fullmatch(line.strip())
+            facets.append((int(m.group(1)) - 1, int(m.group(2)) - 1, int(m.group(3)) - 1))
+    return points, facets
+
+
+def write_synthetic_obj(filename: str, nb_vertices: int, seed: int = 42):
+    """A grid height field, triangulated, with texture coordinates and normals"""
+    rng = np.random.default_rng(seed)
+    side = int(np.sqrt(nb_vertices))
+    xs, ys = np.meshgrid(np.arange(side, dtype=float) / 10, np.arange(side, dtype=float) / 10)
+    zs = rng.normal(0, 0.1, xs.shape)
+    i = np.arange((side - 1) * (side - 1))
+    corner = (i // (side - 1)) * side + i % (side - 1) + 1
+    triangles = np.concatenate([np.stack([corner, corner + 1, corner + side], axis=1),
+                                np.stack([corner + 1, corner + side + 1, corner + side], axis=1)])
+    with open(filename, 'w') as fd:
+        fd.write('mtllib odm_textured_model_geo.mtl\n')
+        np.savetxt(fd, np.stack([xs.ravel(), ys.ravel(), zs.ravel()], axis=1), fmt='v %.6f %.6f %.6f')
+        np.savetxt(fd, rng.uniform(0, 1, (side * side, 2)), fmt='vt %.6f %.6f')
+        fd.write('vn 0 0 1\n')
+        fd.write('usemtl material0000\n')
+        vt = rng.integers(1, side * side, (len(triangles), 3))
+        np.savetxt(fd, np.stack([triangles[:, 0], vt[:, 0], triangles[:, 1], vt[:, 1], triangles[:, 2], vt[:, 2]],
+                                axis=1), fmt='f %d/%d/1 %d/%d/1 %d/%d/1')
+
+
+def _measure(parse, filename: str) -> (float, float):
+    """elapsed seconds and peak traced memory (MB), from two runs as tracing slows the parsing down"""
+    elapsed, _ = timed(parse, filename)
+    tracemalloc.start()
+    parse(filename)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the wavefront .obj parser')
+    parser.add_argument('--vertices', type=int, default=1000000, help='vertices of the synthetic model')
+    parser.add_argument('--obj', type=str, default=None, help='an existing .obj file to parse instead')
+    parser.add_argument('--no-legacy', action='store_true', help='skip the former parser')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filename = args.obj
+        if filename is None:
+            filename = os.path.join(tmp_dir, 'odm_textured_model_geo.obj')
+            write_synthetic_obj(filename, args.vertices)
+        size_mb = os.path.getsize(filename) / 1e6
+        print('%s: %.1f MB' % (filename, size_mb))
+
+        parsers = [('streaming', parse_wavefront_25d_obj)]
+        if not args.no_legacy:
+            parsers.append(('legacy', _legacy_parse))
+        for name, parse in parsers:
+            elapsed, peak = _measure(parse, filename)
+            print('  %-10s %7.2f s  %7.1f MB/s  peak memory %8.1f MB' % (name, elapsed, size_mb / elapsed, peak))
+
+
+if __name__ == '__main__':
+    main()
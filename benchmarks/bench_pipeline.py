@@ -0,0 +1,43 @@
+"""
+Compares the report wall time with its stages run in turn, and concurrently (image and orthophoto codecs overlapping
+the 2.5d model parsing and the shot boundaries), on a synthetic project. The gain needs as many cores as stages.
+
+    python benchmarks/bench_pipeline.py [--shots 300] [--vertices 1000000] [--concurrent-stages 4]
+"""
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+
+from _example import timed
+from odm_report_shot_coverage.scripts.options import add_report_arguments, report_dir
+from odm_report_shot_coverage.scripts.report import build_report
+from odm_report_shot_coverage.scripts.synthetic_project import write_synthetic_project
+from odm_report_shot_coverage.scripts.timings import json_parse_stage_timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the concurrent report stages')
+    parser.add_argument('--shots', type=int, default=300, help='number of shots of the synthetic project')
+    parser.add_argument('--vertices', type=int, default=1000000, help='vertices of the synthetic 2.5d model')
+    parser.add_argument('--concurrent-stages', type=int, default=4, help='stages run at the same time')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    report_parser = argparse.ArgumentParser()
+    add_report_arguments(report_parser)
+    print('%d cores' % os.cpu_count())
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        write_synthetic_project(tmp_dir, args.shots, args.vertices, image_width=2000, orthophoto_side=8000)
+        for concurrency in [1, args.concurrent_stages]:
+            shutil.rmtree(report_dir(tmp_dir), ignore_errors=True)
+            report_args = report_parser.parse_args(['--no-cache', '--concurrent-stages', str(concurrency)])
+            elapsed, summary = timed(build_report, tmp_dir, report_args)
+            timings = json_parse_stage_timings(summary['timings'])
+            print('%d concurrent stages: %.2f s' % (concurrency, elapsed))
+            print(timings.gantt())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Compares the historical point by point projection with the batched NumPy one.
+
+    python benchmarks/bench_projection.py [--vertices 50000] [--large-vertices 2000000] [--legacy-shots 3]
+
+The legacy path is timed on a few shots only and extrapolated, as it takes minutes per shot on large meshes.
+"""
+import argparse
+
+import numpy as np
+
+from _example import example_reconstruction, timed, synthetic_wavefront
+
+
+def _legacy_in_frame_points(shot, points: 'list[(float, float, float)]') -> 'list[(float, float, float)]':
+    """The per vertex loop, as it was before the batch projection"""
+    in_frame = []
+    for point in points:
+        tc = point[0] - shot.translation[0], point[1] - shot.translation[1], point[2] - shot.translation[2]
+        [x, y, z] = shot._transfo_rotation.apply(tc)
+        x_n = x / z
+        y_n = y / z
+        r_2 = x_n * x_n + y_n * y_n
+        d = 1 + r_2 * shot.camera.k1 + r_2 * r_2 * shot.camera.k2
+        if shot.camera.in_frame((shot.camera.focal * d * x_n, shot.camera.focal * d * y_n)):
+            in_frame.append(point)
+    return in_frame
+
+
+def _batch_in_frame_points(shot, points: np.ndarray) -> np.ndarray:
+    return points[shot.camera.in_frame_mask(shot.camera_pixels(points))]
+
+
+def bench(title: str, reconstruction, legacy_shots: int):
+    points = reconstruction.mesh.points
+    shots = reconstruction.shots
+    point_list = [tuple(p) for p in points.tolist()]
+
+    legacy_shots = min(legacy_shots, len(shots))
+    legacy_elapsed, legacy = timed(lambda: [_legacy_in_frame_points(s, point_list) for s in shots[:legacy_shots]])
+    batch_elapsed, batch = timed(lambda: [_batch_in_frame_points(s, points) for s in shots])
+
+    for old, new in zip(legacy, batch):
+        assert len(old) == len(new), 'legacy and batch in frame points differ'
+
+    legacy_per_shot = legacy_elapsed / max(legacy_shots, 1)
+    batch_per_shot = batch_elapsed / len(shots)
+    print('%s: %d shots x %d vertices' % (title, len(shots), len(points)))
+    print('  legacy  %8.3f s/shot  (%d shots measured, %.0f s extrapolated)' % (
+        legacy_per_shot, legacy_shots, legacy_per_shot * len(shots)))
+    print('  batch   %8.3f s/shot  (%.2f s total, %.2e points/s)' % (
+        batch_per_shot, batch_elapsed, len(points) * len(shots) / batch_elapsed))
+    print('  speedup %8.1fx' % (legacy_per_shot / batch_per_shot))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the shot projection')
+    parser.add_argument('--vertices', type=int, default=50000, help='vertices of the example project mesh')
+    parser.add_argument('--large-vertices', type=int, default=2000000, help='vertices of the large synthetic mesh')
+    parser.add_argument('--legacy-shots', type=int, default=3, help='number of shots timed on the legacy path')
+    args = parser.parse_args()
+
+    reconstruction = example_reconstruction(args.vertices)
+    bench('example/project', reconstruction, args.legacy_shots)
+
+    b = reconstruction.mesh.boundaries
+    reconstruction.mesh = synthetic_wavefront((b.x_min, b.x_max), (b.y_min, b.y_max), (b.z_min, b.z_max),
+                                              args.large_vertices)
+    bench('synthetic large mesh', reconstruction, min(args.legacy_shots, 1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""
+Measures the throughput of every projection model, forward (project) and inverse (bearings), on the example/project
+camera and random in front points, and checks the round trip error.
+
+    python benchmarks/bench_projection_models.py [--points 1000000] [--repeat 3]
+"""
+import argparse
+
+import numpy as np
+
+from _example import example_reconstruction, timed
+from odm_report_shot_coverage.models.projection import PROJECTIONS
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the projection models')
+    parser.add_argument('--points', type=int, default=1000000, help='number of projected points')
+    parser.add_argument('--repeat', type=int, default=3, help='best of that many runs')
+    args = parser.parse_args()
+
+    camera = next(iter(example_reconstruction(1000).cameras.values()))
+    rng = np.random.default_rng(42)
+    rel_coords = rng.uniform((-0.8, -0.6, 1), (0.8, 0.6, 1), (args.points, 3)) * rng.uniform(1, 50, (args.points, 1))
+    print('%d points, camera %s (%s)' % (args.points, camera.name, camera.projection_type))
+    for name in ['perspective', 'brown', 'fisheye', 'spherical']:
+        projection = PROJECTIONS[name]
+        project_elapsed = min(timed(projection.project, camera, rel_coords)[0] for _ in range(args.repeat))
+        pixels = projection.project(camera, rel_coords)
+        bearings_elapsed = min(timed(projection.bearings, camera, pixels)[0] for _ in range(args.repeat))
+        bearings = projection.bearings(camera, pixels)
+        error = np.abs(bearings - rel_coords / np.linalg.norm(rel_coords, axis=1)[:, np.newaxis]).max()
+        print('  %-12s project %7.1f Mpoints/s   bearings %7.1f Mpoints/s   round trip error %.1e' % (
+            name, args.points / project_elapsed / 1e6, args.points / bearings_elapsed / 1e6, error))
+
+
+if __name__ == '__main__':
+    main()
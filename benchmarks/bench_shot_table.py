@@ -0,0 +1,96 @@
+"""
+Compares the former per object shot list with the columnar ShotTable, on a synthetic corridor of shots: building
+time and memory, and the cost of reading reconstruction.shots once per shot, as loops over the shots do.
+
+    python benchmarks/bench_shot_table.py [--shots 1000,10000]
+"""
+import argparse
+import tracemalloc
+
+import numpy as np
+from scipy.spatial.transform import Rotation as R
+
+from _example import timed
+from odm_report_shot_coverage.models.camera import Camera
+from odm_report_shot_coverage.models.shot import ShotTable
+
+
+class _LegacyShot:
+    """A shot, as it was: a Rotation object, Euler angles and tuples per shot"""
+
+    def __init__(self, image_name: str, camera: Camera, translation, rotation):
+        self.image_name = image_name
+        self.camera = camera
+        self.translation = tuple(translation)
+        self._rotation = tuple(rotation)
+        self._transfo_rotation = R.from_rotvec(rotation)
+        self._rotation_matrix = self._transfo_rotation.as_matrix()
+        euler = self._transfo_rotation.as_euler('xyz')
+        self.rotation_euler_xyz = (euler[0], euler[1], euler[2])
+
+
+class _LegacyReconstruction:
+    def __init__(self):
+        self._shots = []
+
+    @property
+    def shots(self):
+        self._shots.sort(key=lambda s: s.image_name)
+        return self._shots
+
+
+def _corridor(nb_shots: int, seed: int = 42) -> (list, np.ndarray, np.ndarray):
+    rng = np.random.default_rng(seed)
+    names = ['IMG_%06d.JPG' % i for i in rng.permutation(nb_shots)]
+    translations = np.stack([np.arange(nb_shots) * 2.0, rng.normal(0, 1, nb_shots), np.full(nb_shots, 30.0)], axis=1)
+    rotations = np.tile([np.pi, 0, 0], (nb_shots, 1)) + rng.normal(0, 0.05, (nb_shots, 3))
+    return names, translations, rotations
+
+
+def _legacy_build(camera: Camera, names, translations, rotations) -> _LegacyReconstruction:
+    reconstruction = _LegacyReconstruction()
+    for name, translation, rotation in zip(names, translations.tolist(), rotations.tolist()):
+        reconstruction._shots.append(_LegacyShot(name, camera, translation, rotation))
+    return reconstruction
+
+
+def _table_build(camera: Camera, names, translations, rotations) -> ShotTable:
+    table = ShotTable()
+    table.extend(names, [camera] * len(names), translations, rotations)
+    table.sorted_shots()
+    return table
+
+
+def _traced(fn, *args) -> (float, int, object):
+    tracemalloc.start()
+    elapsed, result = timed(fn, *args)
+    (current, _) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, current, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the shot store')
+    parser.add_argument('--shots', type=str, default='1000,10000', help='comma separated numbers of shots')
+    args = parser.parse_args()
+
+    camera = Camera()
+    camera.width = 4000
+    camera.height = 3000
+    camera.focal = 0.6
+    for nb_shots in [int(s) for s in args.shots.split(',')]:
+        columns = _corridor(nb_shots)
+        legacy_build, legacy_memory, legacy = _traced(_legacy_build, camera, *columns)
+        table_build, table_memory, table = _traced(_table_build, camera, *columns)
+        legacy_loop, _ = timed(lambda: [legacy.shots[i].translation for i in range(nb_shots)])
+        table_loop, _ = timed(lambda: [table.sorted_shots()[i].translation for i in range(nb_shots)])
+
+        print('%d shots' % nb_shots)
+        print('  per object list  build %6.3f s  %7.2f MB   shots[i] loop %7.3f s' % (
+            legacy_build, legacy_memory / 1e6, legacy_loop))
+        print('  ShotTable        build %6.3f s  %7.2f MB   shots[i] loop %7.3f s' % (
+            table_build, table_memory / 1e6, table_loop))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""
+The regression benchmark suite: the main processing steps timed on a synthetic ODM project, compared with a stored
+baseline.
+
+    python benchmarks/bench_suite.py [--scale small|medium|large] [--shots N] [--vertices N] [--repeat 3]
+                                     [--save] [--compare] [--tolerance 0.25]
+
+Scales are small (100 shots, 10k vertices), medium (1,000 shots, 1M vertices) and large (10,000 shots, 10M vertices).
+--save stores the results as benchmarks/baselines/{scale}.json, --compare fails (exit code 1) when a step is slower than
+the baseline by more than the tolerance. To compare across machines, times are scaled by a fixed numpy calibration
+workload, timed along.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import timeit
+
+import numpy as np
+
+import _example  # noqa: F401, sets the sources path
+from odm_report_shot_coverage.models.reconstruction import parse_reconstruction
+from odm_report_shot_coverage.models.shot import shot_boundaries_from_points
+from odm_report_shot_coverage.models.wavefront_25d import parse_wavefront_25d_obj
+from odm_report_shot_coverage.scripts.manifest import ReportManifest
+from odm_report_shot_coverage.scripts.orthophoto_tiles import build_orthophoto_tiles
+from odm_report_shot_coverage.scripts.synthetic_project import write_synthetic_project
+from odm_report_shot_coverage.scripts.thumbnails import make_thumbnails
+
+BASELINES_DIR = os.path.join(os.path.dirname(__file__), 'baselines')
+SCALES = {
+    'small': (100, 10000),
+    'medium': (1000, 1000000),
+    'large': (10000, 10000000),
+}
+
+
+def _calibration():
+    rng = np.random.default_rng(0)
+    a = rng.normal(size=(400, 400))
+    for _ in range(5):
+        np.sort(rng.normal(size=1000000))
+        a = a @ a.T / 400
+
+
+def _best_of(repeat: int, fn, *args) -> float:
+    """the best elapsed seconds per call, quick steps being looped over at least 0.2 s per run"""
+    timer = timeit.Timer(lambda: fn(*args))
+    (number, _) = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def run_suite(project_dir: str, work_dir: str, repeat: int) -> 'dict[str, float]':
+    """the best of repeat elapsed seconds of each step"""
+    obj_filename = '%s/odm_texturing_25d/odm_textured_model_geo.obj' % project_dir
+    reconstruction = parse_reconstruction(project_dir)
+    shots = reconstruction.shots
+
+    def compute_shot_boundaries():
+        for shot in shots:
+            shot.boundaries = None
+        reconstruction.compute_shot_boundaries()
+
+    # the vertices within the frame of each shot, as the boundary builders get them
+    points = reconstruction.mesh.points
+    in_frame = [points[s.camera.in_frame_mask(s.camera.project(s.camera_relative_coordinates_array(points)))]
+                for s in shots[:20]]
+
+    def boundaries_from_points():
+        for p in in_frame:
+            shot_boundaries_from_points(p)
+
+    def thumbnails():
+        make_thumbnails(project_dir + '/images', work_dir + '/images', ReportManifest())
+
+    return {
+        'calibration': _best_of(repeat, _calibration),
+        'parse_wavefront_25d_obj': _best_of(repeat, parse_wavefront_25d_obj, obj_filename),
+        'compute_shot_boundaries': _best_of(repeat, compute_shot_boundaries),
+        'shot_boundaries_from_points': _best_of(repeat, boundaries_from_points),
+        'make_thumbnails': _best_of(repeat, thumbnails),
+        'build_orthophoto_tiles': _best_of(repeat, build_orthophoto_tiles,
+                                           project_dir + '/odm_orthophoto/odm_orthophoto.tif', work_dir),
+    }
+
+
+def regressions(results: dict, baseline: dict, tolerance: float) -> 'dict[str, float]':
+    """the steps slower than the baseline by more than the tolerance, with their calibrated time ratio"""
+    machine_ratio = results['times']['calibration'] / baseline['times']['calibration']
+    ratios = {name: results['times'][name] / baseline['times'][name] / machine_ratio
+              for name in baseline['times'] if name != 'calibration' and name in results['times']}
+    return {name: ratio for name, ratio in ratios.items() if ratio > 1 + tolerance}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the processing steps against a stored baseline')
+    parser.add_argument('--scale', choices=sorted(SCALES.keys()), default='small', help='synthetic project size')
+    parser.add_argument('--shots', type=int, default=None, help='number of shots (overrides the scale)')
+    parser.add_argument('--vertices', type=int, default=None, help='number of mesh vertices (overrides the scale)')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per step, the best one being kept')
+    parser.add_argument('--save', action='store_true', help='store the results as the baseline of the scale')
+    parser.add_argument('--compare', action='store_true', help='fail if slower than the baseline of the scale')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='accepted slowdown ratio')
+    args = parser.parse_args()
+    (nb_shots, nb_vertices) = SCALES[args.scale]
+    nb_shots = args.shots or nb_shots
+    nb_vertices = args.vertices or nb_vertices
+    baseline_file = os.path.join(BASELINES_DIR, '%s.json' % args.scale)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        project_dir = os.path.join(tmp_dir, 'project')
+        write_synthetic_project(project_dir, nb_shots, nb_vertices, image_width=1000, orthophoto_side=4000)
+        times = run_suite(project_dir, os.path.join(tmp_dir, 'report'), args.repeat)
+    results = {
+        'shots': nb_shots,
+        'vertices': nb_vertices,
+        'machine': {'platform': platform.platform(), 'processor': platform.processor(), 'cpus': os.cpu_count(),
+                    'python': platform.python_version(), 'numpy': np.__version__},
+        'times': times,
+    }
+
+    baseline = None
+    if os.path.exists(baseline_file):
+        with open(baseline_file) as fd:
+            baseline = json.load(fd)
+    print('%d shots, %d vertices' % (nb_shots, nb_vertices))
+    for name, elapsed in times.items():
+        line = '  %-28s %8.3f s' % (name, elapsed)
+        if baseline is not None and name in baseline['times']:
+            line += '  (baseline %8.3f s)' % baseline['times'][name]
+        print(line)
+
+    if args.save:
+        os.makedirs(BASELINES_DIR, exist_ok=True)
+        with open(baseline_file, 'w') as fd:
+            json.dump(results, fd, indent=1)
+        print('Baseline saved in %s' % baseline_file)
+    if args.compare:
+        if baseline is None:
+            sys.exit('No baseline %s' % baseline_file)
+        if (baseline['shots'], baseline['vertices']) != (nb_shots, nb_vertices):
+            sys.exit('The baseline was run on %d shots, %d vertices' % (baseline['shots'], baseline['vertices']))
+        slower = regressions(results, baseline, args.tolerance)
+        for name, ratio in slower.items():
+            print('REGRESSION %s: %.0f%% slower than the baseline' % (name, 100 * (ratio - 1)))
+        if len(slower) > 0:
+            sys.exit(1)
+        print('No regression beyond %.0f%%' % (100 * args.tolerance))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Measures the thumbnail stage: the former serial full decoding + resize, versus the draft mode thread pool.
+
+    python benchmarks/bench_thumbnails.py [--images 20] [--megapixels 12,20] [--workers 4]
+"""
+import argparse
+import os
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+from _example import timed
+from odm_report_shot_coverage.scripts.manifest import ReportManifest
+from odm_report_shot_coverage.scripts.thumbnails import make_thumbnails
+
+
+def _legacy_thumbnails(src_dir: str, target_dir: str, target_size: int = 400):
+    """The image resizing, as it was"""
+    os.makedirs(target_dir, exist_ok=True)
+    for file_name in os.listdir(src_dir):
+        im = Image.open('%s/%s' % (src_dir, file_name))
+        width, height = im.size
+        max_size = max(width, height)
+        new_size = (int(width * target_size / max_size), int(height * target_size / max_size))
+        im = im.resize(new_size)
+        im.save('%s/%s' % (target_dir, file_name))
+
+
+def _write_images(directory: str, nb_images: int, megapixels: float, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    width = int(np.sqrt(megapixels * 1e6 * 4 / 3))
+    height = int(width * 3 / 4)
+    gradient = np.linspace(0, 200, width, dtype=np.float32)[np.newaxis, :, np.newaxis]
+    for i in range(nb_images):
+        pixels = np.clip(gradient + rng.normal(0, 20, (height, width, 3)), 0, 255).astype(np.uint8)
+        Image.fromarray(pixels).save('%s/IMG%04d.jpeg' % (directory, i), quality=90)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the thumbnail stage')
+    parser.add_argument('--images', type=int, default=20, help='number of images')
+    parser.add_argument('--megapixels', type=str, default='12,20', help='comma separated image sizes')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='thumbnail threads')
+    args = parser.parse_args()
+
+    for megapixels in [float(m) for m in args.megapixels.split(',')]:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            src_dir = tmp_dir + '/images'
+            os.makedirs(src_dir)
+            _write_images(src_dir, args.images, megapixels)
+
+            legacy_elapsed, _ = timed(_legacy_thumbnails, src_dir, tmp_dir + '/legacy')
+            manifest = ReportManifest()
+            elapsed, _ = timed(make_thumbnails, src_dir, tmp_dir + '/thumbnails', manifest, workers=args.workers)
+            up_to_date_elapsed, _ = timed(make_thumbnails, src_dir, tmp_dir + '/thumbnails', manifest,
+                                          workers=args.workers)
+
+        print('%d images of %.0f MP' % (args.images, megapixels))
+        print('  legacy              %6.2f s  %6.1f images/s' % (legacy_elapsed, args.images / legacy_elapsed))
+        print('  draft, %2d workers   %6.2f s  %6.1f images/s  speedup %4.1fx' % (
+            args.workers, elapsed, args.images / elapsed, legacy_elapsed / elapsed))
+        print('  up to date rerun    %6.2f s' % up_to_date_elapsed)
+
+
+if __name__ == '__main__':
+    main()
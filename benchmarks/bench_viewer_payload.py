@@ -0,0 +1,85 @@
+"""
+Compares what the web viewer loads before its first render: the former single reconstruction_shots.json with every
+shot boundary, against the compact shots index (the boundaries being fetched by chunks on hover).
+Payloads are measured raw and gzipped, and their parsing into the viewer shot objects is timed with node, as a proxy
+of the time to first render (network excluded).
+
+    python benchmarks/bench_viewer_payload.py [--shots 1000,10000] [--precision 2]
+"""
+import argparse
+import gzip
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+
+from _example import synthetic_survey
+from odm_report_shot_coverage.scripts.viewer_data import shots_index, boundaries_chunks
+
+_NODE_PARSE = """
+const fs = require('fs');
+const [file, format] = process.argv.slice(1);
+const text = fs.readFileSync(file, 'utf8');
+const times = [];
+for (let run = 0; run < 5; run++) {
+    const start = process.hrtime.bigint();
+    const json = JSON.parse(text);
+    let shots;
+    if (format === 'index') {
+        const c = json.shots;
+        shots = c.imageName.map((imageName, i) => ({imageName, index: i, camera: json.cameras[c.camera[i]],
+            translation: c.translation[i], rotationEulerXYZ: c.rotationEulerXYZ[i]}));
+    } else {
+        shots = json.shots;
+        shots.forEach(s => s.camera = json.cameras[s.camera]);
+    }
+    times.push(Number(process.hrtime.bigint() - start) / 1e6);
+}
+times.sort((a, b) => a - b);
+console.log(times[2]);
+"""
+
+
+def _node_parse_ms(file_name: str, payload_format: str) -> float:
+    out = subprocess.run(['node', '-e', _NODE_PARSE, file_name, payload_format], check=True, capture_output=True,
+                         text=True)
+    return float(out.stdout)
+
+
+def _sizes(text: str) -> (int, int):
+    data = text.encode('utf-8')
+    return len(data), len(gzip.compress(data))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the web viewer payloads')
+    parser.add_argument('--shots', type=str, default='1000,10000', help='comma separated numbers of shots')
+    parser.add_argument('--precision', type=int, default=2, help='decimals of the coordinates')
+    args = parser.parse_args()
+    has_node = shutil.which('node') is not None
+
+    for nb_shots in [int(s) for s in args.shots.split(',')]:
+        reconstruction = synthetic_survey(nb_shots, 20000)
+        reconstruction.compute_shot_boundaries()
+        legacy = json.dumps(reconstruction.to_json())
+        index = json.dumps(shots_index(reconstruction, args.precision), separators=(',', ':'))
+        chunk = json.dumps(boundaries_chunks(reconstruction, args.precision)[0], separators=(',', ':'))
+
+        print('%d shots' % nb_shots)
+        for (name, text, payload_format) in [('reconstruction_shots.json', legacy, 'legacy'),
+                                             ('shots_index.json', index, 'index'),
+                                             ('one boundaries chunk', chunk, None)]:
+            (raw, gzipped) = _sizes(text)
+            line = '  %-26s %9.1f kB  gzip %8.1f kB' % (name, raw / 1e3, gzipped / 1e3)
+            if has_node and payload_format is not None:
+                with tempfile.TemporaryDirectory() as tmp_dir:
+                    file_name = os.path.join(tmp_dir, 'payload.json')
+                    with open(file_name, 'w') as fd:
+                        fd.write(text)
+                    line += '  parse %7.1f ms' % _node_parse_ms(file_name, payload_format)
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
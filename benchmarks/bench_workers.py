@@ -0,0 +1,38 @@
+"""
+Measures how the shot boundary computation scales with the number of worker processes.
+
+    python benchmarks/bench_workers.py [--vertices 2000000] [--workers 1,2,4,8,16,32]
+"""
+import argparse
+import os
+
+from _example import example_reconstruction, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the shot boundary process pool')
+    parser.add_argument('--vertices', type=int, default=2000000, help='vertices of the synthetic mesh')
+    parser.add_argument('--workers', type=str, default=None, help='comma separated worker counts')
+    args = parser.parse_args()
+
+    if args.workers is None:
+        workers = [w for w in [1, 2, 4, 8, 16, 32] if w <= os.cpu_count()]
+    else:
+        workers = [int(w) for w in args.workers.split(',')]
+
+    reconstruction = example_reconstruction(args.vertices)
+    print('%d shots x %d vertices, %d cores' % (len(reconstruction.shots), len(reconstruction.mesh.points),
+                                                os.cpu_count()))
+    reference = None
+    for w in workers:
+        elapsed, _ = timed(reconstruction.compute_shot_boundaries, workers=w)
+        paths = [s.boundaries.path for s in reconstruction.shots]
+        if reference is None:
+            reference = (elapsed, paths)
+        assert paths == reference[1], 'results differ with %d workers' % w
+        print('  workers=%-3d %7.2f s  speedup %5.2fx  efficiency %3.0f%%' % (
+            w, elapsed, reference[0] / elapsed, 100 * reference[0] / elapsed / w))
+
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,6 @@ setup(
     },
     include_package_data=True,
     entry_points={
-        'console_scripts': ['odm-report-shot-coverage=odm_report_shot_coverage.scripts.report:main'],
+        'console_scripts': ['odm-report-shot-coverage=odm_report_shot_coverage.scripts.cli:main'],
     }
 )
@@ -1,3 +1,8 @@
+import numpy as np
+
+from odm_report_shot_coverage.models.projection import PROJECTIONS, projection_for
+
+
 class Camera:
     name: str
     projection_type: str = None
@@ -11,8 +16,8 @@ class Camera:
     k1: float = 0
     k2: float = 0
     k3: float = 0
-    p_1: float = 0
-    p_2: float = 0
+    p1: float = 0
+    p2: float = 0
 
     @property
     def width(self) -> int:
@@ -44,19 +49,53 @@ class Camera:
 
     def perspective_pixel(self, rel_coords: (float, float, float)) -> (float, float):
         """
-        Turns a relative coordinates coordinates [x,y,z] into a [u,v] camera coordinates
+        Turns a relative coordinates coordinates [x,y,z] into a [u,v] camera coordinates, with the perspective model
         https://opensfm.readthedocs.io/en/latest/geometry.html
         :param rel_coords: a three fload array
         :type rel_coords: list[float]
         :return:
         :rtype:
         """
-        [x, y, z] = rel_coords
-        x_n = x / z
-        y_n = y / z
-        r_2 = x_n * x_n + y_n * y_n
-        d = 1 + r_2 * self.k1 + r_2 * r_2 * self.k2
-        return self.focal * d * x_n, self.focal * d * y_n
+        pixel = self.perspective_pixels(np.array([rel_coords], dtype=float))[0]
+        return pixel[0], pixel[1]
+
+    def perspective_pixels(self, rel_coords: np.ndarray) -> np.ndarray:
+        """
+        Batch version of perspective_pixel
+        :param rel_coords: camera relative coordinates
+        :type rel_coords: np.ndarray of shape (N, 3)
+        :return: [u,v] camera coordinates
+        :rtype: np.ndarray of shape (N, 2)
+        """
+        return PROJECTIONS['perspective'].project(self, rel_coords)
+
+    def project(self, rel_coords: np.ndarray) -> np.ndarray:
+        """
+        Projects camera relative coordinates with the camera projection_type model
+        :param rel_coords: camera relative coordinates
+        :type rel_coords: np.ndarray of shape (N, 3)
+        :return: [u,v] camera coordinates
+        :rtype: np.ndarray of shape (N, 2)
+        """
+        return projection_for(self.projection_type).project(self, rel_coords)
+
+    def bearings(self, pixels: np.ndarray) -> np.ndarray:
+        """
+        Inverse of project, up to the distance
+        :param pixels: [u,v] camera coordinates
+        :type pixels: np.ndarray of shape (N, 2)
+        :return: unit vectors, in camera relative coordinates
+        :rtype: np.ndarray of shape (N, 3)
+        """
+        return projection_for(self.projection_type).bearings(self, pixels)
+
+    def max_normalized_radius(self) -> float:
+        """
+        Upper bound of |x / z| and |y / z| for a point that can be projected within the frame
+        :return: the radius bound, None if the field of view is too wide to have one
+        :rtype: float
+        """
+        return projection_for(self.projection_type).max_normalized_radius(self)
 
     def to_json(self) -> dict:
         return {
@@ -72,11 +111,22 @@ class Camera:
         return -self._width_rel_max <= pixel[0] <= self._width_rel_max and \
                -self._height_rel_max <= pixel[1] <= self._height_rel_max
 
+    def in_frame_mask(self, pixels: np.ndarray) -> np.ndarray:
+        """
+        Batch version of in_frame
+        :param pixels: camera coordinates
+        :type pixels: np.ndarray of shape (N, 2)
+        :return: whether each pixel falls within the frame
+        :rtype: np.ndarray of shape (N,), dtype bool
+        """
+        return (np.abs(pixels[:, 0]) <= self._width_rel_max) & (np.abs(pixels[:, 1]) <= self._height_rel_max)
+
 
 def json_parse_camera(name: str, el: dict) -> Camera:
     camera = Camera()
     camera.name = name
-    for k in ['width', 'height', 'projection_type', 'c_x', 'c_Y', 'k1', 'k2', 'k3', 'p1', 'p2']:
+    camera.projection_type = el.get('projection_type')
+    for k in ['width', 'height', 'c_x', 'c_y', 'k1', 'k2', 'k3', 'p1', 'p2']:
         camera.__setattr__(k, el.get(k, 0))
     if 'focal' in el:
         camera.focal = el['focal']
@@ -0,0 +1,124 @@
+import numpy as np
+
+from odm_report_shot_coverage.models.shot import Boundaries, ShotBoundaries
+
+
+def polygon_mask(path: 'list[(float, float)]', x_centers: np.ndarray, y_centers: np.ndarray) -> np.ndarray:
+    """
+    Which grid cells have their center within a polygon (even-odd rule).
+    The polygon edges are intersected with every row at once, each crossing incrementing a per row counter at the first
+    cell to its right, so the cumulative sum along the row is the number of crossings at the left of each cell.
+    :param path: the polygon vertices
+    :param x_centers: increasing cell center x coordinates
+    :type x_centers: np.ndarray of shape (W,)
+    :param y_centers: cell center y coordinates
+    :type y_centers: np.ndarray of shape (H,)
+    :rtype: np.ndarray of shape (H, W), dtype bool
+    """
+    vertices = np.asarray(path, dtype=float).reshape((-1, 2))
+    (x_a, y_a) = (vertices[:, 0], vertices[:, 1])
+    (x_b, y_b) = (np.roll(x_a, -1), np.roll(y_a, -1))
+    y_rows = np.asarray(y_centers, dtype=float)[:, np.newaxis]
+    crosses = (y_a <= y_rows) != (y_b <= y_rows)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_crossings = np.where(crosses, x_a + (y_rows - y_a) * (x_b - x_a) / (y_b - y_a), np.inf)
+    nb_cols = len(x_centers)
+    first_right = np.searchsorted(x_centers, x_crossings)
+    rows = np.broadcast_to(np.arange(len(y_centers))[:, np.newaxis], first_right.shape)
+    counts = np.bincount((rows * (nb_cols + 1) + first_right).ravel(), minlength=len(y_centers) * (nb_cols + 1))
+    crossings = np.cumsum(counts.reshape((len(y_centers), nb_cols + 1))[:, :nb_cols], axis=1)
+    return crossings % 2 == 1
+
+
+class CoverageRaster:
+    """
+    How many shot boundaries cover each cell of a grid over the orthophoto boundaries.
+    Row 0 is at the top (y_max), as in the orthophoto image. Shots are added one at a time, only the cells within the
+    shot bounding box being rasterized, so the memory does not depend on the number of shots.
+    """
+    boundaries: Boundaries
+    counts: np.ndarray
+    _x_centers: np.ndarray
+    _y_centers: np.ndarray
+
+    def __init__(self, boundaries: Boundaries, width: int, height: int):
+        """
+        :param boundaries: the ground extent of the raster
+        :param width: number of columns
+        :param height: number of rows
+        """
+        self.boundaries = boundaries
+        self.counts = np.zeros((height, width), dtype=np.uint16)
+        self._cell_width = (boundaries.x_max - boundaries.x_min) / width
+        self._cell_height = (boundaries.y_max - boundaries.y_min) / height
+        self._x_centers = boundaries.x_min + (np.arange(width) + 0.5) * self._cell_width
+        self._y_centers = boundaries.y_max - (np.arange(height) + 0.5) * self._cell_height
+
+    def _window(self, shot_boundaries: ShotBoundaries) -> (slice, slice, np.ndarray):
+        """
+        The rows and columns of the cells within the shot bounding box, and which of them have their center within the
+        shot boundaries, None if the box is empty or out of the grid
+        """
+        if len(shot_boundaries.path) == 0:
+            return None
+        vertices = np.asarray(shot_boundaries.path, dtype=float)
+        (height, width) = self.counts.shape
+        i_min = max(0, int(np.floor((vertices[:, 0].min() - self.boundaries.x_min) / self._cell_width)))
+        i_max = min(width, int(np.ceil((vertices[:, 0].max() - self.boundaries.x_min) / self._cell_width)))
+        j_min = max(0, int(np.floor((self.boundaries.y_max - vertices[:, 1].max()) / self._cell_height)))
+        j_max = min(height, int(np.ceil((self.boundaries.y_max - vertices[:, 1].min()) / self._cell_height)))
+        if i_max <= i_min or j_max <= j_min:
+            return None
+        mask = polygon_mask(vertices, self._x_centers[i_min:i_max], self._y_centers[j_min:j_max])
+        return slice(j_min, j_max), slice(i_min, i_max), mask
+
+    def add(self, shot_boundaries: ShotBoundaries):
+        """increments the count of the cells within the shot boundaries"""
+        window = self._window(shot_boundaries)
+        if window is None:
+            return
+        (rows, columns, mask) = window
+        counts = self.counts[rows, columns]
+        counts += mask & (counts < np.iinfo(np.uint16).max)
+
+    def cells_within(self, shot_boundaries: ShotBoundaries) -> np.ndarray:
+        """the flat indices (row * width + column) of the cells whose center is within the shot boundaries"""
+        window = self._window(shot_boundaries)
+        if window is None:
+            return np.zeros(0, dtype=np.int64)
+        (rows, columns, mask) = window
+        (j, i) = np.nonzero(mask)
+        return (j + rows.start) * self.counts.shape[1] + i + columns.start
+
+    def stats(self) -> dict:
+        """the number of cells per coverage count, and the ratio of covered cells"""
+        histogram = np.bincount(self.counts.ravel())
+        nb_cells = self.counts.size
+        covered = self.counts[self.counts > 0]
+        return {
+            'width': self.counts.shape[1],
+            'height': self.counts.shape[0],
+            'boundaries': self.boundaries.to_json(),
+            'maxCount': int(histogram.size - 1),
+            'meanCount': float(covered.mean()) if covered.size > 0 else 0.0,
+            'coveredRatio': float(covered.size / nb_cells) if nb_cells > 0 else 0.0,
+            'histogram': histogram.tolist(),
+        }
+
+    def save_png(self, filename: str):
+        """a 16 bits grayscale PNG, each pixel value being the count of shots covering the cell"""
+        # the query command loads this module (through the shot lookup), without ever saving a PNG
+        from PIL import Image
+        Image.fromarray(self.counts).save(filename, optimize=True)
+
+
+def coverage_raster_from_shots(shots_boundaries: 'iter[ShotBoundaries]', boundaries: Boundaries, width: int,
+                               height: int) -> CoverageRaster:
+    """
+    :param shots_boundaries: the boundaries of each shot, consumed one at a time
+    :param boundaries: the ground extent of the raster
+    """
+    raster = CoverageRaster(boundaries, width, height)
+    for shot_boundaries in shots_boundaries:
+        raster.add(shot_boundaries)
+    return raster
@@ -0,0 +1,100 @@
+import numpy as np
+
+from odm_report_shot_coverage.models.height_field import HeightField
+from odm_report_shot_coverage.models.shot import Shot, ShotBoundaries, Boundaries
+
+# maximum number of samples along a ray, when marching across the elevation range of the height field
+_MAX_RAY_SAMPLES = 4096
+
+
+def frame_edge_pixels(shot: Shot, nb_edge_points: int = 16) -> np.ndarray:
+    """
+    Pixels along the frame border, nb_edge_points per edge, clockwise in the image from the top left corner
+    :rtype: np.ndarray of shape (4 * nb_edge_points, 2)
+    """
+    (u_max, v_max) = (shot.camera._width_rel_max, shot.camera._height_rel_max)
+    steps = np.arange(nb_edge_points) / nb_edge_points
+    return np.concatenate([
+        np.stack([-u_max + 2 * u_max * steps, np.full(nb_edge_points, -v_max)], axis=1),
+        np.stack([np.full(nb_edge_points, u_max), -v_max + 2 * v_max * steps], axis=1),
+        np.stack([u_max - 2 * u_max * steps, np.full(nb_edge_points, v_max)], axis=1),
+        np.stack([np.full(nb_edge_points, -u_max), v_max - 2 * v_max * steps], axis=1),
+    ])
+
+
+def ray_height_field_intersections(origin: np.ndarray, directions: np.ndarray, height_field: HeightField,
+                                   z_min: float, z_max: float) -> np.ndarray:
+    """
+    Where rays first hit the height field, marching across the [z_min, z_max] elevation slab with samples one cell
+    apart horizontally, the crossing being linearly interpolated between the last sample above the surface and the
+    first one below.
+    :param origin: the rays origin
+    :type origin: np.ndarray of shape (3,)
+    :param directions: the rays directions
+    :type directions: np.ndarray of shape (N, 3)
+    :return: the intersections, nan for the rays not reaching z_min (going upward or horizontally)
+    :rtype: np.ndarray of shape (N, 3)
+    """
+    intersections = np.full((len(directions), 3), np.nan)
+    descending = np.nonzero(directions[:, 2] < 0)[0]
+    if len(descending) == 0:
+        return intersections
+    d = directions[descending]
+    t_enter = np.maximum((z_max - origin[2]) / d[:, 2], 0)
+    t_exit = (z_min - origin[2]) / d[:, 2]
+    reaching = t_exit >= t_enter
+    (descending, d, t_enter, t_exit) = (descending[reaching], d[reaching], t_enter[reaching], t_exit[reaching])
+    if len(descending) == 0:
+        return intersections
+
+    horizontal_length = np.hypot(d[:, 0], d[:, 1]) * (t_exit - t_enter)
+    nb_samples = int(min(_MAX_RAY_SAMPLES, max(2, np.ceil(horizontal_length.max() / height_field.cell_size) + 1)))
+    t = t_enter[:, np.newaxis] + (t_exit - t_enter)[:, np.newaxis] * np.linspace(0, 1, nb_samples)
+    samples = origin + t[:, :, np.newaxis] * d[:, np.newaxis, :]
+    above = samples[:, :, 2] - height_field.heights_at(samples[:, :, 0], samples[:, :, 1])
+    # the surface lies within the slab, so the last sample is never above it
+    above[:, -1] = np.minimum(above[:, -1], 0)
+    first_below = np.argmax(above <= 0, axis=1)
+    rows = np.arange(len(d))
+    previous = np.maximum(first_below - 1, 0)
+    (a_before, a_after) = (above[rows, previous], above[rows, first_below])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(a_before > a_after, a_before / (a_before - a_after), 0)
+    t_hit = t[rows, previous] + np.clip(ratio, 0, 1) * (t[rows, first_below] - t[rows, previous])
+    intersections[descending] = origin + t_hit[:, np.newaxis] * d
+    return intersections
+
+
+def clip_polygon(path: np.ndarray, boundaries: Boundaries) -> np.ndarray:
+    """
+    Sutherland-Hodgman clipping of a polygon to a rectangle
+    :type path: np.ndarray of shape (N, 2)
+    :rtype: np.ndarray of shape (K, 2)
+    """
+    for (axis, limit, keep_below) in [(0, boundaries.x_min, False), (0, boundaries.x_max, True),
+                                      (1, boundaries.y_min, False), (1, boundaries.y_max, True)]:
+        if len(path) == 0:
+            break
+        inside = path[:, axis] <= limit if keep_below else path[:, axis] >= limit
+        clipped = []
+        for (a, b, a_in, b_in) in zip(np.roll(path, 1, axis=0), path, np.roll(inside, 1), inside):
+            if a_in != b_in:
+                t = (limit - a[axis]) / (b[axis] - a[axis])
+                clipped.append(a + t * (b - a))
+            if b_in:
+                clipped.append(b)
+        path = np.array(clipped).reshape((-1, 2))
+    return path
+
+
+def shot_frustum_boundaries(shot: Shot, height_field: HeightField, nb_edge_points: int = 16) -> ShotBoundaries:
+    """
+    The shot ground footprint, from rays cast along the frame border and intersected with the height field.
+    The rays not hitting the surface (above the horizon) are dropped, so the polygon only covers the ground part of
+    the frame, and the polygon is clipped to the height field boundaries, as the mesh vertices are.
+    """
+    directions = shot.ray_directions(frame_edge_pixels(shot, nb_edge_points))
+    hits = ray_height_field_intersections(np.asarray(shot.translation, dtype=float), directions, height_field,
+                                          float(height_field.heights.min()), float(height_field.heights.max()))
+    path = clip_polygon(hits[~np.isnan(hits[:, 0]), :2], height_field.boundaries)
+    return ShotBoundaries([(p[0], p[1]) for p in path.tolist()])
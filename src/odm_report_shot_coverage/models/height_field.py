@@ -0,0 +1,66 @@
+import numpy as np
+from scipy import ndimage
+
+from odm_report_shot_coverage.models.shot import Boundaries
+
+
+class HeightField:
+    """
+    The 2.5d model surface as a regular grid of elevations, the value of a cell standing at its center.
+    """
+    boundaries: Boundaries
+    # (nb_x, nb_y), heights[i, j] being the elevation of the cell i along x and j along y
+    heights: np.ndarray
+
+    def __init__(self, boundaries: Boundaries, heights: np.ndarray):
+        self.boundaries = boundaries
+        self.heights = heights
+        (nb_x, nb_y) = heights.shape
+        self._cell_width = max(boundaries.x_max - boundaries.x_min, np.finfo(float).tiny) / nb_x
+        self._cell_height = max(boundaries.y_max - boundaries.y_min, np.finfo(float).tiny) / nb_y
+
+    @property
+    def cell_size(self) -> float:
+        return min(self._cell_width, self._cell_height)
+
+    def heights_at(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """
+        Bilinear interpolation of the elevation, clamped to the border cells outside the grid
+        :param x: np.ndarray of any shape
+        :param y: np.ndarray of the same shape
+        """
+        (nb_x, nb_y) = self.heights.shape
+        u = np.clip((np.asarray(x) - self.boundaries.x_min) / self._cell_width - 0.5, 0, nb_x - 1)
+        v = np.clip((np.asarray(y) - self.boundaries.y_min) / self._cell_height - 0.5, 0, nb_y - 1)
+        i = np.minimum(np.floor(u).astype(np.int64), max(nb_x - 2, 0))
+        j = np.minimum(np.floor(v).astype(np.int64), max(nb_y - 2, 0))
+        (i_next, j_next) = (np.minimum(i + 1, nb_x - 1), np.minimum(j + 1, nb_y - 1))
+        (du, dv) = (u - i, v - j)
+        return (self.heights[i, j] * (1 - du) * (1 - dv) + self.heights[i_next, j] * du * (1 - dv) +
+                self.heights[i, j_next] * (1 - du) * dv + self.heights[i_next, j_next] * du * dv)
+
+
+def height_field_from_points(points: np.ndarray, boundaries: Boundaries, dimensions: (int, int)) -> HeightField:
+    """
+    The mean vertex elevation of each cell, cells without vertices taking the value of the nearest non empty one
+    :param points: the 2.5d model vertices
+    :type points: np.ndarray of shape (N, 3)
+    :param dimensions: the number of cells along x and y
+    """
+    (nb_x, nb_y) = dimensions
+    width = max(boundaries.x_max - boundaries.x_min, np.finfo(float).tiny)
+    height = max(boundaries.y_max - boundaries.y_min, np.finfo(float).tiny)
+    i = np.clip(np.floor((points[:, 0] - boundaries.x_min) / width * nb_x).astype(np.int64), 0, nb_x - 1)
+    j = np.clip(np.floor((points[:, 1] - boundaries.y_min) / height * nb_y).astype(np.int64), 0, nb_y - 1)
+    cells = i * nb_y + j
+    counts = np.bincount(cells, minlength=nb_x * nb_y).reshape((nb_x, nb_y))
+    sums = np.bincount(cells, weights=points[:, 2], minlength=nb_x * nb_y).reshape((nb_x, nb_y))
+    empty = counts == 0
+    with np.errstate(invalid='ignore'):
+        heights = sums / counts
+    if empty.all():
+        heights[:] = 0
+    elif empty.any():
+        nearest = ndimage.distance_transform_edt(empty, return_distances=False, return_indices=True)
+        heights = heights[tuple(nearest)]
+    return HeightField(boundaries, heights)
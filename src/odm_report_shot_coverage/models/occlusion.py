@@ -0,0 +1,137 @@
+import numpy as np
+
+from odm_report_shot_coverage.models.camera import Camera
+
+# relative depth margin under which a vertex is not considered hidden by the surface around it
+DEFAULT_DEPTH_TOLERANCE = 0.01
+
+# facets are rasterized by chunks of at most this number of (facet, pixel) pairs
+_RASTER_CHUNK_PIXELS = 1 << 21
+
+
+def _ceil_pow2(values: np.ndarray) -> np.ndarray:
+    return np.left_shift(1, np.ceil(np.log2(np.maximum(values, 1))).astype(np.int64))
+
+
+class DepthBuffer:
+    """
+    The depth (camera z coordinate) of the closest mesh surface seen through each pixel of a shot frame, at a reduced
+    resolution.
+    Facets are rasterized from their projected vertices, the inverse depth being interpolated linearly in image space.
+    Facets are grouped by the power of two size of their pixel bounding box, so each group is rasterized at once over
+    a fixed size pixel window, by chunks to bound the memory.
+    """
+    # (height, width), np.inf where no facet is seen
+    depths: np.ndarray
+    _u_max: float
+    _v_max: float
+
+    def __init__(self, camera: Camera, resolution: int):
+        """
+        :param camera: the shot camera, whose frame is covered by the buffer
+        :param resolution: the buffer largest side, in pixels
+        """
+        self._u_max = camera._width_rel_max
+        self._v_max = camera._height_rel_max
+        scale = resolution / (2 * max(self._u_max, self._v_max))
+        width = max(1, int(round(2 * self._u_max * scale)))
+        height = max(1, int(round(2 * self._v_max * scale)))
+        self.depths = np.full((height, width), np.inf)
+
+    def _buffer_coordinates(self, pixels: np.ndarray) -> (np.ndarray, np.ndarray):
+        """continuous (column, row) of camera pixels, the center of buffer pixel (i, j) being at (i + 0.5, j + 0.5)"""
+        (height, width) = self.depths.shape
+        cols = (pixels[:, 0] + self._u_max) / (2 * self._u_max) * width
+        rows = (pixels[:, 1] + self._v_max) / (2 * self._v_max) * height
+        return cols, rows
+
+    def rasterize(self, pixels: np.ndarray, depths: np.ndarray, facets: np.ndarray):
+        """
+        Draw the facets, keeping the closest depth of each pixel.
+        Facets with a vertex behind the camera are ignored.
+        :param pixels: projected vertices
+        :type pixels: np.ndarray of shape (N, 2)
+        :param depths: vertex depths
+        :type depths: np.ndarray of shape (N,)
+        :param facets: vertex indices
+        :type facets: np.ndarray of shape (M, 3)
+        """
+        (height, width) = self.depths.shape
+        cols, rows = self._buffer_coordinates(pixels)
+        facets = np.asarray(facets).reshape((-1, 3))
+        facets = facets[np.all(depths[facets] > 0, axis=1) & np.all(np.isfinite(pixels[facets]), axis=(1, 2))]
+        x = cols[facets]
+        y = rows[facets]
+        x_first = np.maximum(np.ceil(x.min(axis=1) - 0.5), 0).astype(np.int64)
+        x_last = np.minimum(np.floor(x.max(axis=1) - 0.5), width - 1).astype(np.int64)
+        y_first = np.maximum(np.ceil(y.min(axis=1) - 0.5), 0).astype(np.int64)
+        y_last = np.minimum(np.floor(y.max(axis=1) - 0.5), height - 1).astype(np.int64)
+        covering = (x_last >= x_first) & (y_last >= y_first)
+
+        window_widths = _ceil_pow2(x_last - x_first + 1)
+        window_heights = _ceil_pow2(y_last - y_first + 1)
+        groups = np.where(covering, window_widths * (2 * max(width, height)) + window_heights, -1)
+        for group in np.unique(groups[covering]):
+            in_group = np.nonzero(groups == group)[0]
+            (window_width, window_height) = divmod(int(group), 2 * max(width, height))
+            chunk = max(1, _RASTER_CHUNK_PIXELS // (window_width * window_height))
+            for start in range(0, len(in_group), chunk):
+                f = in_group[start:start + chunk]
+                self._rasterize_window(x[f], y[f], 1 / depths[facets[f]], x_first[f], x_last[f], y_first[f],
+                                       y_last[f], window_width, window_height)
+
+    def _rasterize_window(self, x: np.ndarray, y: np.ndarray, inv_depths: np.ndarray,
+                          x_first: np.ndarray, x_last: np.ndarray, y_first: np.ndarray, y_last: np.ndarray,
+                          window_width: int, window_height: int):
+        """
+        Rasterize facets whose pixel bounding boxes fit within window_width x window_height.
+        Barycentric coordinates and inverse depth are planes over the window, evaluated as a * dx + b * dy + c from
+        per facet coefficients, dx and dy being the pixel center offsets from the bounding box corner.
+        """
+        (offset_y, offset_x) = np.divmod(np.arange(window_width * window_height), window_width)
+        (dx, dy) = (offset_x + 0.5, offset_y + 0.5)
+        x = x - x_first[:, np.newaxis]
+        y = y - y_first[:, np.newaxis]
+        (xa, xb, xc) = (x[:, 0:1], x[:, 1:2], x[:, 2:3])
+        (ya, yb, yc) = (y[:, 0:1], y[:, 1:2], y[:, 2:3])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            inv_denominator = 1 / ((yb - yc) * (xa - xc) + (xc - xb) * (ya - yc))
+            (a_a, b_a) = ((yb - yc) * inv_denominator, (xc - xb) * inv_denominator)
+            (a_b, b_b) = ((yc - ya) * inv_denominator, (xa - xc) * inv_denominator)
+            c_a = -(a_a * xc + b_a * yc)
+            c_b = -(a_b * xc + b_b * yc)
+        l_a = a_a * dx + b_a * dy + c_a
+        l_b = a_b * dx + b_b * dy + c_b
+        eps = -1e-9
+        inside = (l_a >= eps) & (l_b >= eps) & (l_a + l_b <= 1 - eps) & \
+                 (offset_x <= (x_last - x_first)[:, np.newaxis]) & (offset_y <= (y_last - y_first)[:, np.newaxis])
+        (f, p) = np.nonzero(inside)
+        (ia, ib, ic) = (inv_depths[f, 0], inv_depths[f, 1], inv_depths[f, 2])
+        inv_depth = ic + (ia - ic) * l_a[f, p] + (ib - ic) * l_b[f, p]
+        flat_indices = (y_first[f] + offset_y[p]) * self.depths.shape[1] + x_first[f] + offset_x[p]
+        np.minimum.at(self.depths.reshape(-1), flat_indices, 1 / inv_depth)
+
+    def visible_mask(self, pixels: np.ndarray, depths: np.ndarray,
+                     tolerance: float = DEFAULT_DEPTH_TOLERANCE) -> np.ndarray:
+        """
+        Whether vertices pass the depth test: in front of the camera and not further than the surface seen around them.
+        The buffer depth is the farthest one of the 3x3 pixels neighbourhood, so a vertex is not hidden by the facets
+        it belongs to, when they are sampled at slightly different positions.
+        :param pixels: projected vertices
+        :type pixels: np.ndarray of shape (N, 2)
+        :param depths: vertex depths
+        :type depths: np.ndarray of shape (N,)
+        :param tolerance: relative depth margin
+        :rtype: np.ndarray of shape (N,), dtype bool
+        """
+        (height, width) = self.depths.shape
+        padded = np.pad(self.depths, 1, mode='edge')
+        farthest = self.depths.copy()
+        for dy in range(3):
+            for dx in range(3):
+                np.maximum(farthest, padded[dy:dy + height, dx:dx + width], out=farthest)
+        cols, rows = self._buffer_coordinates(pixels)
+        with np.errstate(invalid='ignore'):
+            i = np.clip(np.nan_to_num(np.floor(cols), nan=0), 0, width - 1).astype(np.int64)
+            j = np.clip(np.nan_to_num(np.floor(rows), nan=0), 0, height - 1).astype(np.int64)
+        return (depths > 0) & (depths <= farthest[j, i] * (1 + tolerance))
@@ -0,0 +1,296 @@
+import numpy as np
+from scipy.spatial import ConvexHull, QhullError
+
+from odm_report_shot_coverage.models.shot import ShotBoundaries
+
+# pairs of polygons clipped at once
+_CLIP_BATCH_SIZE = 8192
+# the pairs whose displacement is within 45 degrees of the flight heading are forward overlaps
+_FORWARD_COS = np.cos(np.pi / 4)
+# the hull vertices cutting less than this ratio of the hull area are dropped before clipping
+_SIMPLIFY_TOLERANCE = 3e-4
+
+
+def padded_convex_hulls(paths: 'list[list[(float, float)]]') -> (np.ndarray, np.ndarray):
+    """
+    The convex hull of each path, counterclockwise, padded to the same number of vertices by repeating the last one.
+    Paths of less than 3 distinct points give an empty polygon.
+    :return: the padded hulls, of shape (N, V, 2), and their number of vertices, of shape (N,)
+    """
+    hulls = []
+    for path in paths:
+        xy = np.asarray(path, dtype=float).reshape((-1, 2))
+        try:
+            hulls.append(xy[ConvexHull(xy).vertices])
+        except (QhullError, ValueError):
+            hulls.append(np.zeros((0, 2)))
+    counts = np.array([len(h) for h in hulls], dtype=np.int64)
+    padded = np.zeros((len(hulls), max(1, counts.max(initial=0)), 2))
+    for (i, hull) in enumerate(hulls):
+        padded[i, :len(hull)] = hull
+        padded[i, len(hull):] = hull[-1] if len(hull) > 0 else 0
+    return padded, counts
+
+
+def _next_vertices(polygons: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """the vertex following each vertex, within the first counts ones of each row"""
+    following = (np.arange(polygons.shape[1]) + 1) % np.maximum(counts, 1)[:, np.newaxis]
+    return np.take_along_axis(polygons, following[..., np.newaxis], axis=1)
+
+
+def simplified_convex_polygons(polygons: np.ndarray, counts: np.ndarray,
+                               tolerance: float = _SIMPLIFY_TOLERANCE) -> (np.ndarray, np.ndarray):
+    """
+    Drop the vertices of convex polygons whose triangle with their two neighbours is smaller than tolerance times the
+    polygon area, the smallest first (as long as at least 4 vertices remain), so the polygons stay convex and within
+    the original ones. Frustum footprints, whose border is sampled every few pixels, go from ~50 vertices to ~20 for a
+    0.3% area loss with the default tolerance.
+    :param polygons: padded convex polygons, of shape (N, V, 2)
+    :return: the polygons, still padded to V vertices, and their number of vertices
+    """
+    (polygons, counts) = (polygons.copy(), np.array(counts, dtype=np.int64))
+    thresholds = tolerance * polygon_areas(polygons, counts)[:, np.newaxis]
+    columns = np.arange(polygons.shape[1])
+    while True:
+        n = np.maximum(counts, 1)[:, np.newaxis]
+        previous = np.take_along_axis(polygons, ((columns - 1) % n)[..., np.newaxis], axis=1)
+        following = _next_vertices(polygons, counts)
+        triangles = np.abs((polygons[..., 0] - previous[..., 0]) * (following[..., 1] - previous[..., 1]) -
+                           (following[..., 0] - previous[..., 0]) * (polygons[..., 1] - previous[..., 1])) / 2
+        triangles[columns >= counts[:, np.newaxis]] = np.inf
+        # only the local minima go in a round, so that no two neighbours are dropped at once
+        dropped = (triangles < thresholds) & (counts[:, np.newaxis] > 4) & \
+            (triangles < np.take_along_axis(triangles, (columns - 1) % n, axis=1)) & \
+            (triangles <= np.take_along_axis(triangles, (columns + 1) % n, axis=1))
+        if not dropped.any():
+            return polygons, counts
+        kept = ~dropped & (columns < counts[:, np.newaxis])
+        (rows, kept_columns) = np.nonzero(kept)
+        polygons[rows, (np.cumsum(kept, axis=1) - 1)[rows, kept_columns]] = polygons[rows, kept_columns]
+        counts = kept.sum(axis=1)
+        padding = columns >= counts[:, np.newaxis]
+        last = polygons[np.arange(len(polygons)), counts - 1]
+        polygons[padding] = np.broadcast_to(last[:, np.newaxis], polygons.shape)[padding]
+
+
+def polygon_areas(polygons: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """
+    Shoelace areas of a batch of polygons
+    :type polygons: np.ndarray of shape (B, V, 2)
+    :param counts: the number of vertices of each polygon, the next ones being ignored
+    :rtype: np.ndarray of shape (B,)
+    """
+    following = _next_vertices(polygons, counts)
+    cross = polygons[..., 0] * following[..., 1] - following[..., 0] * polygons[..., 1]
+    cross[np.arange(polygons.shape[1]) >= counts[:, np.newaxis]] = 0
+    return np.abs(cross.sum(axis=1)) / 2
+
+
+def clip_convex_polygons(subjects: np.ndarray, subject_counts: np.ndarray, clips: np.ndarray,
+                         clip_counts: np.ndarray) -> (np.ndarray, np.ndarray):
+    """
+    The intersection of each convex subject polygon with the convex clip polygon of the same row (Sutherland-Hodgman,
+    one clip edge at a time for the whole batch, only the rows the edge cuts being processed)
+    :param subjects: padded convex polygons
+    :type subjects: np.ndarray of shape (B, V, 2)
+    :param clips: padded convex polygons, counterclockwise
+    :type clips: np.ndarray of shape (B, W, 2)
+    :return: the padded intersections, of shape (B, V + W, 2), and their number of vertices
+    """
+    (nb_rows, width) = (len(subjects), subjects.shape[1] + clips.shape[1])
+    polygons = np.zeros((nb_rows, width, 2))
+    polygons[:, :subjects.shape[1]] = subjects
+    counts = np.array(subject_counts, dtype=np.int64)
+    columns = np.arange(width)
+    for k in range(clips.shape[1]):
+        rows = np.nonzero((k < clip_counts) & (counts > 0))[0]
+        a = clips[rows, k]
+        edge = clips[rows, (k + 1) % clip_counts[rows]] - a
+        p = polygons[rows]
+        d_p = edge[:, np.newaxis, 0] * (p[..., 1] - a[:, np.newaxis, 1]) - \
+            edge[:, np.newaxis, 1] * (p[..., 0] - a[:, np.newaxis, 0])
+        in_polygon = columns < counts[rows, np.newaxis]
+        inside = (d_p >= 0) | ~in_polygon
+        # the polygons entirely on the inner side of the edge are unchanged
+        cut = ~inside.all(axis=1)
+        (rows, p, d_p, in_polygon, inside) = (rows[cut], p[cut], d_p[cut], in_polygon[cut], inside[cut])
+        following = (columns + 1) % counts[rows, np.newaxis]
+        q = np.take_along_axis(p, following[..., np.newaxis], axis=1)
+        d_q = np.take_along_axis(d_p, following, axis=1)
+        inside &= in_polygon
+        crossing = (inside != (d_q >= 0)) & in_polygon
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = np.where(crossing, d_p / (d_p - d_q), 0)
+
+        # each subject edge p -> q emits p if inside, then its crossing point with the clip edge line
+        candidates = np.empty((len(rows), width, 2, 2))
+        candidates[:, :, 0] = p
+        candidates[:, :, 1] = p + t[..., np.newaxis] * (q - p)
+        valid = np.empty((len(rows), width, 2), dtype=bool)
+        valid[..., 0] = inside
+        valid[..., 1] = crossing
+        candidates = candidates.reshape((len(rows), 2 * width, 2))
+        valid = valid.reshape((len(rows), 2 * width))
+        positions = np.cumsum(valid, axis=1) - 1
+        (valid_rows, valid_columns) = np.nonzero(valid)
+        clipped = np.zeros((len(rows), width, 2))
+        clipped[valid_rows, positions[valid_rows, valid_columns]] = candidates[valid_rows, valid_columns]
+        polygons[rows] = clipped
+        counts[rows] = valid.sum(axis=1)
+    # polygons reduced to a segment or a point are empty
+    counts[counts < 3] = 0
+    return polygons, counts
+
+
+def bounding_box_pairs(boxes: np.ndarray) -> np.ndarray:
+    """
+    The pairs of intersecting boxes, found through a uniform grid whose cell side is the median box side: each box is
+    registered in the cells it overlaps, and only the boxes sharing a cell are compared
+    :param boxes: x_min, y_min, x_max, y_max per row
+    :type boxes: np.ndarray of shape (N, 4)
+    :return: the (i, j) pairs, i < j, sorted
+    :rtype: np.ndarray of shape (K, 2)
+    """
+    boxes = np.asarray(boxes, dtype=float).reshape((-1, 4))
+    sides = np.maximum(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1])
+    if len(boxes) < 2:
+        return np.zeros((0, 2), dtype=np.int64)
+    cell = max(float(np.median(sides)), np.finfo(float).tiny)
+    (x_origin, y_origin) = (boxes[:, 0].min(), boxes[:, 1].min())
+    (i_min, j_min) = (np.floor((boxes[:, 0] - x_origin) / cell).astype(np.int64),
+                      np.floor((boxes[:, 1] - y_origin) / cell).astype(np.int64))
+    (i_max, j_max) = (np.floor((boxes[:, 2] - x_origin) / cell).astype(np.int64),
+                      np.floor((boxes[:, 3] - y_origin) / cell).astype(np.int64))
+    (nb_i, nb_j) = (i_max - i_min + 1, j_max - j_min + 1)
+
+    # one entry per (box, overlapped cell)
+    nb_cells = nb_i * nb_j
+    box_index = np.repeat(np.arange(len(boxes)), nb_cells)
+    offsets = np.arange(len(box_index)) - np.repeat(np.cumsum(nb_cells) - nb_cells, nb_cells)
+    cell_ids = (i_min[box_index] + offsets // nb_j[box_index]) * (j_max.max() + 1) + j_min[box_index] + \
+        offsets % nb_j[box_index]
+    order = np.argsort(cell_ids, kind='stable')
+    (cell_ids, box_index) = (cell_ids[order], box_index[order])
+
+    # every entry is paired with the next ones of its cell
+    group_ends = np.searchsorted(cell_ids, cell_ids, side='right')
+    nb_next = group_ends - np.arange(len(cell_ids)) - 1
+    first = np.repeat(np.arange(len(cell_ids)), nb_next)
+    second = first + 1 + np.arange(len(first)) - np.repeat(np.cumsum(nb_next) - nb_next, nb_next)
+    pairs = np.stack([box_index[first], box_index[second]], axis=1)
+    pairs = np.unique(np.sort(pairs, axis=1), axis=0)
+    (a, b) = (boxes[pairs[:, 0]], boxes[pairs[:, 1]])
+    intersecting = (a[:, 0] < b[:, 2]) & (b[:, 0] < a[:, 2]) & (a[:, 1] < b[:, 3]) & (b[:, 1] < a[:, 3])
+    return pairs[intersecting]
+
+
+class OverlapGraph:
+    """
+    The pairs of overlapping shot footprints (each footprint being taken as the convex hull of its boundaries), with
+    their overlap area and the ratio of each footprint it covers.
+    Pairs are either forward overlaps, along the flight line, or side overlaps, between adjacent lines.
+    """
+    pairs: np.ndarray
+    areas: np.ndarray
+    ratios: np.ndarray
+    forward: np.ndarray
+
+    def __init__(self, nb_shots: int, pairs: np.ndarray, areas: np.ndarray, ratios: np.ndarray, forward: np.ndarray):
+        """
+        :param pairs: shot indices (i, j), i < j, of shape (K, 2)
+        :param areas: the overlap areas, of shape (K,)
+        :param ratios: the overlap area over the footprint areas of i and j, of shape (K, 2)
+        :param forward: whether the pair is along the flight line, of shape (K,)
+        """
+        self.nb_shots = nb_shots
+        self.pairs = pairs
+        self.areas = areas
+        self.ratios = ratios
+        self.forward = forward
+
+    def max_ratios(self, forward: bool) -> np.ndarray:
+        """per shot, the largest ratio of its footprint covered by a single forward (or side) neighbor"""
+        selected = self.forward == forward
+        best = np.zeros(self.nb_shots)
+        for side in range(2):
+            np.maximum.at(best, self.pairs[selected, side], self.ratios[selected, side])
+        return best
+
+    def stats(self) -> dict:
+        forward = self.max_ratios(True)
+        side = self.max_ratios(False)
+        return {
+            'pairs': len(self.pairs),
+            'meanForwardOverlap': float(forward.mean()) if self.nb_shots > 0 else 0,
+            'meanSideOverlap': float(side.mean()) if self.nb_shots > 0 else 0,
+        }
+
+    def to_json(self, image_names: 'list[str]', precision: int = 3) -> dict:
+        """
+        The adjacency list: for each shot, its neighbors as [shot index, ratio of the shot footprint they cover,
+        'forward' or 'side'], by decreasing ratio
+        """
+        adjacency = [[] for _ in range(self.nb_shots)]
+        ratios = np.round(self.ratios, precision).tolist()
+        for ((i, j), (ratio_i, ratio_j), forward) in zip(self.pairs.tolist(), ratios, self.forward.tolist()):
+            kind = 'forward' if forward else 'side'
+            adjacency[i].append([j, ratio_i, kind])
+            adjacency[j].append([i, ratio_j, kind])
+        for neighbors in adjacency:
+            neighbors.sort(key=lambda n: -n[1])
+        return {
+            'imageName': image_names,
+            'forwardOverlap': np.round(self.max_ratios(True), precision).tolist(),
+            'sideOverlap': np.round(self.max_ratios(False), precision).tolist(),
+            'adjacency': adjacency,
+        }
+
+
+def _flight_headings(positions: np.ndarray) -> np.ndarray:
+    """
+    Unit x/y direction of the flight line at each shot: the step from the previous or to the next shot, whichever is
+    closer to the dominant axis of all the steps (so that the shots at the end of a line do not take the turn as their
+    heading)
+    """
+    steps = np.diff(positions[:, :2], axis=0)
+    if len(steps) == 0:
+        return np.zeros((len(positions), 2))
+    # the dominant axis, regardless of the step sense, from the length weighted mean of the doubled step angles
+    angles = 2 * np.arctan2(steps[:, 1], steps[:, 0])
+    lengths = np.linalg.norm(steps, axis=1)
+    axis_angle = np.arctan2(np.sum(lengths * np.sin(angles)), np.sum(lengths * np.cos(angles))) / 2
+    axis = np.array([np.cos(axis_angle), np.sin(axis_angle)])
+
+    norms = np.maximum(lengths, np.finfo(float).tiny)[:, np.newaxis]
+    units = steps / norms * (lengths[:, np.newaxis] > 0)
+    (before, after) = (np.concatenate([units[:1], units]), np.concatenate([units, units[-1:]]))
+    closer = np.abs(after @ axis) >= np.abs(before @ axis)
+    return np.where(closer[:, np.newaxis], after, before)
+
+
+def overlap_graph_from_boundaries(shots_boundaries: 'list[ShotBoundaries]', positions: np.ndarray) -> OverlapGraph:
+    """
+    :param shots_boundaries: the boundaries of the shots, in capture order
+    :param positions: the shot positions, of shape (N, >= 2), giving the flight heading of each shot
+    """
+    (hulls, counts) = padded_convex_hulls([b.path for b in shots_boundaries])
+    (hulls, counts) = simplified_convex_polygons(hulls, counts)
+    hulls = hulls[:, :max(1, counts.max(initial=0))]
+    areas = polygon_areas(hulls, counts)
+    boxes = np.concatenate([hulls.min(axis=1), hulls.max(axis=1)], axis=1)
+    pairs = bounding_box_pairs(boxes)
+    pairs = pairs[(areas[pairs[:, 0]] > 0) & (areas[pairs[:, 1]] > 0)]
+
+    overlaps = np.zeros(len(pairs))
+    for start in range(0, len(pairs), _CLIP_BATCH_SIZE):
+        (i, j) = pairs[start:start + _CLIP_BATCH_SIZE].T
+        overlaps[start:start + len(i)] = polygon_areas(*clip_convex_polygons(hulls[i], counts[i], hulls[j], counts[j]))
+    overlapping = overlaps > 0
+    (pairs, overlaps) = (pairs[overlapping], overlaps[overlapping])
+
+    positions = np.asarray(positions, dtype=float)
+    headings = _flight_headings(positions)
+    displacements = positions[pairs[:, 1], :2] - positions[pairs[:, 0], :2]
+    norms = np.linalg.norm(displacements, axis=1)
+    cos = np.abs(np.einsum('ij,ij->i', displacements, headings[pairs[:, 0]])) / np.maximum(norms, np.finfo(float).tiny)
+    return OverlapGraph(len(hulls), pairs, overlaps, overlaps[:, np.newaxis] / areas[pairs], cos >= _FORWARD_COS)
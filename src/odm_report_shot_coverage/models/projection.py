@@ -0,0 +1,248 @@
+"""
+Camera projection models, following the OpenSfM definitions (https://opensfm.readthedocs.io/en/latest/geometry.html).
+Each model projects camera relative coordinates onto [u, v] camera pixels (normalized by the largest image side, the
+image center at [0, 0]), and back, from pixels to unit bearing vectors.
+"""
+import logging
+
+import numpy as np
+
+# iterations when inverting the distortion, stopped earlier once the residual is below the tolerance
+_UNDISTORT_ITERATIONS = 20
+_UNDISTORT_TOLERANCE = 1e-14
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=1)[:, np.newaxis]
+
+
+def _distortion_polynomial(coefficients: 'list[float]') -> np.ndarray:
+    """r * (1 + c1 * r^2 + c2 * r^4 + ...), highest degree first"""
+    polynomial = np.zeros(2 * len(coefficients) + 2)
+    for (i, c) in enumerate([1.0] + list(coefficients)):
+        polynomial[-2 - 2 * i] = c
+    return polynomial
+
+
+def _monotonic_radius(coefficients: 'list[float]') -> float:
+    """
+    The radius where r * (1 + c1 * r^2 + c2 * r^4 + ...) stops increasing, None if it never does.
+    Beyond it, the distortion folds far away points back into the frame, so they are not considered projectable.
+    """
+    roots = np.roots(np.polyder(_distortion_polynomial(coefficients)))
+    positive = roots[(np.abs(roots.imag) <= 1e-9 * (1 + np.abs(roots.real))) & (roots.real > 0)].real
+    return float(positive.min()) if len(positive) > 0 else None
+
+
+def _radius_bound(coefficients: 'list[float]', tangential: float, target: float) -> float:
+    """
+    Upper bound of the radius r, within the monotonic range, such that
+    r * (1 + c1 * r^2 + c2 * r^4 + ...) - tangential * r^2 <= target, None if unbounded.
+    """
+    polynomial = _distortion_polynomial(coefficients)
+    polynomial[-3] -= tangential
+    polynomial[-1] -= target
+    limit = _monotonic_radius(coefficients)
+    if limit is not None and np.polyval(polynomial, limit) <= 0:
+        return limit
+    roots = np.roots(polynomial)
+    real_roots = roots[np.abs(roots.imag) <= 1e-6 * (1 + np.abs(roots.real))].real
+    if limit is None and polynomial[np.nonzero(polynomial)[0][0]] < 0:
+        return None
+    real_roots = real_roots[real_roots <= (np.inf if limit is None else limit)]
+    return float(np.max(real_roots, initial=0.0)) * (1 + 1e-6)
+
+
+def _fold(xy: np.ndarray, radius_2: np.ndarray, limit: float) -> np.ndarray:
+    """xy, set to nan where the squared radius is beyond the monotonic limit"""
+    if limit is not None:
+        xy[radius_2 > limit * limit] = np.nan
+    return xy
+
+
+def _frame_radius(camera) -> float:
+    """half diagonal of the frame, in pixels, widened by the principal point offset"""
+    return np.hypot(camera._width_rel_max + abs(camera.c_x), camera._height_rel_max + abs(camera.c_y))
+
+
+class Projection:
+    """A camera model: projection, inverse projection and the normalized radius bound used for vertex culling"""
+    name: str
+
+    def project(self, camera, rel_coords: np.ndarray) -> np.ndarray:
+        """
+        :param rel_coords: camera relative coordinates
+        :type rel_coords: np.ndarray of shape (N, 3)
+        :return: [u,v] camera coordinates, nan beyond the range where the distortion is monotonic
+        :rtype: np.ndarray of shape (N, 2)
+        """
+        raise NotImplementedError()
+
+    def bearings(self, camera, pixels: np.ndarray) -> np.ndarray:
+        """
+        Inverse of project, up to the distance
+        :param pixels: [u,v] camera coordinates
+        :type pixels: np.ndarray of shape (N, 2)
+        :return: unit vectors, in camera relative coordinates
+        :rtype: np.ndarray of shape (N, 3)
+        """
+        raise NotImplementedError()
+
+    def max_normalized_radius(self, camera) -> float:
+        """
+        Upper bound of |x / z| and |y / z| for a point projected within the frame, None if there is none (the field of
+        view reaching 180 degrees)
+        """
+        raise NotImplementedError()
+
+
+class PerspectiveProjection(Projection):
+    """x_n = x / z, y_n = y / z, radially distorted by 1 + k1 * r^2 + k2 * r^4"""
+    name = 'perspective'
+
+    def project(self, camera, rel_coords: np.ndarray) -> np.ndarray:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            xy_n = rel_coords[:, :2] / rel_coords[:, 2:3]
+        r_2 = np.einsum('ij,ij->i', xy_n, xy_n)
+        d = 1 + r_2 * camera.k1 + r_2 * r_2 * camera.k2
+        return _fold(camera.focal * d[:, np.newaxis] * xy_n, r_2, _monotonic_radius([camera.k1, camera.k2]))
+
+    def bearings(self, camera, pixels: np.ndarray) -> np.ndarray:
+        distorted = np.asarray(pixels, dtype=float) / camera.focal
+        r_d = np.sqrt(np.einsum('ij,ij->i', distorted, distorted))
+        r = r_d.copy()
+        for _ in range(_UNDISTORT_ITERATIONS):
+            r_2 = r * r
+            f = r * (1 + camera.k1 * r_2 + camera.k2 * r_2 * r_2) - r_d
+            if np.all(np.abs(f) <= _UNDISTORT_TOLERANCE):
+                break
+            r -= f / (1 + 3 * camera.k1 * r_2 + 5 * camera.k2 * r_2 * r_2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scale = np.where(r_d > 0, r / r_d, 1)
+        xy_n = distorted * scale[:, np.newaxis]
+        return _normalize(np.concatenate([xy_n, np.ones((len(xy_n), 1))], axis=1))
+
+    def max_normalized_radius(self, camera) -> float:
+        return _radius_bound([camera.k1, camera.k2], 0, _frame_radius(camera) / camera.focal)
+
+
+class BrownProjection(Projection):
+    """
+    x_n = x / z, y_n = y / z, radially distorted by 1 + k1 * r^2 + k2 * r^4 + k3 * r^6, plus the p1, p2 tangential
+    distortion, then shifted by the principal point c_x, c_y
+    """
+    name = 'brown'
+
+    @staticmethod
+    def _distort(camera, xy_n: np.ndarray) -> np.ndarray:
+        (x, y) = (xy_n[:, 0], xy_n[:, 1])
+        r_2 = x * x + y * y
+        radial = 1 + r_2 * (camera.k1 + r_2 * (camera.k2 + r_2 * camera.k3))
+        x_t = 2 * camera.p1 * x * y + camera.p2 * (r_2 + 2 * x * x)
+        y_t = 2 * camera.p2 * x * y + camera.p1 * (r_2 + 2 * y * y)
+        return np.stack([radial * x + x_t, radial * y + y_t], axis=1)
+
+    def project(self, camera, rel_coords: np.ndarray) -> np.ndarray:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            xy_n = rel_coords[:, :2] / rel_coords[:, 2:3]
+        pixels = camera.focal * self._distort(camera, xy_n) + np.array([camera.c_x, camera.c_y])
+        return _fold(pixels, np.einsum('ij,ij->i', xy_n, xy_n), _monotonic_radius([camera.k1, camera.k2, camera.k3]))
+
+    def bearings(self, camera, pixels: np.ndarray) -> np.ndarray:
+        """the distortion is inverted by Newton iterations, with its analytical jacobian"""
+        distorted = (np.asarray(pixels, dtype=float) - np.array([camera.c_x, camera.c_y])) / camera.focal
+        xy_n = distorted.copy()
+        for _ in range(_UNDISTORT_ITERATIONS):
+            error = self._distort(camera, xy_n) - distorted
+            if np.all(np.abs(error) <= _UNDISTORT_TOLERANCE):
+                break
+            (x, y) = (xy_n[:, 0], xy_n[:, 1])
+            r_2 = x * x + y * y
+            radial = 1 + r_2 * (camera.k1 + r_2 * (camera.k2 + r_2 * camera.k3))
+            # d radial / d r^2
+            radial_derivative = camera.k1 + r_2 * (2 * camera.k2 + 3 * r_2 * camera.k3)
+            j_xx = radial + 2 * x * x * radial_derivative + 2 * camera.p1 * y + 6 * camera.p2 * x
+            j_xy = 2 * x * y * radial_derivative + 2 * camera.p1 * x + 2 * camera.p2 * y
+            j_yy = radial + 2 * y * y * radial_derivative + 2 * camera.p2 * x + 6 * camera.p1 * y
+            determinant = j_xx * j_yy - j_xy * j_xy
+            xy_n -= np.stack([j_yy * error[:, 0] - j_xy * error[:, 1],
+                              j_xx * error[:, 1] - j_xy * error[:, 0]], axis=1) / determinant[:, np.newaxis]
+        return _normalize(np.concatenate([xy_n, np.ones((len(xy_n), 1))], axis=1))
+
+    def max_normalized_radius(self, camera) -> float:
+        # the tangential distortion is at most 3 * (|p1| + |p2|) * r^2
+        return _radius_bound([camera.k1, camera.k2, camera.k3], 3 * (abs(camera.p1) + abs(camera.p2)),
+                             _frame_radius(camera) / camera.focal)
+
+
+class FisheyeProjection(Projection):
+    """theta, the angle to the optical axis, radially distorted by 1 + k1 * theta^2 + k2 * theta^4"""
+    name = 'fisheye'
+
+    def project(self, camera, rel_coords: np.ndarray) -> np.ndarray:
+        rho = np.hypot(rel_coords[:, 0], rel_coords[:, 1])
+        theta = np.arctan2(rho, rel_coords[:, 2])
+        theta_2 = theta * theta
+        d = 1 + theta_2 * camera.k1 + theta_2 * theta_2 * camera.k2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scale = np.where(rho > 0, camera.focal * d * theta / rho, 0)
+        return _fold(scale[:, np.newaxis] * rel_coords[:, :2], theta_2, _monotonic_radius([camera.k1, camera.k2]))
+
+    def bearings(self, camera, pixels: np.ndarray) -> np.ndarray:
+        distorted = np.asarray(pixels, dtype=float) / camera.focal
+        theta_d = np.sqrt(np.einsum('ij,ij->i', distorted, distorted))
+        theta = theta_d.copy()
+        for _ in range(_UNDISTORT_ITERATIONS):
+            theta_2 = theta * theta
+            f = theta * (1 + camera.k1 * theta_2 + camera.k2 * theta_2 * theta_2) - theta_d
+            if np.all(np.abs(f) <= _UNDISTORT_TOLERANCE):
+                break
+            theta -= f / (1 + 3 * camera.k1 * theta_2 + 5 * camera.k2 * theta_2 * theta_2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scale = np.where(theta_d > 0, np.sin(theta) / theta_d, 0)
+        return np.concatenate([distorted * scale[:, np.newaxis], np.cos(theta)[:, np.newaxis]], axis=1)
+
+    def max_normalized_radius(self, camera) -> float:
+        theta = _radius_bound([camera.k1, camera.k2], 0, _frame_radius(camera) / camera.focal)
+        if theta is None or theta >= np.pi / 2:
+            return None
+        return float(np.tan(theta))
+
+
+class SphericalProjection(Projection):
+    """equirectangular: u is the longitude, v the latitude (downward), both divided by 2 pi"""
+    name = 'spherical'
+
+    def project(self, camera, rel_coords: np.ndarray) -> np.ndarray:
+        (x, y, z) = (rel_coords[:, 0], rel_coords[:, 1], rel_coords[:, 2])
+        longitude = np.arctan2(x, z)
+        latitude = np.arctan2(-y, np.hypot(x, z))
+        return np.stack([longitude, -latitude], axis=1) / (2 * np.pi)
+
+    def bearings(self, camera, pixels: np.ndarray) -> np.ndarray:
+        longitude = 2 * np.pi * pixels[:, 0]
+        latitude = -2 * np.pi * pixels[:, 1]
+        return np.stack([np.cos(latitude) * np.sin(longitude), -np.sin(latitude),
+                         np.cos(latitude) * np.cos(longitude)], axis=1)
+
+    def max_normalized_radius(self, camera) -> float:
+        return None
+
+
+PROJECTIONS: 'dict[str, Projection]' = {
+    'perspective': PerspectiveProjection(),
+    'brown': BrownProjection(),
+    'fisheye': FisheyeProjection(),
+    'spherical': SphericalProjection(),
+    'equirectangular': SphericalProjection(),
+}
+
+
+def projection_for(projection_type: str) -> Projection:
+    """The registered projection, perspective if the type is not set or not supported"""
+    if projection_type is None:
+        return PROJECTIONS['perspective']
+    if projection_type not in PROJECTIONS:
+        logging.warning('Projection type %s is not supported, using perspective instead' % projection_type)
+        return PROJECTIONS['perspective']
+    return PROJECTIONS[projection_type]
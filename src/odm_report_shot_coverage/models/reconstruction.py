@@ -1,32 +1,79 @@
+import contextlib
 import json
 import logging
+from typing import Callable, ContextManager
 
 import geojson
 import numpy as np
 from tqdm import tqdm
-from scipy import stats
 
 from odm_report_shot_coverage.models.camera import Camera, json_parse_camera
-from odm_report_shot_coverage.models.shot import Shot, shot_boundaries_from_points, Boundaries
-from odm_report_shot_coverage.models.wavefront_25d import Wavefront25D, parse_wavefront_25d_obj
+from odm_report_shot_coverage.models.frustum import shot_frustum_boundaries
+from odm_report_shot_coverage.models.shot import Shot, ShotTable, Boundaries, shot_boundaries_from_mesh, \
+    shot_boundaries_from_mesh_chunks
+from odm_report_shot_coverage.models.shot_boundary_pool import ShotBoundaryPool
+from odm_report_shot_coverage.models.shot_lookup import ShotLookup, shot_lookup_from_shots, DEFAULT_LOOKUP_RESOLUTION
+from odm_report_shot_coverage.models.wavefront_25d import Wavefront25D, parse_wavefront_25d_obj, \
+    paving_points_from_ranges, parse_wavefront_25d_obj_cached
+
+
+# the projection temporaries per vertex (relative coordinates, pixels, masks...), measured at ~100 bytes for the brown
+# model, with some room for the others
+_PROJECTION_BYTES_PER_VERTEX = 160
+# the interpreter and its libraries, before any mesh is loaded
+_BASE_MEMORY_MB = 150
+_MIN_PROJECTION_CHUNK_SIZE = 16384
+
+
+class MemoryBudgetError(ValueError):
+    """the memory budget is too small for the mesh"""
+
+
+def projection_chunk_size(memory_budget: float, mesh: Wavefront25D, workers: int = 1) -> int:
+    """
+    The number of vertices each process can project at once for the whole to stay within memory_budget MB: what is
+    left once the interpreter and the compacted mesh vertices and paving are resident (even memory-mapped, the pages
+    read count in the RSS), shared among the workers.
+    :raise MemoryBudgetError: if that leaves less than _MIN_PROJECTION_CHUNK_SIZE vertices per process
+    """
+    resident = _BASE_MEMORY_MB * 2 ** 20 + mesh.points.nbytes + mesh.paving_point_order.nbytes
+    workers = max(1, workers)
+    chunk_size = int((memory_budget * 2 ** 20 - resident) / workers / _PROJECTION_BYTES_PER_VERTEX)
+    if chunk_size < _MIN_PROJECTION_CHUNK_SIZE:
+        needed = (resident + workers * _MIN_PROJECTION_CHUNK_SIZE * _PROJECTION_BYTES_PER_VERTEX) / 2 ** 20
+        raise MemoryBudgetError('A %.0f MB memory budget is too small for %d vertices and %d worker(s): at least %.0f MB '
+                                'are needed' % (memory_budget, len(mesh.points), workers, np.ceil(needed)))
+    return chunk_size
 
 
 class Reconstruction:
-    cameras: 'dict[str, Camera]' = {}
-    _shots: 'list[Shot]' = []
-    mesh = Wavefront25D
+    cameras: 'dict[str, Camera]'
+    shot_table: ShotTable
+    mesh: Wavefront25D
     orthophoto_boundaries: Boundaries
 
+    def __init__(self):
+        self.cameras = {}
+        self.shot_table = ShotTable()
+        # (mesh, spacing, decimated mesh)
+        self._sampled_mesh = None
+        # (resolution, lookup), reset as soon as shot boundaries change
+        self._shot_lookup = None
+
     @property
     def shots(self) -> 'list[Shot]':
-        self._shots.sort(key=lambda s: s.image_name)
-        return self._shots
+        return self.shot_table.sorted_shots()
+
+    @property
+    def capture_ordered_shots(self) -> 'list[Shot]':
+        """the shots in capture order: by capture time if shots.geojson has them, in its own order otherwise"""
+        return self.shot_table.row_shots()
 
     def add_camera(self, name: str, camera: Camera):
         self.cameras[name] = camera
 
     def add_shot(self, shot: Shot):
-        self._shots.append(shot)
+        self.shot_table.append(shot)
 
     def to_json(self) -> dict:
         return {
@@ -37,19 +84,129 @@ class Reconstruction:
             'orthophotoBoundaries': self.orthophoto_boundaries.to_json(),
         }
 
-    def compute_shot_boundaries(self):
+    def compute_shot_boundaries(self, workers: int = 1, cull_vertices: bool = True, shots: 'list[Shot]' = None,
+                                occlusion_resolution: int = None, boundary_mode: str = 'star',
+                                footprint: str = 'vertices', pool: ShotBoundaryPool = None,
+                                sample_spacing: float = None, memory_budget: float = None):
         """
         From shots and points, fill the shot_boundaries
+        :param workers: number of processes to spread the shots over (1 computes in the current process)
+        :param cull_vertices: only project the vertices within the paving cells of each shot ground footprint.
+        The footprint being conservative, the boundaries are the same as when projecting all vertices.
+        :param shots: the only shots to compute (all of them if None)
+        :param occlusion_resolution: if set, discard the vertices hidden behind the mesh facets, through a depth buffer
+        of that largest side (in pixels)
+        :param boundary_mode: 'star' for the 24 points star polygon, 'hull' for the exact convex hull
+        :param footprint: 'vertices' to project the mesh vertices onto each shot, 'frustum' to intersect rays cast along
+        the frame border with the mesh height field, much faster but ignoring the relief within the frame
+        :param pool: an already open pool to compute the shots with, instead of opening one when workers > 1
+        :param sample_spacing: if set, compute over the mesh decimated on a grid of that spacing (see
+        Wavefront25D.decimated), trading the boundaries accuracy for speed
+        :param memory_budget: if set, in MB, the mesh is compacted (its vertices replaced by float32 ones relative to the
+        mesh center, see Wavefront25D.compacted), and they are projected by chunks sized for the process (and its
+        workers) to stay within the budget (see shot_boundaries_from_mesh_chunks), a MemoryBudgetError being raised if
+        it cannot. Not available with occlusion_resolution, whose depth buffer needs all the facets at once.
         :rtype: None
         """
+        if shots is None:
+            shots = self.shots
+        if len(shots) == 0:
+            return
+        self._shot_lookup = None
+        mesh = self.sampled_mesh(sample_spacing)
+        if footprint == 'frustum':
+            height_field = mesh.height_field()
+            for shot in tqdm(shots, desc='Computing shot frustum footprints'):
+                shot.boundaries = shot_frustum_boundaries(shot, height_field)
+            return
+        if memory_budget is not None:
+            mesh = self._compacted_mesh(sample_spacing)
+        chunk_size = None
+        if mesh.origin is not None:
+            if occlusion_resolution is not None:
+                raise ValueError('Occlusion needs all the mesh facets at once, and cannot run within a memory budget')
+            chunk_size = max(1, len(mesh.points))
+            if memory_budget is not None:
+                chunk_size = projection_chunk_size(memory_budget, mesh, pool.workers if pool is not None else workers)
+                logging.info('Projecting at most %d vertices at once, for a %.0f MB memory budget' % (
+                    chunk_size, memory_budget))
+        ranges = [self._shot_paving_ranges(mesh, shot) if cull_vertices else None for shot in shots]
+        if pool is not None:
+            self._compute_in_pool(pool, mesh, shots, ranges, occlusion_resolution, boundary_mode, chunk_size)
+            return
+        if workers > 1:
+            with ShotBoundaryPool(workers) as pool:
+                self._compute_in_pool(pool, mesh, shots, ranges, occlusion_resolution, boundary_mode, chunk_size)
+            return
 
-        for shot in tqdm(self.shots, desc='Computing shot boundaries'):
-            points = []
-            for i, point in enumerate(self.mesh.points):
-                pixel = shot.camera_pixel(point)
-                if shot.camera.in_frame(pixel):
-                    points.append(point)
-            shot.boundaries = shot_boundaries_from_points(points)
+        for shot, shot_ranges in tqdm(list(zip(shots, ranges)), desc='Computing shot boundaries'):
+            candidates = None
+            if shot_ranges is not None:
+                candidates = paving_points_from_ranges(mesh.paving_point_order, shot_ranges)
+            if chunk_size is None:
+                shot.boundaries = shot_boundaries_from_mesh(shot, mesh.points, candidates, mesh.facets,
+                                                            occlusion_resolution, boundary_mode)
+            else:
+                shot.boundaries = shot_boundaries_from_mesh_chunks(shot, mesh.points, mesh.origin, candidates,
+                                                                   chunk_size, boundary_mode)
+
+    def sampled_mesh(self, sample_spacing: float = None) -> Wavefront25D:
+        """The mesh decimated on a grid of sample_spacing, kept for the next calls, or the mesh itself if None"""
+        if sample_spacing is None:
+            return self.mesh
+        if self._sampled_mesh is None or self._sampled_mesh[:2] != (self.mesh, sample_spacing):
+            self._sampled_mesh = (self.mesh, sample_spacing, self.mesh.decimated(sample_spacing))
+            logging.info('Mesh decimated from %d to %d vertices (%g spacing)' % (
+                len(self.mesh.points), len(self._sampled_mesh[2].points), sample_spacing))
+        return self._sampled_mesh[2]
+
+    def _compacted_mesh(self, sample_spacing: float = None) -> Wavefront25D:
+        """
+        sampled_mesh, compacted (see Wavefront25D.compacted) in place of the float64 one, which is then released
+        """
+        if sample_spacing is None:
+            self.mesh = self.mesh.compacted()
+        else:
+            mesh = self.sampled_mesh(sample_spacing)
+            self._sampled_mesh = (self.mesh, sample_spacing, mesh.compacted())
+        return self.sampled_mesh(sample_spacing)
+
+    def shot_lookup(self, resolution: int = DEFAULT_LOOKUP_RESOLUTION) -> ShotLookup:
+        """
+        The reverse index of the shot boundaries, from the cells of a grid over the orthophoto to the shots covering
+        them, built on first call and kept until the boundaries are computed again
+        :param resolution: the number of grid cells on the largest side
+        """
+        if self._shot_lookup is None or self._shot_lookup[0] != resolution:
+            shots = self.shots
+            self._shot_lookup = (resolution, shot_lookup_from_shots([s.boundaries for s in shots],
+                                                                    [s.image_name for s in shots],
+                                                                    self.orthophoto_boundaries, resolution))
+        return self._shot_lookup[1]
+
+    def shots_at(self, x: float, y: float, resolution: int = DEFAULT_LOOKUP_RESOLUTION) -> 'list[Shot]':
+        """the shots whose boundaries cover the (x, y) ground point, in the 2.5d model coordinates"""
+        shots = self.shots
+        return [shots[i] for i in self.shot_lookup(resolution).shot_ids_at(x, y)]
+
+    @staticmethod
+    def _compute_in_pool(pool: ShotBoundaryPool, mesh: Wavefront25D, shots: 'list[Shot]', ranges: 'list[np.ndarray]',
+                         occlusion_resolution: int, boundary_mode: str, chunk_size: int = None):
+        """
+        :param chunk_size: the number of compacted mesh vertices to project at once, None for the mesh points at once
+        """
+        for shot, boundaries in zip(shots, pool.compute(shots, mesh.points, mesh.paving_point_order, ranges, mesh.facets,
+                                                        occlusion_resolution, boundary_mode, origin=mesh.origin,
+                                                        chunk_size=chunk_size)):
+            shot.boundaries = boundaries
+
+    @staticmethod
+    def _shot_paving_ranges(mesh: Wavefront25D, shot: Shot) -> np.ndarray:
+        """The mesh paving ranges covering the shot ground footprint, None if it is unbounded"""
+        footprint = shot.ground_footprint(mesh.boundaries.z_min, mesh.boundaries.z_max)
+        if footprint is None:
+            return None
+        return mesh.paving_ranges(footprint)
 
     def find_camera_by_width_height(self, width: int, height: int) -> Camera:
         cs = [c for c in self.cameras.values() if c.width == width and c.height == height]
@@ -59,7 +216,10 @@ class Reconstruction:
 
 
 class ReconstructionCollection:
-    reconstructions: 'list[Reconstruction]' = []
+    reconstructions: 'list[Reconstruction]'
+
+    def __init__(self):
+        self.reconstructions = []
 
     def append(self, reconstruction: Reconstruction):
         self.reconstructions.append(reconstruction)
@@ -71,12 +231,6 @@ class ReconstructionCollection:
         return len(self.reconstructions)
 
 
-def lin_reg(pairs: 'list[(float, float)]') -> (float, float, float, float):
-    x = [p[0] for p in pairs]
-    y = [p[1] for p in pairs]
-    return stats.linregress(x, y)
-
-
 def _parse_point_cloud_boundaries(path: str) -> Boundaries:
     with open('%s/odm_report/stats.json' % path, 'r') as fd:
         stats_json = json.load(fd)
@@ -101,15 +255,18 @@ def _parse_camera_shotgeojson(path: str, reconstruction: Reconstruction, native_
     (tr_x, tr_y, tr_z) = native_to_25d_coordinates
     with open('%s/odm_report/shots.geojson' % path, 'r') as fd:
         shots_geojson = geojson.load(fd)
-        for feat in shots_geojson['features']:
-            shot = Shot()
-            props = feat['properties']
-            shot.camera = reconstruction.find_camera_by_width_height(props['width'], props['height'])
-            shot.image_name = props['filename']
-            translation = props['translation']
-            shot.translation = (tr_x(translation[0]), tr_y(translation[1]), tr_z(translation[2]))
-            shot.rotation = props['rotation']
-            reconstruction.add_shot(shot)
+    props = [feat['properties'] for feat in shots_geojson['features']]
+    if all('capture_time' in p for p in props):
+        # the table rows are then in capture order (see Reconstruction.capture_ordered_shots)
+        props.sort(key=lambda p: p['capture_time'])
+    cameras = {size: reconstruction.find_camera_by_width_height(*size) for size in {(p['width'], p['height']) for p in props}}
+    translations = np.array([p['translation'] for p in props], dtype=float).reshape((-1, 3))
+    reconstruction.shot_table.extend(
+        [p['filename'] for p in props],
+        [cameras[(p['width'], p['height'])] for p in props],
+        np.stack([tr_x(translations[:, 0]), tr_y(translations[:, 1]), tr_z(translations[:, 2])], axis=1),
+        np.array([p['rotation'] for p in props], dtype=float).reshape((-1, 3)),
+    )
 
 
 def _native_to_model_25d_coordinates(native_boundaries: Boundaries, model_25d_boundaries: Boundaries):
@@ -136,15 +293,39 @@ def _native_to_model_25d_coordinates(native_boundaries: Boundaries, model_25d_bo
     )
 
 
-def parse_reconstruction(path: str) -> Reconstruction:
+def _no_stage(name: str) -> ContextManager:
+    return contextlib.nullcontext()
+
+
+def parse_reconstruction(path: str, cache_dir: str = None, rebuild_cache: bool = False,
+                         stage: Callable[[str], ContextManager] = None, compact: bool = False) -> Reconstruction:
+    """
+    :param path: the ODM project directory
+    :param cache_dir: where to keep a binary cache of the 2.5d model (no cache if None)
+    :param rebuild_cache: parse the 2.5d model and overwrite the cache, even if it is up to date
+    :param stage: a context manager factory wrapping the 2.5d model parsing ('obj parse') and the cameras and shots
+    parsing ('shot parse'), e.g. to time them
+    :param compact: keep the 2.5d model compacted (see Wavefront25D.compacted), its float32 vertices being memory-mapped
+    from the cache if any, for the shot boundaries to be computed within a memory budget
+    """
+    if stage is None:
+        stage = _no_stage
     reconstruction = Reconstruction()
 
-    wf = parse_wavefront_25d_obj('%s/odm_texturing_25d/odm_textured_model_geo.obj' % path)
+    obj_filename = '%s/odm_texturing_25d/odm_textured_model_geo.obj' % path
+    with stage('obj parse'):
+        if cache_dir is None:
+            wf = parse_wavefront_25d_obj(obj_filename)
+            if compact:
+                wf = wf.compacted()
+        else:
+            wf = parse_wavefront_25d_obj_cached(obj_filename, cache_dir + '/mesh', rebuild_cache, compact)
     reconstruction.mesh = wf
     reconstruction.orthophoto_boundaries = wf.boundaries
 
-    native_boundaries = _parse_point_cloud_boundaries(path)
-    _parse_camera_shotgeojson(path, reconstruction,
-                              _native_to_model_25d_coordinates(native_boundaries, wf.boundaries))
+    with stage('shot parse'):
+        native_boundaries = _parse_point_cloud_boundaries(path)
+        _parse_camera_shotgeojson(path, reconstruction,
+                                  _native_to_model_25d_coordinates(native_boundaries, wf.boundaries))
 
     return reconstruction
@@ -1,11 +1,26 @@
+from typing import TYPE_CHECKING
+
 import numpy as np
-from scipy.spatial.transform import Rotation as R, Rotation
 
 from odm_report_shot_coverage.models.camera import Camera
+from odm_report_shot_coverage.models.occlusion import DepthBuffer
+
+# scipy is imported where needed, for the lookup index and the query command not to load it
+if TYPE_CHECKING:
+    from scipy.spatial.transform import Rotation
+
+
+def _rotation_class() -> 'type[Rotation]':
+    """scipy's Rotation, imported on first use"""
+    from scipy.spatial.transform import Rotation
+    return Rotation
 
 
 class ShotBoundaries:
     path: [(float, float)]
+    # projection counters, when computed from the mesh vertices (not serialized)
+    nb_projected: int = None
+    nb_in_frame: int = None
 
     __max_val = 10000000
 
@@ -15,6 +30,12 @@ class ShotBoundaries:
     ):
         self.path = path
 
+    def in_frame_ratio(self) -> float:
+        """the ratio of the projected vertices falling within the frame, None if not counted"""
+        if self.nb_projected is None:
+            return None
+        return self.nb_in_frame / max(self.nb_projected, 1)
+
     def to_json(self) -> dict:
         return {
             'path': self.path
@@ -24,60 +45,228 @@ class ShotBoundaries:
         return '[%f, %f] x [%f, %f]' % (self.x_min, self.x_max, self.y_min, self.y_max)
 
 
+class StarPolygonAccumulator:
+    """
+    The star polygon of shot_boundaries_from_points, the points being added by chunks once their midpoint is known:
+    each slice keeps its furthest point so far, the first one on ties.
+    """
+    midpoint: np.ndarray
+
+    def __init__(self, midpoint: np.ndarray, nb_path_points: int = 24):
+        self.midpoint = np.asarray(midpoint, dtype=float)
+        self.nb_path_points = nb_path_points
+        self._dists = np.zeros(nb_path_points)
+        self._path = np.tile(self.midpoint, (nb_path_points, 1))
+
+    def add(self, points: np.ndarray):
+        """
+        :type points: np.ndarray of shape (N, >= 2)
+        """
+        xy = np.asarray(points, dtype=float)[:, :2]
+        vectors = xy - self.midpoint
+        angles = np.arctan2(vectors[:, 1], vectors[:, 0])
+        slices = np.floor(self.nb_path_points * (angles / (2 * np.pi) + 0.25)).astype(np.int64) % self.nb_path_points
+        dists = np.einsum('ij,ij->i', vectors, vectors)
+
+        slice_dists = np.zeros(self.nb_path_points)
+        np.maximum.at(slice_dists, slices, dists)
+        furthest = np.nonzero((dists == slice_dists[slices]) & (dists > 0))[0]
+        (found_slices, first) = np.unique(slices[furthest], return_index=True)
+        further = slice_dists[found_slices] > self._dists[found_slices]
+        self._dists[found_slices[further]] = slice_dists[found_slices[further]]
+        self._path[found_slices[further]] = xy[furthest[first[further]]]
+
+    def boundaries(self) -> ShotBoundaries:
+        return ShotBoundaries([(p[0], p[1]) for p in self._path.tolist()])
+
+
 def shot_boundaries_from_points(points: 'list[(float, float)]', nb_path_points: int = 24) -> ShotBoundaries:
+    """
+    A star polygon around the points: the plane is split into nb_path_points angular slices around the points midpoint,
+    and each slice contributes its furthest point (the first one on ties, the midpoint if the slice is empty).
+    :param points: the points, of at least two coordinates (x, y, ...)
+    :type points: list or np.ndarray of shape (N, >= 2)
+    """
     if len(points) == 0:
         return ShotBoundaries([])
 
-    midpoint = (sum([p[0] for p in points]) / len(points), sum([p[1] for p in points]) / len(points))
-    dist_slices = [0 for i in range(nb_path_points)]
-    furthest_slices = [midpoint for i in range(nb_path_points)]
+    xy = np.asarray(points, dtype=float)[:, :2]
+    star = StarPolygonAccumulator(xy.sum(axis=0) / len(xy), nb_path_points)
+    star.add(xy)
+    return star.boundaries()
 
-    def slice_index_dist(p: (float, float)):
-        alpha = None
-        vx = p[0] - midpoint[0]
-        vy = p[1] - midpoint[1]
-        if vx == 0:
-            alpha = np.pi / 2 if vy >= 0 else - np.pi / 2
-        else:
-            alpha = np.arctan(vy / vx)
-        i_slice = int(nb_path_points / 2 * (alpha / np.pi + 0.5))
-        if vx < 0:
-            i_slice += int(nb_path_points / 2)
-        return i_slice, vx * vx + vy * vy
 
-    for p in points:
-        (i, d) = slice_index_dist(p)
-        if d > dist_slices[i]:
-            furthest_slices[i] = p
-            dist_slices[i] = d
+def shot_convex_hull_from_points(points: 'list[(float, float)]') -> ShotBoundaries:
+    """
+    The exact convex hull of the points, counterclockwise.
+    Points strictly within the octagon of the extreme points along the axes and diagonals are discarded before
+    computing the hull.
+    :param points: the points, of at least two coordinates (x, y, ...)
+    :type points: list or np.ndarray of shape (N, >= 2)
+    """
+    if len(points) == 0:
+        return ShotBoundaries([])
+
+    xy = np.asarray(points, dtype=float)[:, :2]
+    if len(xy) >= 8:
+        # counterclockwise directions, from -x
+        directions = np.array([(-1, 0), (-1, -1), (0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1)], dtype=float)
+        corners = xy[np.argmax(xy @ directions.T, axis=0)]
+        edges = [(a, b) for (a, b) in zip(corners, np.roll(corners, -1, axis=0)) if not np.array_equal(a, b)]
+        if len(edges) >= 3:
+            inside = np.ones(len(xy), dtype=bool)
+            for (a, b) in edges:
+                inside &= (b[0] - a[0]) * (xy[:, 1] - a[1]) - (b[1] - a[1]) * (xy[:, 0] - a[0]) > 0
+            xy = xy[~inside]
+    xy = np.unique(xy, axis=0)
+    from scipy.spatial import ConvexHull, QhullError
+    try:
+        hull = ConvexHull(xy)
+    except (QhullError, ValueError):
+        # less than 3 points, or all of them aligned
+        return ShotBoundaries([(p[0], p[1]) for p in xy.tolist()])
+    return ShotBoundaries([(p[0], p[1]) for p in xy[hull.vertices].tolist()])
+
 
-    return ShotBoundaries([(p[0], p[1]) for p in furthest_slices])
+class ConvexHullAccumulator:
+    """
+    The convex hull of shot_convex_hull_from_points, the points being added by chunks: the hull of the points so far
+    and of a new chunk is the hull of them all.
+    """
+
+    def __init__(self):
+        self._xy = np.zeros((0, 2))
+
+    def add(self, points: np.ndarray):
+        """
+        :type points: np.ndarray of shape (N, >= 2)
+        """
+        if len(points) == 0:
+            return
+        xy = np.concatenate([self._xy, np.asarray(points, dtype=float)[:, :2]])
+        self._xy = np.array(shot_convex_hull_from_points(xy).path, dtype=float).reshape((-1, 2))
+
+    def boundaries(self) -> ShotBoundaries:
+        return ShotBoundaries([(p[0], p[1]) for p in self._xy.tolist()])
+
+
+BOUNDARY_BUILDERS = {
+    'star': shot_boundaries_from_points,
+    'hull': shot_convex_hull_from_points,
+}
 
 
 class Shot:
-    image_name: str
-    _rotation: (float, float, float)
-    rotation_euler_xyz = (float, float, float)
-    translation: (float, float, float)
-    camera: Camera
-    _transfo_rotation: Rotation
-    boundaries: ShotBoundaries
+    """
+    A view over one row of a ShotTable.
+    A shot created on its own gets a one row table, and is moved to the reconstruction table when added to it.
+    """
+    __slots__ = ('_table', '_index')
+
+    def __init__(self, table: 'ShotTable' = None, index: int = None):
+        if table is None:
+            table = ShotTable()
+            index = table.extend([None], [None], np.zeros((1, 3)), np.zeros((1, 3)))[0]
+        self._table = table
+        self._index = index
+
+    def __reduce__(self):
+        # only the row is pickled (e.g. when sent to a pool worker), not the whole table
+        return _standalone_shot, (self.image_name, self.camera, self.translation, self.rotation, self.boundaries)
+
+    @property
+    def image_name(self) -> str:
+        return self._table.image_names[self._index]
+
+    @image_name.setter
+    def image_name(self, new_image_name: str):
+        self._table.set_image_name(self._index, new_image_name)
+
+    @property
+    def camera(self) -> Camera:
+        return self._table.camera(self._index)
+
+    @camera.setter
+    def camera(self, new_camera: Camera):
+        self._table.camera_indices[self._index] = self._table.camera_index(new_camera)
+
+    @property
+    def translation(self) -> (float, float, float):
+        (t_x, t_y, t_z) = self._table.translations[self._index].tolist()
+        return t_x, t_y, t_z
+
+    @translation.setter
+    def translation(self, new_translation: (float, float, float)):
+        self._table.translations[self._index] = new_translation
 
     @property
     def rotation(self) -> (float, float, float):
-        return self._rotation
+        (r_x, r_y, r_z) = self._table.rotations[self._index].tolist()
+        return r_x, r_y, r_z
 
     @rotation.setter
     def rotation(self, new_rotation: (float, float, float)):
-        self._rotation = new_rotation
-        (r_x, r_y, r_z) = new_rotation
-        self._transfo_rotation = R.from_rotvec([r_x, r_y, r_z])
-        euler = self._transfo_rotation.as_euler('xyz')
-        self.rotation_euler_xyz = (euler[0], euler[1], euler[2])
+        self._table.set_rotation(self._index, new_rotation)
+
+    @property
+    def rotation_euler_xyz(self) -> (float, float, float):
+        (e_x, e_y, e_z) = self._table.euler_xyz[self._index].tolist()
+        return e_x, e_y, e_z
+
+    @property
+    def _transfo_rotation(self) -> 'Rotation':
+        return self._table.rotation[self._index]
+
+    @property
+    def _rotation_matrix(self) -> np.ndarray:
+        return self._table.rotation_matrices[self._index]
+
+    @property
+    def boundaries(self) -> ShotBoundaries:
+        return self._table.boundaries[self._index]
+
+    @boundaries.setter
+    def boundaries(self, new_boundaries: ShotBoundaries):
+        self._table.boundaries[self._index] = new_boundaries
 
     def boundaries_from_points(self, points: 'list[(float, float)]'):
         self.boundaries = shot_boundaries_from_points(points)
 
+    def ground_footprint(self, z_min: float, z_max: float) -> 'Boundaries':
+        """
+        A conservative x/y bounding box of the points within the elevation range [z_min, z_max] that can be projected
+        within the frame.
+        Such points lie within the double pyramid |x_n| <= r, |y_n| <= r (in camera coordinates, on both sides of the
+        camera, as the projection does not discard points behind it), r being the camera max_normalized_radius.
+        The intersection of a pyramid nappe with the elevation slab is either unbounded or a polytope whose vertices are
+        the apex and the intersections of the pyramid edges with the slab planes.
+        :return: the bounding box, None if unbounded, or an empty one (x_min > x_max) if no point can be seen
+        :rtype: Boundaries
+        """
+        r = self.camera.max_normalized_radius()
+        if r is None:
+            return None
+        edges = np.array([[r, r, 1], [r, -r, 1], [-r, -r, 1], [-r, r, 1]]) @ self._rotation_matrix
+        apex = np.asarray(self.translation, dtype=float)
+        vertices = []
+        if z_min <= apex[2] <= z_max:
+            vertices.append(apex)
+        for nappe in [edges, -edges]:
+            if not (np.all(nappe[:, 2] > 0) or np.all(nappe[:, 2] < 0)):
+                return None
+            for z in [z_min, z_max]:
+                t = (z - apex[2]) / nappe[:, 2]
+                vertices.extend(apex + t[t >= 0, np.newaxis] * nappe[t >= 0])
+        if len(vertices) == 0:
+            return Boundaries(x_min=np.inf, x_max=-np.inf, y_min=np.inf, y_max=-np.inf)
+        vertices = np.array(vertices)
+        return Boundaries(
+            x_min=float(vertices[:, 0].min()),
+            x_max=float(vertices[:, 0].max()),
+            y_min=float(vertices[:, 1].min()),
+            y_max=float(vertices[:, 1].max()),
+        )
+
     def __repr__(self):
         return '%s translation=(%.2f, %.2f, %.2f) rotation=(%.2f, %.2f, %.2f)' % (
             self.image_name,
@@ -92,7 +281,7 @@ class Shot:
                 'width': self.camera.width,
                 'height': self.camera.height,
             },
-            'rotation': self._rotation,
+            'rotation': self.rotation,
             'rotationEulerXYZ': self.rotation_euler_xyz,
             'translation': self.translation,
             'camera': self.camera.name,
@@ -107,11 +296,19 @@ class Shot:
         :return: (x,y,z), in camera pixel
         :rtype:(float, float, float)
         """
-        tc = abs_coords[0] - self.translation[0], abs_coords[1] - self.translation[1], abs_coords[2] - self.translation[
-            2]
-        rc = self._transfo_rotation.apply(tc, inverse=False)
+        rc = self.camera_relative_coordinates_array(np.array([abs_coords], dtype=float))[0]
         return rc[0], rc[1], rc[2]
 
+    def camera_relative_coordinates_array(self, abs_coords: np.ndarray) -> np.ndarray:
+        """
+        Batch version of camera_relative_coordinates
+        :param abs_coords: the absolute coordinates
+        :type abs_coords: np.ndarray of shape (N, 3)
+        :return: coordinates relative to the camera
+        :rtype: np.ndarray of shape (N, 3)
+        """
+        return (abs_coords - np.asarray(self.translation, dtype=float)) @ self._rotation_matrix.T
+
     def camera_pixel(self, abs_coords: (float, float, float)) -> (float, float):
         """
         from an absolute coordinates, returns the camera pixels
@@ -120,8 +317,285 @@ class Shot:
         :return: camera pixel (in [0,1] range)
         :rtype: (float, float)
         """
-        rel_coords = self.camera_relative_coordinates(abs_coords)
-        return self.camera.perspective_pixel(rel_coords)
+        pixel = self.camera_pixels(np.array([abs_coords], dtype=float))[0]
+        return pixel[0], pixel[1]
+
+    def camera_pixels(self, abs_coords: np.ndarray) -> np.ndarray:
+        """
+        Batch version of camera_pixel
+        :param abs_coords: the absolute coordinates
+        :type abs_coords: np.ndarray of shape (N, 3)
+        :return: camera pixels
+        :rtype: np.ndarray of shape (N, 2)
+        """
+        return self.camera.project(self.camera_relative_coordinates_array(abs_coords))
+
+    def ray_directions(self, pixels: np.ndarray) -> np.ndarray:
+        """
+        Inverse of camera_pixels: the absolute directions, from the shot translation, of the points seen at each pixel
+        :param pixels: camera pixels
+        :type pixels: np.ndarray of shape (N, 2)
+        :return: unit directions
+        :rtype: np.ndarray of shape (N, 3)
+        """
+        return self.camera.bearings(pixels) @ self._rotation_matrix
+
+
+def _standalone_shot(image_name: str, camera: Camera, translation: (float, float, float),
+                     rotation: (float, float, float), boundaries: ShotBoundaries) -> Shot:
+    shot = Shot()
+    shot.image_name = image_name
+    shot.camera = camera
+    shot.translation = translation
+    shot.rotation = rotation
+    shot.boundaries = boundaries
+    return shot
+
+
+class ShotTable:
+    """
+    The shots, column wise: image names, translations, rotations (as vectors, matrices and xyz Euler angles) and
+    camera indices are NumPy arrays, Shot objects being views over one row.
+    Rows are only appended, never moved, so the views stay valid; the image name order and the stacked Rotation are
+    computed once, when first needed after a change.
+    """
+    cameras: 'list[Camera]'
+
+    def __init__(self):
+        self.cameras = []
+        self._size = 0
+        self._image_names = np.empty(0, dtype=object)
+        self._translations = np.zeros((0, 3))
+        self._rotations = np.zeros((0, 3))
+        self._rotation_matrices = np.zeros((0, 3, 3))
+        self._euler_xyz = np.zeros((0, 3))
+        self._camera_indices = np.zeros(0, dtype=np.int32)
+        self._boundaries = np.empty(0, dtype=object)
+        self._sorted_shots = None
+        self._rotation = None
+        # id of each camera: index in cameras
+        self._camera_ids = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def image_names(self) -> np.ndarray:
+        return self._image_names[:self._size]
+
+    @property
+    def translations(self) -> np.ndarray:
+        return self._translations[:self._size]
+
+    @property
+    def rotations(self) -> np.ndarray:
+        """rotation vectors, of shape (N, 3)"""
+        return self._rotations[:self._size]
+
+    @property
+    def rotation_matrices(self) -> np.ndarray:
+        return self._rotation_matrices[:self._size]
+
+    @property
+    def euler_xyz(self) -> np.ndarray:
+        return self._euler_xyz[:self._size]
+
+    @property
+    def camera_indices(self) -> np.ndarray:
+        """index of each shot camera in cameras, -1 if not set"""
+        return self._camera_indices[:self._size]
+
+    @property
+    def boundaries(self) -> np.ndarray:
+        return self._boundaries[:self._size]
+
+    @property
+    def rotation(self) -> 'Rotation':
+        """all the shot rotations, stacked into a single Rotation"""
+        if self._rotation is None:
+            self._rotation = _rotation_class().from_rotvec(self.rotations)
+        return self._rotation
+
+    def camera(self, index: int) -> Camera:
+        camera_index = self._camera_indices[index]
+        return None if camera_index < 0 else self.cameras[camera_index]
+
+    def camera_index(self, camera: Camera) -> int:
+        """the index of the camera in cameras, appending it if it is not there yet"""
+        if camera is None:
+            return -1
+        index = self._camera_ids.get(id(camera))
+        if index is None:
+            index = self._camera_ids[id(camera)] = len(self.cameras)
+            self.cameras.append(camera)
+        return index
+
+    def extend(self, image_names: 'list[str]', cameras: 'list[Camera]', translations: np.ndarray,
+               rotations: np.ndarray) -> range:
+        """
+        Append shots in bulk, the rotation matrices and Euler angles being computed at once
+        :param translations: np.ndarray of shape (N, 3)
+        :param rotations: rotation vectors, np.ndarray of shape (N, 3)
+        :return: the indices of the new rows
+        """
+        count = len(image_names)
+        self._reserve(self._size + count)
+        rows = range(self._size, self._size + count)
+        self._size += count
+        self._image_names[rows.start:rows.stop] = image_names
+        self._translations[rows.start:rows.stop] = translations
+        self._rotations[rows.start:rows.stop] = rotations
+        rotation = _rotation_class().from_rotvec(np.asarray(rotations, dtype=float).reshape((-1, 3)))
+        self._rotation_matrices[rows.start:rows.stop] = rotation.as_matrix()
+        self._euler_xyz[rows.start:rows.stop] = rotation.as_euler('xyz')
+        self._camera_indices[rows.start:rows.stop] = [self.camera_index(c) for c in cameras]
+        self._boundaries[rows.start:rows.stop] = None
+        self._sorted_shots = None
+        # a bulk fill of an empty table already has its stacked rotation
+        self._rotation = rotation if rows.start == 0 else None
+        return rows
+
+    def _reserve(self, capacity: int):
+        if capacity <= len(self._image_names):
+            return
+        capacity = max(capacity, 2 * len(self._image_names))
+        for name in ['_image_names', '_translations', '_rotations', '_rotation_matrices', '_euler_xyz',
+                     '_camera_indices', '_boundaries']:
+            array = getattr(self, name)
+            grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[:self._size] = array[:self._size]
+            setattr(self, name, grown)
+
+    def append(self, shot: Shot) -> Shot:
+        """Copy a shot into a new row, and point it to that row"""
+        index = self.extend([shot.image_name], [shot.camera], np.array([shot.translation]),
+                            np.array([shot.rotation]))[0]
+        self._boundaries[index] = shot.boundaries
+        (shot._table, shot._index) = (self, index)
+        return shot
+
+    def set_image_name(self, index: int, image_name: str):
+        self._image_names[index] = image_name
+        self._sorted_shots = None
+
+    def set_rotation(self, index: int, rotation: (float, float, float)):
+        self._rotations[index] = rotation
+        single = _rotation_class().from_rotvec(self._rotations[index])
+        self._rotation_matrices[index] = single.as_matrix()
+        self._euler_xyz[index] = single.as_euler('xyz')
+        self._rotation = None
+
+    def row_shots(self) -> 'list[Shot]':
+        """views over all the shots, in the order they were added"""
+        return [Shot(self, i) for i in range(self._size)]
+
+    def sorted_shots(self) -> 'list[Shot]':
+        """views over all the shots, by image name"""
+        if self._sorted_shots is None:
+            order = np.argsort(self.image_names, kind='stable')
+            self._sorted_shots = [Shot(self, int(i)) for i in order]
+        return self._sorted_shots
+
+
+def shot_boundaries_from_mesh(shot: Shot, points: np.ndarray, candidates: np.ndarray = None, facets: np.ndarray = None,
+                              occlusion_resolution: int = None, boundary_mode: str = 'star') -> ShotBoundaries:
+    """
+    Project the mesh points onto the shot and compute the boundaries around the ones within the frame
+    :param shot: the shot
+    :param points: mesh vertices
+    :type points: np.ndarray of shape (N, 3)
+    :param candidates: sorted indices of the only vertices to be projected (all of them if None)
+    :type candidates: np.ndarray of shape (K,)
+    :param facets: mesh facets, only needed with occlusion_resolution
+    :type facets: np.ndarray of shape (M, 3)
+    :param occlusion_resolution: if set, the facets are rasterized into a depth buffer of that largest side (in pixels)
+    and the vertices hidden behind them are discarded
+    :param boundary_mode: how the boundaries are built around the visible vertices, a BOUNDARY_BUILDERS key
+    """
+    if occlusion_resolution is not None:
+        (points, facets) = _mesh_around(points, facets, candidates)
+    elif candidates is not None:
+        points = points[candidates]
+    rel_coords = shot.camera_relative_coordinates_array(points)
+    pixels = shot.camera.project(rel_coords)
+    visible = shot.camera.in_frame_mask(pixels)
+    nb_in_frame = int(np.count_nonzero(visible))
+    if occlusion_resolution is not None:
+        depth_buffer = DepthBuffer(shot.camera, occlusion_resolution)
+        depth_buffer.rasterize(pixels, rel_coords[:, 2], facets)
+        visible &= depth_buffer.visible_mask(pixels, rel_coords[:, 2])
+    boundaries = BOUNDARY_BUILDERS[boundary_mode](points[visible])
+    boundaries.nb_projected = len(points)
+    boundaries.nb_in_frame = nb_in_frame
+    return boundaries
+
+
+def shot_boundaries_from_mesh_chunks(shot: Shot, points: np.ndarray, origin: np.ndarray, candidates: np.ndarray = None,
+                                     chunk_size: int = 1000000, boundary_mode: str = 'star') -> ShotBoundaries:
+    """
+    shot_boundaries_from_mesh (without occlusion) in bounded memory: the vertices, stored relative to an origin (e.g.
+    as float32), are projected chunk_size at a time and the in-frame ones are folded into the boundaries chunk by
+    chunk. The star polygon needs the midpoint of all the in-frame vertices first, so only a bit per projected vertex
+    is kept from the projection pass to the folding one.
+    :param points: mesh vertices, relative to origin
+    :type points: np.ndarray of shape (N, 3)
+    :param origin: the absolute coordinates of the points origin
+    :param candidates: sorted indices of the only vertices to be projected (all of them if None)
+    :param chunk_size: vertices projected at once
+    :param boundary_mode: 'star' or 'hull'
+    """
+    origin = np.asarray(origin, dtype=float)
+    nb_projected = len(points) if candidates is None else len(candidates)
+
+    def chunk_points(start: int) -> np.ndarray:
+        indices = slice(start, start + chunk_size) if candidates is None else candidates[start:start + chunk_size]
+        return np.asarray(points[indices], dtype=float) + origin
+
+    hull = ConvexHullAccumulator() if boundary_mode == 'hull' else None
+    in_frame_bits = []
+    (xy_sum, nb_in_frame) = (np.zeros(2), 0)
+    for start in range(0, nb_projected, chunk_size):
+        chunk = chunk_points(start)
+        visible = shot.camera.in_frame_mask(shot.camera.project(shot.camera_relative_coordinates_array(chunk)))
+        nb_in_frame += int(np.count_nonzero(visible))
+        if hull is not None:
+            hull.add(chunk[visible])
+        else:
+            xy_sum += chunk[visible, :2].sum(axis=0)
+            in_frame_bits.append(np.packbits(visible))
+
+    if hull is not None:
+        boundaries = hull.boundaries()
+    elif nb_in_frame == 0:
+        boundaries = ShotBoundaries([])
+    else:
+        star = StarPolygonAccumulator(xy_sum / nb_in_frame)
+        for (start, bits) in zip(range(0, nb_projected, chunk_size), in_frame_bits):
+            chunk = chunk_points(start)
+            star.add(chunk[np.unpackbits(bits, count=len(chunk)).astype(bool)])
+        boundaries = star.boundaries()
+    boundaries.nb_projected = nb_projected
+    boundaries.nb_in_frame = nb_in_frame
+    return boundaries
+
+
+def _mesh_around(points: np.ndarray, facets: np.ndarray, candidates: np.ndarray) -> (np.ndarray, np.ndarray):
+    """
+    The candidate vertices, plus the facets whose x/y bounding box overlaps the candidates one (a large facet may
+    span it without any candidate vertex, and still hide some), reindexed over the returned vertices.
+    """
+    facets = np.asarray(facets).reshape((-1, 3))
+    if candidates is None:
+        return points, facets
+    if len(candidates) == 0:
+        return points[candidates], np.zeros((0, 3), dtype=np.int32)
+    candidate_points = points[candidates, :2]
+    (low, high) = (candidate_points.min(axis=0), candidate_points.max(axis=0))
+    corners = [points[facets[:, k], :2] for k in range(3)]
+    overlaps = np.all((np.minimum.reduce(corners) <= high) & (np.maximum.reduce(corners) >= low), axis=1)
+    facets = facets[overlaps]
+    vertices = np.union1d(candidates, facets.ravel())
+    return points[vertices], np.searchsorted(vertices, facets).astype(np.int32)
 
 
 class Boundaries:
@@ -0,0 +1,130 @@
+import itertools
+import multiprocessing
+import multiprocessing.pool
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from tqdm import tqdm
+
+from odm_report_shot_coverage.models.shot import Shot, ShotBoundaries, shot_boundaries_from_mesh, \
+    shot_boundaries_from_mesh_chunks
+from odm_report_shot_coverage.models.wavefront_25d import paving_points_from_ranges
+
+# per worker process, the memory-mapped mesh arrays, by file name, along with the (inode, mtime) of the mapped file
+_worker_arrays: 'dict[str, ((int, int), np.ndarray)]' = {}
+
+
+def _forget_other_arrays(file_names: 'set[str]'):
+    """Unmap the arrays of a previous computation, e.g. of another project when the pool is shared"""
+    for file_name in [f for f in _worker_arrays if f not in file_names]:
+        del _worker_arrays[file_name]
+
+
+def _worker_mesh_array(file_name: str) -> np.ndarray:
+    """the mapped array, mapped again if the file was replaced since, e.g. a mesh cache rebuilt in a shared pool"""
+    stat = os.stat(file_name)
+    version = (stat.st_ino, stat.st_mtime_ns)
+    if file_name not in _worker_arrays or _worker_arrays[file_name][0] != version:
+        _worker_arrays[file_name] = (version, np.load(file_name, mmap_mode='r'))
+    return _worker_arrays[file_name][1]
+
+
+def _compute_shot_boundaries_task(task: (str, str, str, Shot, np.ndarray, int, str, np.ndarray, int)) -> ShotBoundaries:
+    (points_file, paving_point_order_file, facets_file, shot, paving_ranges, occlusion_resolution, boundary_mode,
+     origin, chunk_size) = task
+    _forget_other_arrays({points_file, paving_point_order_file, facets_file})
+    candidates = None
+    if paving_ranges is not None:
+        candidates = paving_points_from_ranges(_worker_mesh_array(paving_point_order_file), paving_ranges)
+    if chunk_size is not None:
+        return shot_boundaries_from_mesh_chunks(shot, _worker_mesh_array(points_file), origin, candidates, chunk_size,
+                                                boundary_mode)
+    facets = None if facets_file is None else _worker_mesh_array(facets_file)
+    return shot_boundaries_from_mesh(shot, _worker_mesh_array(points_file), candidates, facets, occlusion_resolution,
+                                     boundary_mode)
+
+
+class ShotBoundaryPool:
+    """
+    A process pool computing shot boundaries.
+    Mesh vertices are written once to a memory-mapped .npy file, so only the shots are sent to the workers,
+    and the vertices are shared through the OS page cache instead of being pickled per task.
+    The pool can be kept open over several meshes (e.g. the projects of a batch), each worker only keeping the arrays
+    of the current one mapped.
+    """
+    workers: int
+    _pool: multiprocessing.pool.Pool = None
+    _tmp_dir: str = None
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._file_counter = itertools.count()
+
+    def __enter__(self) -> 'ShotBoundaryPool':
+        self._pool = multiprocessing.Pool(self.workers)
+        self._tmp_dir = tempfile.mkdtemp(prefix='odm-shot-coverage-')
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+        if self._tmp_dir is not None:
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+            self._tmp_dir = None
+
+    def share_array(self, array: np.ndarray) -> str:
+        """
+        Make a mesh array available to the workers
+        :return: the memory-mapped file name, or the original one if the array is already memory-mapped
+        """
+        if isinstance(array, np.memmap) and array.filename is not None and array.filename.endswith('.npy'):
+            on_disk = np.load(array.filename, mmap_mode='r')
+            if on_disk.shape == array.shape and on_disk.dtype == array.dtype and on_disk.offset == array.offset:
+                return array.filename
+        file_name = os.path.join(self._tmp_dir, 'mesh-%d.npy' % next(self._file_counter))
+        np.save(file_name, np.ascontiguousarray(array))
+        return file_name
+
+    def compute(self, shots: 'list[Shot]', points: np.ndarray, paving_point_order: np.ndarray = None,
+                paving_ranges: 'list[np.ndarray]' = None, facets: np.ndarray = None, occlusion_resolution: int = None,
+                boundary_mode: str = 'star', desc: str = 'Computing shot boundaries', origin: np.ndarray = None,
+                chunk_size: int = None) -> 'list[ShotBoundaries]':
+        """
+        Compute the boundaries of each shot over the mesh points
+        :param paving_point_order: the mesh paving vertex order, needed with paving_ranges
+        :param paving_ranges: per shot, the paving ranges of the only vertices to be projected (None for all vertices)
+        :param facets: the mesh facets, needed with occlusion_resolution
+        :param occlusion_resolution: the depth buffer size to discard hidden vertices (no occlusion if None)
+        :param boundary_mode: how the boundaries are built around the visible vertices
+        :param origin: the origin of the points, if relative to it
+        :param chunk_size: if set, project the points by chunks of that size (see shot_boundaries_from_mesh_chunks)
+        :return: the boundaries, in the same order as shots
+        """
+        if paving_ranges is None:
+            paving_ranges = [None] * len(shots)
+        points_file = self.share_array(points)
+        shared_files = [points_file]
+        paving_point_order_file = None
+        if paving_point_order is not None:
+            paving_point_order_file = self.share_array(paving_point_order)
+            shared_files.append(paving_point_order_file)
+        facets_file = None
+        if occlusion_resolution is not None:
+            facets_file = self.share_array(facets)
+            shared_files.append(facets_file)
+        try:
+            tasks = [(points_file, paving_point_order_file, facets_file, shot, ranges, occlusion_resolution,
+                      boundary_mode, origin, chunk_size) for shot, ranges in zip(shots, paving_ranges)]
+            results = self._pool.imap(_compute_shot_boundaries_task, tasks)
+            return list(tqdm(results, total=len(shots), desc=desc))
+        finally:
+            for file_name in shared_files:
+                if os.path.dirname(file_name) == self._tmp_dir:
+                    os.remove(file_name)
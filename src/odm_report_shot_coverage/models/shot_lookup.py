@@ -0,0 +1,123 @@
+import json
+import os
+
+import numpy as np
+
+from odm_report_shot_coverage.models.coverage import CoverageRaster
+from odm_report_shot_coverage.models.shot import Boundaries, ShotBoundaries
+
+SHOT_LOOKUP_FILE_NAME = 'shot_lookup.json'
+SHOT_LOOKUP_BINARY_FILE_NAME = 'shot_lookup.bin'
+# cells on the largest side of the grid
+DEFAULT_LOOKUP_RESOLUTION = 512
+# the binary types of the shot indices, by their shotIdType name
+_SHOT_ID_TYPES = {'uint16': '<u2', 'uint32': '<u4'}
+
+
+class ShotLookup:
+    """
+    Which shots cover a ground point: for each cell of a grid over the orthophoto boundaries (row 0 at the top, as in
+    the coverage raster), the indices of the shots whose boundaries contain the cell center, as compressed sparse rows.
+    The shots of cell c are shot_ids[indptr[c]:indptr[c + 1]], in increasing order.
+    """
+    boundaries: Boundaries
+    width: int
+    height: int
+    indptr: np.ndarray
+    shot_ids: np.ndarray
+    image_names: 'list[str]'
+
+    def __init__(self, boundaries: Boundaries, width: int, height: int, indptr: np.ndarray, shot_ids: np.ndarray,
+                 image_names: 'list[str]'):
+        """
+        :param indptr: the offset of each cell shots in shot_ids, of shape (width * height + 1,)
+        :param image_names: the image name of each shot index
+        """
+        self.boundaries = boundaries
+        self.width = width
+        self.height = height
+        self.indptr = indptr
+        self.shot_ids = shot_ids
+        self.image_names = image_names
+
+    def cell_at(self, x: float, y: float) -> int:
+        """the flat index (row * width + column) of the cell containing the ground point, None if out of the grid"""
+        i = int(np.floor((x - self.boundaries.x_min) / (self.boundaries.x_max - self.boundaries.x_min) * self.width))
+        j = int(np.floor((self.boundaries.y_max - y) / (self.boundaries.y_max - self.boundaries.y_min) * self.height))
+        if not (0 <= i < self.width and 0 <= j < self.height):
+            return None
+        return j * self.width + i
+
+    def shot_ids_at(self, x: float, y: float) -> np.ndarray:
+        """the indices of the shots covering the ground point, at the grid resolution"""
+        cell = self.cell_at(x, y)
+        if cell is None:
+            return np.zeros(0, dtype=self.shot_ids.dtype)
+        return np.asarray(self.shot_ids[self.indptr[cell]:self.indptr[cell + 1]])
+
+    def image_names_at(self, x: float, y: float) -> 'list[str]':
+        return [self.image_names[i] for i in self.shot_ids_at(x, y)]
+
+    def counts(self) -> np.ndarray:
+        """the number of shots covering each cell, of shape (height, width)"""
+        return np.diff(self.indptr).reshape((self.height, self.width))
+
+    def save(self, target_dir: str):
+        """
+        Write the grid, shot image names and array types as {SHOT_LOOKUP_FILE_NAME}, and the little endian arrays,
+        indptr then shot_ids, as {SHOT_LOOKUP_BINARY_FILE_NAME}, to be memory-mapped or fetched by the viewer
+        """
+        indptr = self.indptr.astype('<u4')
+        shot_id_type = 'uint16' if len(self.image_names) <= np.iinfo(np.uint16).max + 1 else 'uint32'
+        shot_ids = self.shot_ids.astype(_SHOT_ID_TYPES[shot_id_type])
+        with open(os.path.join(target_dir, SHOT_LOOKUP_BINARY_FILE_NAME), 'wb') as fd:
+            fd.write(indptr.tobytes())
+            fd.write(shot_ids.tobytes())
+        with open(os.path.join(target_dir, SHOT_LOOKUP_FILE_NAME), 'w') as fd:
+            json.dump({
+                'width': self.width,
+                'height': self.height,
+                'boundaries': self.boundaries.to_json(),
+                'shotIdType': shot_id_type,
+                'nbEntries': len(shot_ids),
+                'imageName': self.image_names,
+            }, fd, separators=(',', ':'))
+
+
+def shot_lookup_from_shots(shots_boundaries: 'list[ShotBoundaries]', image_names: 'list[str]', boundaries: Boundaries,
+                           resolution: int = DEFAULT_LOOKUP_RESOLUTION) -> ShotLookup:
+    """
+    Rasterize every shot boundaries on the grid, and group the (cell, shot) pairs by cell
+    :param shots_boundaries: the boundaries of each shot, None if not computed
+    :param boundaries: the ground extent of the grid
+    :param resolution: the number of cells on the largest side of the grid, the cells being about square
+    """
+    x_extent = boundaries.x_max - boundaries.x_min
+    y_extent = boundaries.y_max - boundaries.y_min
+    scale = resolution / max(x_extent, y_extent)
+    (width, height) = (max(1, int(round(x_extent * scale))), max(1, int(round(y_extent * scale))))
+    grid = CoverageRaster(boundaries, width, height)
+
+    cells = [grid.cells_within(b) if b is not None else np.zeros(0, dtype=np.int64) for b in shots_boundaries]
+    shot_ids = np.repeat(np.arange(len(cells)), [len(c) for c in cells])
+    cells = np.concatenate(cells) if len(cells) > 0 else np.zeros(0, dtype=np.int64)
+    order = np.argsort(cells, kind='stable')
+    indptr = np.zeros(width * height + 1, dtype=np.int64)
+    np.cumsum(np.bincount(cells, minlength=width * height), out=indptr[1:])
+    return ShotLookup(boundaries, width, height, indptr, shot_ids[order], list(image_names))
+
+
+def load_shot_lookup(target_dir: str) -> ShotLookup:
+    """The lookup saved in target_dir, its arrays being memory-mapped, so that a query only reads the cell it needs"""
+    with open(os.path.join(target_dir, SHOT_LOOKUP_FILE_NAME)) as fd:
+        header = json.load(fd)
+    (width, height) = (header['width'], header['height'])
+    binary_file = os.path.join(target_dir, SHOT_LOOKUP_BINARY_FILE_NAME)
+    indptr = np.memmap(binary_file, dtype='<u4', mode='r', shape=(width * height + 1,))
+    shot_ids = np.zeros(0, dtype=_SHOT_ID_TYPES[header['shotIdType']])
+    if header['nbEntries'] > 0:
+        shot_ids = np.memmap(binary_file, dtype=shot_ids.dtype, mode='r', offset=indptr.nbytes,
+                             shape=(header['nbEntries'],))
+    b = header['boundaries']
+    return ShotLookup(Boundaries(x_min=b['xMin'], x_max=b['xMax'], y_min=b['yMin'], y_max=b['yMax']), width, height,
+                      indptr, shot_ids, header['imageName'])
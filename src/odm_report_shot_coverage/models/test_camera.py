@@ -33,6 +33,8 @@ class Test(TestCase):
         self.assertEqual(3000, got.width, 'width')
         self.assertEqual(4000, got.height, 'height')
         self.assertEqual(0.5207834102328533, got.focal, 'focal')
+        self.assertEqual(-0.010331518981731644, got.c_x, 'c_x')
+        self.assertEqual(-0.0036169971231284, got.c_y, 'c_y')
         self.assertEqual(-0.10638507280457302, got.k1, 'k1')
         self.assertEqual(0.06769290794144624, got.k2, 'k2')
         self.assertEqual(-0.005369531191619131, got.k3, 'k3')
@@ -67,3 +69,54 @@ class Test(TestCase):
         got = Fixtures.a_camera_gopro8_linear().perspective_pixel((0, given_x, self.given_z))
         self.assertAlmostEqual(0, got[0], 3)
         self.assertAlmostEqual(0.5, got[1], 3)
+
+    def test_perspective_pixels_matches_scalar(self):
+        camera = Fixtures.a_camera_gopro8_linear()
+        given = np.array([(0, 0, self.given_z), (1.5, -2, self.given_z), (-3, 4, 2 * self.given_z)], dtype=float)
+
+        got = camera.perspective_pixels(given)
+
+        self.assertEqual((3, 2), got.shape)
+        for rel, pixel in zip(given, got):
+            expected = camera.perspective_pixel(tuple(rel))
+            self.assertAlmostEqual(expected[0], pixel[0])
+            self.assertAlmostEqual(expected[1], pixel[1])
+
+    def test_in_frame_mask(self):
+        camera = Fixtures.a_camera_gopro8_linear()
+        given = np.array([(0, 0), (0.3, 0.4), (0.4, 0.3), (-0.2, -0.5), (np.nan, 0)])
+
+        got = camera.in_frame_mask(given)
+
+        self.assertEqual([True, True, False, True, False], got.tolist())
+
+    def test_max_normalized_radius_bounds_in_frame_points(self):
+        camera = Fixtures.a_camera_gopro8_linear()
+        r = np.linspace(0, 5, 200001)
+        rel_coords = np.stack([r, np.zeros(len(r)), np.ones(len(r))], axis=1)
+
+        got = camera.max_normalized_radius()
+
+        in_frame_radius = r[np.hypot(*camera.perspective_pixels(rel_coords).T) <=
+                            np.hypot(camera._width_rel_max, camera._height_rel_max)]
+        self.assertGreaterEqual(got, in_frame_radius.max())
+        self.assertAlmostEqual(in_frame_radius.max(), got, 4)
+
+    def test_bearings_inverts_perspective(self):
+        camera = Fixtures.a_camera_gopro8_linear()
+        xy_n = np.array([(0, 0), (0.3, -0.2), (-0.9, 0.5), (0.6, 0.85)])
+        rel_coords = np.concatenate([xy_n * 4, np.full((len(xy_n), 1), 4)], axis=1)
+
+        got = camera.bearings(camera.perspective_pixels(rel_coords))
+
+        np.testing.assert_allclose(xy_n, got[:, :2] / got[:, 2:], atol=1e-9)
+        np.testing.assert_allclose(1, np.linalg.norm(got, axis=1))
+
+    def test_project_uses_the_projection_type(self):
+        camera = Fixtures.a_camera_gopro8_linear()
+        camera.projection_type = 'fisheye'
+        given = np.array([(1.5, -2, self.given_z)])
+
+        got = camera.project(given)
+
+        self.assertFalse(np.allclose(camera.perspective_pixels(given), got))
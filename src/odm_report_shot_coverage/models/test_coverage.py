@@ -0,0 +1,56 @@
+from unittest import TestCase
+
+import numpy as np
+
+from odm_report_shot_coverage.models.coverage import polygon_mask, CoverageRaster, coverage_raster_from_shots
+from odm_report_shot_coverage.models.shot import Boundaries, ShotBoundaries
+
+
+class TestCoverage(TestCase):
+    def test_polygon_mask_square(self):
+        centers = np.arange(6) + 0.5
+
+        got = polygon_mask([(1, 1), (4, 1), (4, 3), (1, 3)], centers, centers)
+
+        expected = np.zeros((6, 6), dtype=bool)
+        expected[1:3, 1:4] = True
+        np.testing.assert_array_equal(expected, got)
+
+    def test_polygon_mask_concave(self):
+        # 3 x..x
+        # 2 x..x
+        # 1 xxxx
+        # 0 xxxx
+        centers = np.arange(4) + 0.5
+        path = [(0, 0), (4, 0), (4, 4), (3, 4), (3, 2), (1, 2), (1, 4), (0, 4)]
+
+        got = polygon_mask(path, centers, centers)
+
+        np.testing.assert_array_equal([
+            [True, True, True, True],
+            [True, True, True, True],
+            [True, False, False, True],
+            [True, False, False, True],
+        ], got)
+
+    def test_coverage_raster_counts(self):
+        raster = CoverageRaster(Boundaries(x_min=0, x_max=10, y_min=0, y_max=5), 10, 5)
+
+        raster.add(ShotBoundaries([(0, 0), (6, 0), (6, 5), (0, 5)]))
+        raster.add(ShotBoundaries([(4, 0), (12, 0), (12, 2), (4, 2)]))
+        raster.add(ShotBoundaries([]))
+
+        self.assertEqual(2, raster.counts[4, 5])
+        self.assertEqual(1, raster.counts[0, 5])
+        self.assertEqual(1, raster.counts[4, 9])
+        self.assertEqual(0, raster.counts[0, 9])
+        stats = raster.stats()
+        self.assertEqual([12, 34, 4], stats['histogram'])
+        self.assertEqual(2, stats['maxCount'])
+        self.assertAlmostEqual(38 / 50, stats['coveredRatio'])
+
+    def test_coverage_raster_from_shots_outside(self):
+        got = coverage_raster_from_shots(iter([ShotBoundaries([(20, 20), (30, 20), (30, 30)])]),
+                                         Boundaries(x_min=0, x_max=10, y_min=0, y_max=5), 10, 5)
+
+        self.assertEqual(0, got.counts.sum())
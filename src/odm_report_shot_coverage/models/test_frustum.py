@@ -0,0 +1,45 @@
+from unittest import TestCase
+
+import numpy as np
+
+from odm_report_shot_coverage.models.frustum import shot_frustum_boundaries, frame_edge_pixels, clip_polygon, \
+    ray_height_field_intersections
+from odm_report_shot_coverage.models.height_field import HeightField
+from odm_report_shot_coverage.models.shot import Boundaries
+from odm_report_shot_coverage.models.test_fixtures import TestFixtures as Fixtures
+
+
+def _a_sloped_height_field() -> HeightField:
+    xs, ys = np.meshgrid(np.arange(100) - 49.5, np.arange(100) - 49.5, indexing='ij')
+    return HeightField(Boundaries(x_min=-50, x_max=50, y_min=-50, y_max=50), 0.1 * xs + 0.05 * ys)
+
+
+class TestFrustum(TestCase):
+    def test_frustum_boundaries_project_on_the_frame_border(self):
+        shot = Fixtures.a_shot()
+        shot.rotation = (np.pi + 0.2, 0.1, 0)
+        shot.translation = (3, -2, 25)
+        height_field = _a_sloped_height_field()
+
+        got = shot_frustum_boundaries(shot, height_field, 8)
+
+        self.assertEqual(32, len(got.path))
+        path = np.array(got.path)
+        hits = np.concatenate([path, height_field.heights_at(path[:, 0], path[:, 1])[:, np.newaxis]], axis=1)
+        np.testing.assert_allclose(frame_edge_pixels(shot, 8), shot.camera_pixels(hits), atol=1e-3)
+
+    def test_rays_above_the_horizon_are_dropped(self):
+        directions = np.array([(0, 0, -1), (1, 0, 0), (0.5, 0, 0.1)])
+
+        got = ray_height_field_intersections(np.array([0, 0, 10]), directions, _a_sloped_height_field(), -5, 5)
+
+        np.testing.assert_allclose([0, 0, 0], got[0], atol=1e-9)
+        self.assertTrue(np.all(np.isnan(got[1:])))
+
+    def test_clip_polygon(self):
+        path = np.array([(-1, -1), (3, -1), (3, 1), (-1, 1)], dtype=float)
+
+        got = clip_polygon(path, Boundaries(x_min=0, x_max=2, y_min=0, y_max=5))
+
+        self.assertEqual({(0, 0), (2, 0), (2, 1), (0, 1)}, set(map(tuple, got.tolist())))
+        self.assertEqual(0, len(clip_polygon(path, Boundaries(x_min=5, x_max=6, y_min=0, y_max=5))))
@@ -0,0 +1,26 @@
+from unittest import TestCase
+
+import numpy as np
+
+from odm_report_shot_coverage.models.height_field import height_field_from_points
+from odm_report_shot_coverage.models.shot import Boundaries
+
+
+class TestHeightField(TestCase):
+    def test_height_field_from_points(self):
+        points = np.array([(0.5, 0.5, 1), (0.5, 0.6, 3), (2.5, 0.5, 5), (0.5, 1.5, 7)])
+
+        got = height_field_from_points(points, Boundaries(x_min=0, x_max=3, y_min=0, y_max=2), (3, 2))
+
+        # the empty cells take the nearest cell value
+        np.testing.assert_array_equal([[2, 7], [2, 7], [5, 5]], got.heights)
+
+    def test_heights_at_bilinear(self):
+        xs, ys = np.meshgrid(np.arange(10) + 0.5, np.arange(5) + 0.5, indexing='ij')
+        points = np.stack([xs.ravel(), ys.ravel(), 2 * xs.ravel() - ys.ravel()], axis=1)
+        height_field = height_field_from_points(points, Boundaries(x_min=0, x_max=10, y_min=0, y_max=5), (10, 5))
+
+        got = height_field.heights_at(np.array([0.5, 3.2, 7.75]), np.array([0.5, 1.1, 4.5]))
+
+        np.testing.assert_allclose([0.5, 5.3, 11], got)
+        self.assertEqual(2 * 0.5 - 0.5, height_field.heights_at(-5, -5))
@@ -0,0 +1,96 @@
+from unittest import TestCase
+
+import numpy as np
+
+from odm_report_shot_coverage.models.occlusion import DepthBuffer
+from odm_report_shot_coverage.models.shot import shot_boundaries_from_mesh
+from odm_report_shot_coverage.models.test_fixtures import TestFixtures as Fixtures
+
+
+def _a_grid(x_range: (float, float), y_range: (float, float), z: float, nb: int) -> (np.ndarray, np.ndarray):
+    """a flat square grid mesh of nb x nb vertices, two facets per cell"""
+    xs, ys = np.meshgrid(np.linspace(x_range[0], x_range[1], nb), np.linspace(y_range[0], y_range[1], nb))
+    points = np.stack([xs.ravel(), ys.ravel(), np.full(xs.size, z)], axis=1)
+    corners = (np.arange(nb - 1)[:, np.newaxis] * nb + np.arange(nb - 1)).ravel()
+    facets = np.concatenate([
+        np.stack([corners, corners + 1, corners + nb], axis=1),
+        np.stack([corners + 1, corners + nb + 1, corners + nb], axis=1),
+    ])
+    return points, facets.astype(np.int32)
+
+
+def _a_nadir_shot():
+    shot = Fixtures.a_shot()
+    shot.rotation = (np.pi, 0, 0)
+    shot.translation = (0, 0, 10)
+    return shot
+
+
+class TestOcclusion(TestCase):
+    def test_rasterize_depths(self):
+        shot = _a_nadir_shot()
+        (points, facets) = _a_grid((-1, 1), (-1, 1), 4, 2)
+        rel_coords = shot.camera_relative_coordinates_array(points)
+        depth_buffer = DepthBuffer(shot.camera, 64)
+
+        depth_buffer.rasterize(shot.camera.perspective_pixels(rel_coords), rel_coords[:, 2], facets)
+
+        (height, width) = depth_buffer.depths.shape
+        self.assertEqual((64, 48), (height, width))
+        self.assertAlmostEqual(6, depth_buffer.depths[height // 2, width // 2])
+        self.assertEqual(np.inf, depth_buffer.depths[0, 0])
+        np.testing.assert_allclose(6, depth_buffer.depths[np.isfinite(depth_buffer.depths)])
+
+    def test_visible_mask_hidden_below_a_roof(self):
+        shot = _a_nadir_shot()
+        (ground, ground_facets) = _a_grid((-8, 8), (-8, 8), 0, 33)
+        (roof, roof_facets) = _a_grid((-2, 2), (-2, 2), 5, 5)
+        points = np.concatenate([ground, roof])
+        facets = np.concatenate([ground_facets, roof_facets + len(ground)])
+        rel_coords = shot.camera_relative_coordinates_array(points)
+        pixels = shot.camera.perspective_pixels(rel_coords)
+        depth_buffer = DepthBuffer(shot.camera, 256)
+        depth_buffer.rasterize(pixels, rel_coords[:, 2], facets)
+
+        got = depth_buffer.visible_mask(pixels, rel_coords[:, 2])
+
+        in_frame = shot.camera.in_frame_mask(pixels)
+        below_roof = np.all(np.abs(ground[:, :2]) <= 3.5, axis=1)
+        away_from_roof = np.any(np.abs(ground[:, :2]) >= 4.5, axis=1)
+        self.assertFalse(np.any(got[:len(ground)][below_roof]))
+        self.assertTrue(np.all(got[:len(ground)][away_from_roof & in_frame[:len(ground)]]))
+        self.assertTrue(np.all(got[len(ground):]))
+
+    def test_no_self_occlusion_on_open_ground(self):
+        shot = _a_nadir_shot()
+        (points, facets) = _a_grid((-15, 15), (-15, 15), 0, 61)
+        points[:, 2] = np.sin(points[:, 0] / 3) * np.cos(points[:, 1] / 4)
+
+        got = shot_boundaries_from_mesh(shot, points, facets=facets, occlusion_resolution=256)
+
+        self.assertEqual(shot_boundaries_from_mesh(shot, points).path, got.path)
+
+    def test_occlusion_with_candidates(self):
+        shot = _a_nadir_shot()
+        (points, facets) = _a_grid((-15, 15), (-15, 15), 0, 61)
+        candidates = np.nonzero(np.all(np.abs(points[:, :2]) <= 10, axis=1))[0]
+
+        got = shot_boundaries_from_mesh(shot, points, candidates, facets, occlusion_resolution=256)
+
+        self.assertEqual(shot_boundaries_from_mesh(shot, points, facets=facets, occlusion_resolution=256).path,
+                         got.path)
+
+    def test_occlusion_by_a_facet_spanning_the_candidates(self):
+        shot = _a_nadir_shot()
+        (ground, ground_facets) = _a_grid((-15, 15), (-15, 15), 0, 61)
+        # one facet over part of the candidates, none of its vertices being one
+        roof = np.array([[-14, -14, 5], [14, -14, 5], [-14, 14, 5]], dtype=float)
+        points = np.concatenate([ground, roof])
+        facets = np.concatenate([ground_facets, [[len(ground), len(ground) + 1, len(ground) + 2]]])
+        candidates = np.nonzero(np.all(np.abs(points[:, :2]) <= 10, axis=1))[0]
+
+        got = shot_boundaries_from_mesh(shot, points, candidates, facets, occlusion_resolution=256)
+
+        full = shot_boundaries_from_mesh(shot, points, facets=facets, occlusion_resolution=256)
+        self.assertNotEqual(shot_boundaries_from_mesh(shot, points, candidates).path, full.path)
+        self.assertEqual(full.path, got.path)
@@ -0,0 +1,85 @@
+from unittest import TestCase
+
+import numpy as np
+
+from odm_report_shot_coverage.models.overlap import padded_convex_hulls, polygon_areas, clip_convex_polygons, \
+    simplified_convex_polygons, bounding_box_pairs, overlap_graph_from_boundaries
+from odm_report_shot_coverage.models.shot import ShotBoundaries
+
+
+def _square(x: float, y: float, side: float = 1) -> 'list[(float, float)]':
+    return [(x, y), (x + side, y), (x + side, y + side), (x, y + side)]
+
+
+class TestOverlap(TestCase):
+    def test_padded_convex_hulls(self):
+        (got, counts) = padded_convex_hulls([_square(0, 0) + [(0.5, 0.5)], [(0, 0), (1, 0), (0, 1), (1, 1), (0.5, 2)],
+                                             []])
+
+        self.assertEqual((3, 5, 2), got.shape)
+        self.assertEqual([4, 5, 0], counts.tolist())
+        self.assertEqual([1, 1.5, 0], polygon_areas(got, counts).tolist())
+
+    def test_clip_convex_polygons(self):
+        subjects = padded_convex_hulls([_square(0, 0), _square(0, 0), _square(0, 0, 2), _square(0, 0)])
+        clips = padded_convex_hulls([_square(0.5, 0.25), _square(3, 3), _square(0.5, 0.5), [(0, 0), (2, 0), (0, 2)]])
+
+        got = polygon_areas(*clip_convex_polygons(*subjects, *clips))
+
+        np.testing.assert_allclose([0.375, 0, 1, 1], got)
+
+    def test_clip_concave_subject(self):
+        # an L shape, clipped by a square over its notch
+        subject = np.array([[[0, 0], [2, 0], [2, 1], [1, 1], [1, 2], [0, 2]]], dtype=float)
+        clip = padded_convex_hulls([_square(0.5, 0.5)])
+
+        got = polygon_areas(*clip_convex_polygons(subject, np.array([6]), *clip))
+
+        np.testing.assert_allclose([0.75], got)
+
+    def test_simplified_convex_polygons(self):
+        # a 16 sides regular polygon, and a square with a nearly flat vertex on each side
+        angles = np.linspace(0, 2 * np.pi, 16, endpoint=False)
+        circle = np.stack([np.cos(angles), np.sin(angles)], axis=1).tolist()
+        bulged = [(0, 0), (0.5, -0.001), (1, 0), (1.001, 0.5), (1, 1), (0.5, 1.001), (0, 1), (-0.001, 0.5)]
+        (hulls, counts) = padded_convex_hulls([circle, bulged, _square(0, 0)])
+
+        (got, got_counts) = simplified_convex_polygons(hulls, counts, tolerance=1e-3)
+
+        self.assertEqual([16, 4, 4], got_counts.tolist())
+        self.assertEqual(sorted(_square(0, 0)), sorted(map(tuple, got[1, :4].tolist())))
+        areas = polygon_areas(got, got_counts)
+        np.testing.assert_allclose(polygon_areas(hulls, counts), areas, rtol=4e-3)
+
+    def test_bounding_box_pairs(self):
+        rng = np.random.default_rng(3)
+        corners = rng.uniform(0, 100, (300, 2))
+        boxes = np.concatenate([corners, corners + rng.uniform(1, 15, (300, 2))], axis=1)
+
+        got = bounding_box_pairs(boxes)
+
+        (a, b) = (boxes[:, np.newaxis, :], boxes[np.newaxis, :, :])
+        intersecting = (a[..., 0] < b[..., 2]) & (b[..., 0] < a[..., 2]) & (a[..., 1] < b[..., 3]) & \
+            (b[..., 1] < a[..., 3])
+        expected = np.argwhere(np.triu(intersecting, 1))
+        self.assertEqual(expected.tolist(), got.tolist())
+
+    def test_overlap_graph(self):
+        # two flight lines along x, of three shots each, the second one flown back
+        positions = np.array([[0, 0], [0.5, 0], [1, 0], [1, 0.75], [0.5, 0.75], [0, 0.75]], dtype=float)
+        boundaries = [ShotBoundaries(_square(x - 0.5, y - 0.5)) for (x, y) in positions]
+
+        got = overlap_graph_from_boundaries(boundaries, positions)
+
+        pairs = {tuple(p): (a, f) for (p, a, f) in zip(got.pairs.tolist(), got.areas.tolist(), got.forward.tolist())}
+        self.assertAlmostEqual(0.5, pairs[(0, 1)][0])
+        self.assertTrue(pairs[(0, 1)][1])
+        self.assertAlmostEqual(0.25, pairs[(0, 5)][0])
+        self.assertFalse(pairs[(0, 5)][1])
+        self.assertNotIn((0, 3), pairs)
+        np.testing.assert_allclose([0.5] * 6, got.max_ratios(True))
+        np.testing.assert_allclose([0.25] * 6, got.max_ratios(False))
+
+        as_json = got.to_json(['%d.jpeg' % i for i in range(6)])
+        self.assertEqual([[1, 0.5, 'forward'], [5, 0.25, 'side'], [4, 0.125, 'side']], as_json['adjacency'][0])
+        self.assertEqual(0.25, as_json['sideOverlap'][0])
@@ -0,0 +1,99 @@
+from unittest import TestCase
+
+import numpy as np
+
+from odm_report_shot_coverage.models.camera import Camera
+from odm_report_shot_coverage.models.projection import PROJECTIONS, projection_for
+
+
+def _a_camera() -> Camera:
+    camera = Camera()
+    camera.width = 4000
+    camera.height = 3000
+    camera.focal = 0.52
+    camera.c_x = -0.01
+    camera.c_y = 0.004
+    camera.k1 = -0.1
+    camera.k2 = 0.06
+    camera.k3 = -0.005
+    camera.p1 = -0.0009
+    camera.p2 = -0.0007
+    return camera
+
+
+class TestProjection(TestCase):
+    # reference values from the scalar OpenSfM formulas
+    def test_perspective_reference(self):
+        got = PROJECTIONS['perspective'].project(_a_camera(), np.array([(1.5, -2.0, 10.0)]))
+
+        np.testing.assert_allclose([(0.07753078125, -0.103374375)], got, rtol=1e-12)
+
+    def test_brown_reference(self):
+        got = PROJECTIONS['brown'].project(_a_camera(), np.array([(1.5, -2.0, 10.0)]))
+
+        np.testing.assert_allclose([(0.06751963603515626, -0.09941909804687502)], got, rtol=1e-12)
+
+    def test_fisheye_reference(self):
+        got = PROJECTIONS['fisheye'].project(_a_camera(), np.array([(3.0, 4.0, 2.0)]))
+
+        np.testing.assert_allclose([(0.36348205271093226, 0.4846427369479097)], got, rtol=1e-12)
+
+    def test_spherical_reference(self):
+        got = PROJECTIONS['spherical'].project(_a_camera(), np.array([(1.0, -1.0, -1.0)]))
+
+        np.testing.assert_allclose([(0.375, -0.09795663800765181)], got, rtol=1e-12)
+
+    def test_bearings_inverts_project(self):
+        camera = _a_camera()
+        rng = np.random.default_rng(42)
+        directions = rng.uniform((-0.7, -0.5, 1), (0.7, 0.5, 1), (100, 3))
+        for name in ['perspective', 'brown', 'fisheye', 'spherical']:
+            projection = PROJECTIONS[name]
+
+            got = projection.bearings(camera, projection.project(camera, directions))
+
+            np.testing.assert_allclose(directions / np.linalg.norm(directions, axis=1)[:, np.newaxis], got, atol=1e-9,
+                                       err_msg=name)
+
+    def test_max_normalized_radius_bounds_in_frame_points(self):
+        camera = _a_camera()
+        frame_radius = np.hypot(camera._width_rel_max, camera._height_rel_max)
+        r = np.linspace(0, 5, 50001)
+        for name in ['perspective', 'brown', 'fisheye']:
+            projection = PROJECTIONS[name]
+            for angle in np.linspace(0, 2 * np.pi, 8, endpoint=False):
+                rel_coords = np.stack([r * np.cos(angle), r * np.sin(angle), np.ones(len(r))], axis=1)
+                pixels = projection.project(camera, rel_coords)
+
+                got = projection.max_normalized_radius(camera)
+
+                in_frame = np.hypot(*pixels.T) <= frame_radius
+                self.assertGreaterEqual(got, r[in_frame].max(), name)
+
+    def test_folding_distortion(self):
+        camera = _a_camera()
+        camera.k3 = -0.02
+        (camera.p1, camera.p2) = (0, 0)
+        projection = PROJECTIONS['brown']
+        r = np.linspace(0, 10, 100001)
+        rel_coords = np.stack([r, np.zeros(len(r)), np.ones(len(r))], axis=1)
+
+        got = projection.project(camera, rel_coords)
+
+        folded = np.isnan(got[:, 0])
+        self.assertTrue(folded.any())
+        self.assertTrue(np.all(np.diff(got[~folded, 0]) > 0))
+        self.assertGreaterEqual(r[~folded].max(), projection.max_normalized_radius(camera) * (1 - 1e-4))
+
+    def test_max_normalized_radius_unbounded(self):
+        camera = _a_camera()
+        camera.focal = 0.1
+
+        self.assertIsNone(PROJECTIONS['fisheye'].max_normalized_radius(camera))
+        self.assertIsNone(PROJECTIONS['spherical'].max_normalized_radius(camera))
+
+    def test_projection_for(self):
+        self.assertIs(PROJECTIONS['perspective'], projection_for(None))
+        self.assertIs(PROJECTIONS['brown'], projection_for('brown'))
+        with self.assertLogs(level='WARNING'):
+            self.assertIs(PROJECTIONS['perspective'], projection_for('dual'))
@@ -1,12 +1,131 @@
+import json
+import os
+import tempfile
 from unittest import TestCase
 
-from odm_report_shot_coverage.models.reconstruction import parse_reconstruction
+import numpy as np
+
+from odm_report_shot_coverage.models.reconstruction import parse_reconstruction, Reconstruction, \
+    ReconstructionCollection, MemoryBudgetError, projection_chunk_size
+from odm_report_shot_coverage.models.shot import Boundaries, ShotBoundaries
+from odm_report_shot_coverage.models.test_fixtures import TestFixtures as Fixtures
+from odm_report_shot_coverage.models.wavefront_25d import Wavefront25D
+from odm_report_shot_coverage.scripts.synthetic_project import write_synthetic_project
 
 
 class Test(TestCase):
 
     def test_json_parse_reconstruction(self):
-        got = parse_reconstruction('example/project')
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            write_synthetic_project(tmp_dir, nb_shots=9, nb_vertices=2000, with_images=False)
+
+            got = parse_reconstruction(tmp_dir)
+            cached = parse_reconstruction(tmp_dir, cache_dir=os.path.join(tmp_dir, 'cache'))
+
+        self.assertEqual(9, len(got.shots), 'shots')
+        self.assertAlmostEqual(2000, len(got.mesh.points), delta=100, msg='points')
+        self.assertEqual(got.mesh.points.tolist(), cached.mesh.points.tolist())
+        self.assertEqual([(s.image_name, s.translation) for s in got.shots],
+                         [(s.image_name, s.translation) for s in cached.shots])
+
+    def test_capture_ordered_shots(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            write_synthetic_project(tmp_dir, nb_shots=4, nb_vertices=500, with_images=False)
+            with open(tmp_dir + '/odm_report/shots.geojson') as fd:
+                shots_geojson = json.load(fd)
+            features = shots_geojson['features']
+            # listed out of capture order, and not captured in image name order
+            for (feature, capture_time) in zip(features, [3, 1, 2, 0]):
+                feature['properties']['capture_time'] = capture_time
+            shots_geojson['features'] = features[1:] + features[:1]
+            with open(tmp_dir + '/odm_report/shots.geojson', 'w') as fd:
+                json.dump(shots_geojson, fd)
+
+            got = parse_reconstruction(tmp_dir)
+
+        self.assertEqual(['SYNTH00003.jpeg', 'SYNTH00001.jpeg', 'SYNTH00002.jpeg', 'SYNTH00000.jpeg'],
+                         [s.image_name for s in got.capture_ordered_shots])
+        self.assertEqual(['SYNTH00000.jpeg', 'SYNTH00001.jpeg', 'SYNTH00002.jpeg', 'SYNTH00003.jpeg'],
+                         [s.image_name for s in got.shots])
+
+    def test_reconstructions_do_not_share_state(self):
+        first = Reconstruction()
+        first.add_camera('gopro', Fixtures.a_camera_gopro8_linear())
+        first.add_shot(Fixtures.a_shot())
+        collection = ReconstructionCollection()
+        collection.append(first)
+
+        second = Reconstruction()
+
+        self.assertEqual({}, second.cameras)
+        self.assertEqual([], second.shots)
+        self.assertEqual(0, len(ReconstructionCollection()))
+
+    def test_compute_shot_boundaries_sampled(self):
+        xs, ys = np.meshgrid(np.linspace(-10, 10, 201), np.linspace(-10, 10, 201))
+        mesh = Wavefront25D()
+        mesh.points = np.stack([xs.ravel(), ys.ravel(), np.full(xs.size, -5.0)], axis=1)
+        mesh.facets = np.zeros((0, 3), dtype=np.int32)
+        mesh._compute_boundaries()
+        mesh._compute_paving()
+        reconstruction = Reconstruction()
+        reconstruction.mesh = mesh
+        shot = Fixtures.a_shot()
+        shot.rotation = (np.pi, 0, 0)
+        reconstruction.add_shot(shot)
+        reconstruction.compute_shot_boundaries()
+        full = reconstruction.shots[0].boundaries
+
+        reconstruction.compute_shot_boundaries(sample_spacing=0.5)
+
+        sampled = reconstruction.shots[0].boundaries
+        self.assertLess(sampled.nb_projected, full.nb_projected / 10)
+        # the polygon extents are off by less than the spacing
+        self.assertTrue(np.allclose(np.min(full.path, axis=0), np.min(sampled.path, axis=0), atol=0.5))
+        self.assertTrue(np.allclose(np.max(full.path, axis=0), np.max(sampled.path, axis=0), atol=0.5))
+        self.assertIs(reconstruction.sampled_mesh(0.5), reconstruction.sampled_mesh(0.5))
+        self.assertIs(mesh, reconstruction.sampled_mesh())
+
+    def test_compute_shot_boundaries_within_memory_budget(self):
+        xs, ys = np.meshgrid(np.linspace(-10, 10, 201), np.linspace(-10, 10, 201))
+        mesh = Wavefront25D()
+        mesh.points = np.stack([xs.ravel(), ys.ravel(), -5 + np.sin(xs.ravel() * ys.ravel()) / 10], axis=1)
+        mesh.facets = np.zeros((0, 3), dtype=np.int32)
+        mesh._compute_boundaries()
+        mesh._compute_paving()
+        reconstruction = Reconstruction()
+        reconstruction.mesh = mesh
+        shot = Fixtures.a_shot()
+        shot.rotation = (np.pi, 0, 0)
+        reconstruction.add_shot(shot)
+        reconstruction.compute_shot_boundaries()
+        full = reconstruction.shots[0].boundaries
+
+        # a few MB over the interpreter, for the vertices to be projected in two chunks
+        reconstruction.compute_shot_boundaries(memory_budget=155)
+
+        got = reconstruction.shots[0].boundaries
+        self.assertEqual(full.nb_in_frame, got.nb_in_frame)
+        self.assertTrue(np.allclose(full.path, got.path, atol=1e-5))
+        self.assertLess(projection_chunk_size(155, reconstruction.mesh), len(mesh.points))
+        # the float64 vertices are released
+        self.assertEqual(np.float32, reconstruction.mesh.points.dtype)
+        with self.assertRaisesRegex(MemoryBudgetError, r'at least \d+ MB are needed'):
+            reconstruction.compute_shot_boundaries(memory_budget=1)
+        with self.assertRaises(ValueError):
+            reconstruction.compute_shot_boundaries(memory_budget=155, occlusion_resolution=128)
+
+    def test_shots_at(self):
+        reconstruction = Reconstruction()
+        reconstruction.orthophoto_boundaries = Boundaries(x_min=0, x_max=10, y_min=0, y_max=10)
+        for (name, x) in [('a.jpeg', 0), ('b.jpeg', 4)]:
+            shot = Fixtures.a_shot()
+            shot.image_name = name
+            shot.boundaries = ShotBoundaries([(x, 0), (x + 6, 0), (x + 6, 10), (x, 10)])
+            reconstruction.add_shot(shot)
+
+        got = reconstruction.shots_at(5, 5)
 
-        self.assertEqual(60, len(got.shots), 'shots')
-        self.assertEqual(48509, len(got.mesh.points), 'points')
+        self.assertEqual(['a.jpeg', 'b.jpeg'], [s.image_name for s in got])
+        self.assertEqual(['b.jpeg'], [s.image_name for s in reconstruction.shots_at(9, 1)])
+        self.assertIs(reconstruction.shot_lookup(), reconstruction.shot_lookup())
@@ -1,9 +1,13 @@
+import pickle
 from unittest import TestCase
 
 import numpy as np
 
 from odm_report_shot_coverage.models.point import Point
-from odm_report_shot_coverage.models.shot import Shot, shot_boundaries_from_points
+from odm_report_shot_coverage.models.shot import Shot, ShotTable, ShotBoundaries, shot_boundaries_from_points, \
+    shot_convex_hull_from_points, shot_boundaries_from_mesh, shot_boundaries_from_mesh_chunks, StarPolygonAccumulator, \
+    ConvexHullAccumulator
+from odm_report_shot_coverage.models.test_fixtures import TestFixtures as Fixtures
 
 
 class TestShot(TestCase):
@@ -70,6 +74,53 @@ class TestShot(TestCase):
         self.assertAlmostEqual(-2, got[1])
         self.assertAlmostEqual(3, got[2])
 
+    def test_camera_pixels_matches_scalar(self):
+        shot = Fixtures.a_shot()
+        given = np.array([(0.4, 2.5, -3.1), (1, 1, -5), (-2, 0.5, -4)])
+
+        got = shot.camera_pixels(given)
+
+        self.assertEqual((3, 2), got.shape)
+        for abs_coords, pixel in zip(given, got):
+            expected = shot.camera_pixel(tuple(abs_coords))
+            self.assertAlmostEqual(expected[0], pixel[0])
+            self.assertAlmostEqual(expected[1], pixel[1])
+
+    def test_ground_footprint_nadir(self):
+        shot = Fixtures.a_shot()
+        shot.rotation = (np.pi, 0, 0)
+        shot.translation = (10, 20, 30)
+        r = shot.camera.max_normalized_radius()
+
+        got = shot.ground_footprint(0, 10)
+
+        self.assertAlmostEqual(10 - 30 * r, got.x_min)
+        self.assertAlmostEqual(10 + 30 * r, got.x_max)
+        self.assertAlmostEqual(20 - 30 * r, got.y_min)
+        self.assertAlmostEqual(20 + 30 * r, got.y_max)
+
+    def test_ground_footprint_horizontal_is_unbounded(self):
+        shot = Fixtures.a_shot()
+        shot.rotation = (np.pi / 2, 0, 0)
+        shot.translation = (10, 20, 30)
+
+        got = shot.ground_footprint(0, 10)
+
+        self.assertIsNone(got)
+
+    def test_ground_footprint_contains_in_frame_points(self):
+        shot = Fixtures.a_shot()
+        rng = np.random.default_rng(1)
+        points = rng.uniform(-20, 20, (20000, 3))
+        points[:, 2] = rng.uniform(-4, -2, len(points))
+
+        got = shot.ground_footprint(-4, -2)
+
+        in_frame = points[shot.camera.in_frame_mask(shot.camera_pixels(points))]
+        self.assertGreater(len(in_frame), 0)
+        self.assertTrue(np.all(in_frame[:, 0] >= got.x_min) and np.all(in_frame[:, 0] <= got.x_max))
+        self.assertTrue(np.all(in_frame[:, 1] >= got.y_min) and np.all(in_frame[:, 1] <= got.y_max))
+
 
 class TestShotBoundaries(TestCase):
     def test_extend_one(self):
@@ -142,3 +193,169 @@ class TestShotBoundaries(TestCase):
         sb = shot_boundaries_from_points(points, 8)
 
         self.assertEqual([(12, -12), (12, -6), (12, 0), (15, 12), (6, 6), (0, 0), (0, -9), (3, -12)], sb.path)
+
+    def test_shot_boundaries_from_points_array(self):
+        points = [(0, -9, -10), (3, -12, -10), (6, 6, -10), (12, 9, -10), (15, 12, -10), (9, 0, -10)]
+
+        got = shot_boundaries_from_points(np.array(points), 8)
+
+        self.assertEqual(shot_boundaries_from_points(points, 8).path, got.path)
+
+    def test_star_polygon_accumulator(self):
+        points = np.random.default_rng(1).uniform(-10, 10, (500, 2))
+        star = StarPolygonAccumulator(points.mean(axis=0), 16)
+
+        for chunk in np.array_split(points, 7):
+            star.add(chunk)
+
+        self.assertEqual(shot_boundaries_from_points(points, 16).path, star.boundaries().path)
+
+
+class TestShotConvexHull(TestCase):
+    def test_convex_hull_grid(self):
+        xs, ys = np.meshgrid(np.arange(0, 11), np.arange(0, 6))
+        points = np.stack([xs.ravel(), ys.ravel(), np.zeros(xs.size)], axis=1)
+
+        got = shot_convex_hull_from_points(points)
+
+        self.assertEqual([(0, 0), (10, 0), (10, 5), (0, 5)], got.path)
+
+    def test_convex_hull_star(self):
+        angles = np.linspace(0, 2 * np.pi, 40, endpoint=False)
+        radii = np.where(np.arange(40) % 2 == 0, 10, 4)
+        points = np.stack([radii * np.cos(angles), radii * np.sin(angles)], axis=1)
+
+        got = shot_convex_hull_from_points(np.concatenate([points, points / 2]))
+
+        self.assertEqual(20, len(got.path))
+        self.assertTrue(np.allclose(10, np.hypot(*np.array(got.path).T)))
+
+    def test_convex_hull_degenerate(self):
+        self.assertEqual([], shot_convex_hull_from_points([]).path)
+        self.assertEqual([(1, 2)], shot_convex_hull_from_points([(1, 2)] * 10).path)
+        self.assertEqual([(0, 0), (1, 1), (2, 2)], shot_convex_hull_from_points([(2, 2), (0, 0), (1, 1)]).path)
+
+    def test_convex_hull_accumulator(self):
+        points = np.random.default_rng(2).uniform(-10, 10, (500, 2))
+        hull = ConvexHullAccumulator()
+
+        for chunk in np.array_split(points, 7) + [np.zeros((0, 2))]:
+            hull.add(chunk)
+
+        self.assertEqual(shot_convex_hull_from_points(points).path, hull.boundaries().path)
+
+
+class TestShotBoundariesFromMeshChunks(TestCase):
+    @staticmethod
+    def _a_nadir_shot_and_mesh() -> (Shot, np.ndarray):
+        shot = Fixtures.a_shot()
+        shot.rotation = (np.pi, 0, 0)
+        shot.translation = (0, 0, 0)
+        points = np.random.default_rng(3).uniform(-10, 10, (20000, 3))
+        points[:, 2] = points[:, 2] / 10 - 5
+        return shot, points
+
+    def test_star_matches_the_unchunked_boundaries(self):
+        (shot, points) = self._a_nadir_shot_and_mesh()
+        origin = np.array([3.0, -2.0, -5.0])
+        candidates = np.arange(0, len(points), 3)
+
+        got = shot_boundaries_from_mesh_chunks(shot, (points - origin).astype(np.float32), origin, candidates,
+                                               chunk_size=1000)
+
+        expected = shot_boundaries_from_mesh(shot, points, candidates)
+        self.assertTrue(np.allclose(expected.path, got.path, atol=1e-5))
+        self.assertEqual((expected.nb_projected, expected.nb_in_frame), (got.nb_projected, got.nb_in_frame))
+
+    def test_hull_matches_the_unchunked_boundaries(self):
+        (shot, points) = self._a_nadir_shot_and_mesh()
+        origin = np.zeros(3)
+
+        got = shot_boundaries_from_mesh_chunks(shot, points, origin, chunk_size=1000, boundary_mode='hull')
+
+        expected = shot_boundaries_from_mesh(shot, points, boundary_mode='hull')
+        self.assertEqual(sorted(expected.path), sorted(got.path))
+
+    def test_nothing_in_frame(self):
+        (shot, points) = self._a_nadir_shot_and_mesh()
+
+        got = shot_boundaries_from_mesh_chunks(shot, points, np.array([1000.0, 0, 0]), chunk_size=1000)
+
+        self.assertEqual(([], 0), (got.path, got.nb_in_frame))
+
+
+class TestShotTable(TestCase):
+    @staticmethod
+    def _a_table(nb_shots: int) -> ShotTable:
+        camera = Fixtures.a_camera_gopro8_linear()
+        table = ShotTable()
+        table.extend(['%03d.jpeg' % ((7 * i) % nb_shots) for i in range(nb_shots)], [camera] * nb_shots,
+                     np.arange(3 * nb_shots, dtype=float).reshape((-1, 3)),
+                     np.tile([np.pi, 0, 0], (nb_shots, 1)))
+        return table
+
+    def test_sorted_shots(self):
+        table = self._a_table(10)
+
+        got = table.sorted_shots()
+
+        self.assertEqual(['%03d.jpeg' % i for i in range(10)], [s.image_name for s in got])
+        self.assertIs(got, table.sorted_shots())
+        self.assertEqual([table.cameras[0]], table.cameras)
+
+    def test_views_match_a_standalone_shot(self):
+        table = self._a_table(5)
+        standalone = Fixtures.a_shot()
+        view = table.sorted_shots()[3]
+
+        view.rotation = standalone.rotation
+        view.translation = standalone.translation
+
+        self.assertEqual(standalone.rotation_euler_xyz, view.rotation_euler_xyz)
+        np.testing.assert_allclose(standalone._rotation_matrix, table.rotation_matrices[view._index])
+        self.assertEqual(standalone.camera_pixel((1, 2, 3)), view.camera_pixel((1, 2, 3)))
+
+    def test_stacked_rotation(self):
+        table = self._a_table(4)
+
+        np.testing.assert_allclose(table.rotation_matrices, table.rotation.as_matrix())
+        self.assertIs(table.rotation, table.rotation)
+        view = table.sorted_shots()[1]
+        view.rotation = (0, 0.5, 0)
+        np.testing.assert_allclose(table.rotation_matrices, table.rotation.as_matrix())
+        np.testing.assert_allclose(table.rotation_matrices[view._index], view._transfo_rotation.as_matrix())
+
+    def test_camera_index(self):
+        table = self._a_table(3)
+        other = Fixtures.a_camera_gopro8_linear()
+
+        self.assertEqual((0, 1, 1, -1), (table.camera_index(table.cameras[0]), table.camera_index(other),
+                                         table.camera_index(other), table.camera_index(None)))
+        self.assertEqual(2, len(table.cameras))
+
+    def test_append_moves_the_shot_to_the_table(self):
+        table = self._a_table(3)
+        shot = Fixtures.a_shot()
+        shot.boundaries = ShotBoundaries([(1, 2)])
+        shot.camera.name = 'gopro8'
+
+        table.append(shot)
+        shot.translation = (1, 2, 3)
+
+        self.assertEqual(4, len(table))
+        self.assertEqual((1, 2, 3), tuple(table.translations[3]))
+        self.assertEqual([(1, 2)], table.boundaries[3].path)
+        self.assertEqual({'path': [(1, 2)]}, shot.to_json()['boundaries'])
+        self.assertEqual((1, 2, 3), shot.to_json()['translation'])
+        self.assertEqual('a.jpeg', table.sorted_shots()[-1].image_name)
+
+    def test_pickle_only_the_row(self):
+        small = self._a_table(2).sorted_shots()[0]
+        large = self._a_table(2000).sorted_shots()[0]
+
+        got = pickle.loads(pickle.dumps(large))
+
+        self.assertEqual(len(pickle.dumps(small)), len(pickle.dumps(large)))
+        self.assertEqual(large.image_name, got.image_name)
+        self.assertEqual(large.translation, got.translation)
+        self.assertEqual(large.rotation, got.rotation)
@@ -0,0 +1,61 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from odm_report_shot_coverage.models.shot import shot_boundaries_from_mesh
+from odm_report_shot_coverage.models.shot_boundary_pool import ShotBoundaryPool
+from odm_report_shot_coverage.models.test_fixtures import TestFixtures as Fixtures
+
+
+class TestShotBoundaryPool(TestCase):
+    def test_compute_keeps_shots_order(self):
+        xs, ys = np.meshgrid(np.linspace(-10, 10, 60), np.linspace(-10, 10, 60))
+        points = np.stack([xs.ravel(), ys.ravel(), np.full(xs.size, -5.0)], axis=1)
+        shots = []
+        for i in range(5):
+            shot = Fixtures.a_shot()
+            shot.image_name = '%d.jpeg' % i
+            shot.rotation = (np.pi, 0, 0)
+            shot.translation = (i * 2 - 4, i - 2, 0)
+            shots.append(shot)
+
+        with ShotBoundaryPool(2) as pool:
+            got = pool.compute(shots, points)
+
+        self.assertEqual([shot_boundaries_from_mesh(s, points).path for s in shots], [b.path for b in got])
+        self.assertTrue(all(len(b.path) > 0 for b in got))
+        self.assertEqual([len(points)] * 5, [b.nb_projected for b in got])
+        self.assertEqual([shot_boundaries_from_mesh(s, points).nb_in_frame for s in shots], [b.nb_in_frame for b in got])
+
+    def test_compute_with_occlusion(self):
+        xs, ys = np.meshgrid(np.linspace(-10, 10, 30), np.linspace(-10, 10, 30))
+        points = np.stack([xs.ravel(), ys.ravel(), np.sin(xs.ravel()) - 5], axis=1)
+        corners = (np.arange(29)[:, np.newaxis] * 30 + np.arange(29)).ravel()
+        facets = np.concatenate([np.stack([corners, corners + 1, corners + 30], axis=1),
+                                 np.stack([corners + 1, corners + 31, corners + 30], axis=1)]).astype(np.int32)
+        shot = Fixtures.a_shot()
+
+        with ShotBoundaryPool(2) as pool:
+            got = pool.compute([shot], points, facets=facets, occlusion_resolution=128)
+
+        self.assertEqual(shot_boundaries_from_mesh(shot, points, facets=facets, occlusion_resolution=128).path,
+                         got[0].path)
+
+    def test_compute_maps_again_a_replaced_file(self):
+        xs, ys = np.meshgrid(np.linspace(-10, 10, 30), np.linspace(-10, 10, 30))
+        points = np.stack([xs.ravel(), ys.ravel(), np.full(xs.size, -5.0)], axis=1)
+        shot = Fixtures.a_shot()
+        shot.rotation = (np.pi, 0, 0)
+        got = []
+        with tempfile.TemporaryDirectory() as tmp_dir, ShotBoundaryPool(1) as pool:
+            for given in (points, points * [0.5, 0.5, 1]):
+                # rebuilt at the same path, as the mesh cache is
+                np.save(tmp_dir + '/new.npy', given)
+                os.replace(tmp_dir + '/new.npy', tmp_dir + '/points.npy')
+                got.append(pool.compute([shot], np.load(tmp_dir + '/points.npy', mmap_mode='r'))[0].path)
+
+        self.assertEqual([shot_boundaries_from_mesh(shot, points).path,
+                          shot_boundaries_from_mesh(shot, points * [0.5, 0.5, 1]).path], got)
+        self.assertNotEqual(got[0], got[1])
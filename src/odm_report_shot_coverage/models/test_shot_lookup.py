@@ -0,0 +1,51 @@
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from odm_report_shot_coverage.models.coverage import coverage_raster_from_shots
+from odm_report_shot_coverage.models.shot import Boundaries, ShotBoundaries
+from odm_report_shot_coverage.models.shot_lookup import shot_lookup_from_shots, load_shot_lookup
+
+
+def _rectangle(x_min: float, y_min: float, x_max: float, y_max: float) -> ShotBoundaries:
+    return ShotBoundaries([(x_min, y_min), (x_max, y_min), (x_max, y_max), (x_min, y_max)])
+
+
+class TestShotLookup(TestCase):
+    boundaries = Boundaries(x_min=0, x_max=10, y_min=0, y_max=5)
+    shots_boundaries = [_rectangle(0, 0, 6, 5), _rectangle(4, 0, 12, 2), None, ShotBoundaries([])]
+
+    def test_shot_ids_at(self):
+        got = shot_lookup_from_shots(self.shots_boundaries, ['a', 'b', 'c', 'd'], self.boundaries, resolution=10)
+
+        self.assertEqual((10, 5), (got.width, got.height))
+        self.assertEqual([0], got.shot_ids_at(1, 4).tolist())
+        self.assertEqual([0, 1], got.shot_ids_at(5.5, 0.5).tolist())
+        self.assertEqual(['b'], got.image_names_at(9.9, 1.2))
+        self.assertEqual([], got.shot_ids_at(9, 4).tolist())
+        self.assertEqual([], got.shot_ids_at(-1, 4).tolist())
+        self.assertEqual([], got.shot_ids_at(5, 5.5).tolist())
+
+    def test_counts_match_coverage_raster(self):
+        rng = np.random.default_rng(1)
+        corners = rng.uniform(0, 10, (50, 2))
+        shots_boundaries = [_rectangle(x, y / 2, x + 3, y / 2 + 2) for (x, y) in corners]
+
+        got = shot_lookup_from_shots(shots_boundaries, [str(i) for i in range(50)], self.boundaries, resolution=40)
+
+        raster = coverage_raster_from_shots(shots_boundaries, self.boundaries, 40, 20)
+        np.testing.assert_array_equal(raster.counts, got.counts())
+
+    def test_save_load(self):
+        lookup = shot_lookup_from_shots(self.shots_boundaries, ['a', 'b', 'c', 'd'], self.boundaries, resolution=10)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            lookup.save(tmp_dir)
+            got = load_shot_lookup(tmp_dir)
+
+            self.assertEqual(np.uint16, got.shot_ids.dtype)
+            np.testing.assert_array_equal(lookup.indptr, got.indptr)
+            np.testing.assert_array_equal(lookup.shot_ids, got.shot_ids)
+            self.assertEqual(['a', 'b'], got.image_names_at(5.5, 0.5))
+            del got
@@ -1,7 +1,12 @@
+import os
+import tempfile
 from unittest import TestCase
 
+import numpy as np
+
 from odm_report_shot_coverage.models.shot import Boundaries
-from odm_report_shot_coverage.models.wavefront_25d import _parse_facet_vertices, _paving_sizes
+from odm_report_shot_coverage.models.wavefront_25d import _parse_facet_vertices, _paving_sizes, Wavefront25D, \
+    parse_wavefront_25d_obj, parse_wavefront_25d_obj_cached
 
 
 class Test(TestCase):
@@ -12,9 +17,150 @@ class Test(TestCase):
 
         self.assertEqual((34921, 34920, 35191), got)
 
+    def test_parse_facet_vertices_forms(self):
+        for given in ['f 3 1 2', 'f 3/7 1/8 2/9', 'f 3//4 1//5 2//6', 'f 3/7/4 1/8/5 2/9/6']:
+            self.assertEqual((2, 0, 1), _parse_facet_vertices(given), given)
+
+    def test_parse_facet_vertices_relative(self):
+        got = _parse_facet_vertices('f -1/1/1 -3/2/2 -2/3/3', 10)
+
+        self.assertEqual((9, 7, 8), got)
+
+    def test_parse_wavefront_25d_obj(self):
+        given = """# a comment
+mtllib model.mtl
+v 0 0 1.5
+v 1 0 2
+vt 0.1 0.2
+v 1 1 2.5
+vn 0 0 1
+v 0 1 3
+usemtl material0
+f 1/1/1 2/1/1 3/1/1
+f 1 3 4
+v 2 1 3.5
+f 2//1 5//1 3//1
+f -5/1 -4/1 -1/1 -2/1
+"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, 'model.obj')
+            with open(filename, 'w') as fd:
+                fd.write(given)
+
+            got = parse_wavefront_25d_obj(filename)
+
+        self.assertEqual(np.float64, got.points.dtype)
+        self.assertEqual([[0, 0, 1.5], [1, 0, 2], [1, 1, 2.5], [0, 1, 3], [2, 1, 3.5]], got.points.tolist())
+        self.assertEqual(np.int32, got.facets.dtype)
+        self.assertEqual([[0, 1, 2], [0, 2, 3], [1, 4, 2], [0, 1, 4], [0, 4, 3]], got.facets.tolist())
+        self.assertEqual(3.5, got.boundaries.z_max)
+
     def test_paving_sizes(self):
         b = Boundaries(x_min=-50, x_max=150, y_min=25, y_max=125)
 
         got = _paving_sizes(b, 30)
 
         self.assertEqual((8, 4), got)
+
+    def test_paving_points_in(self):
+        wf = Wavefront25D()
+        wf.points = np.random.default_rng(1).uniform(0, 100, (5000, 3))
+        wf._compute_boundaries()
+        wf._compute_paving()
+        area = Boundaries(x_min=20, x_max=35, y_min=-10, y_max=12.5)
+
+        got = wf.paving_points_in(area)
+
+        within = np.nonzero((wf.points[:, 0] >= 20) & (wf.points[:, 0] <= 35) & (wf.points[:, 1] <= 12.5))[0]
+        self.assertTrue(np.all(np.diff(got) > 0), 'sorted')
+        self.assertTrue(set(within.tolist()).issubset(set(got.tolist())))
+        self.assertLess(len(got), len(wf.points) / 5)
+
+    def test_paving_points_in_outside(self):
+        wf = Wavefront25D()
+        wf.points = np.random.default_rng(1).uniform(0, 100, (500, 3))
+        wf._compute_boundaries()
+        wf._compute_paving()
+
+        got = wf.paving_points_in(Boundaries(x_min=120, x_max=130, y_min=0, y_max=100))
+
+        self.assertEqual(0, len(got))
+
+    def test_decimated(self):
+        # 8 x 8 vertices, 1 apart, on the z = x plane
+        xs, ys = np.meshgrid(np.arange(8.0), np.arange(8.0))
+        wf = Wavefront25D()
+        wf.points = np.stack([xs.ravel(), ys.ravel(), xs.ravel()], axis=1)
+        corners = (np.arange(7)[:, np.newaxis] * 8 + np.arange(7)).ravel()
+        wf.facets = np.concatenate([np.stack([corners, corners + 1, corners + 8], axis=1),
+                                    np.stack([corners + 1, corners + 9, corners + 8], axis=1)]).astype(np.int32)
+        wf._compute_boundaries()
+        wf._compute_paving()
+
+        got = wf.decimated(2)
+
+        self.assertEqual(16, len(got.points))
+        self.assertEqual([0.5, 0.5, 0.5], got.points[0].tolist())
+        self.assertEqual((0.5, 6.5), (got.boundaries.x_min, got.boundaries.x_max))
+        self.assertTrue(np.all(got.facets < 16))
+        self.assertTrue(np.all((got.facets[:, 0] != got.facets[:, 1]) & (got.facets[:, 1] != got.facets[:, 2]) &
+                               (got.facets[:, 0] != got.facets[:, 2])))
+        self.assertEqual(len(got.facets), len(np.unique(np.sort(got.facets, axis=1), axis=0)))
+        # the coarse grid is still fully triangulated: 3 x 3 cells, two facets each
+        self.assertEqual(18, len(got.facets))
+        self.assertEqual(16, len(got.paving_point_order))
+
+    def test_compact_points(self):
+        wf = Wavefront25D()
+        wf.points = np.array([[500000.0, 4100000.0, 10.0], [500999.9996, 4101999.0, 30.0], [500400.123, 4100600.5, 12.25]])
+        wf.facets = np.array([[0, 1, 2]])
+        wf._compute_boundaries()
+        wf._compute_paving()
+
+        got = wf.compacted(chunk_size=2)
+
+        self.assertEqual(np.float32, got.points.dtype)
+        self.assertEqual([500500, 4101000, 20], got.origin.tolist())
+        self.assertTrue(np.allclose(wf.points, got.absolute_points(), rtol=0, atol=1e-4))
+        self.assertIs(got, got.compacted())
+
+    def test_parse_wavefront_25d_obj_cached(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, 'model.obj')
+            cache_dir = os.path.join(tmp_dir, 'cache')
+            with open(filename, 'w') as fd:
+                fd.write('v 0 0 1\nv 1 0 2\nv 1 1 3\nf 1 2 3\n')
+
+            parsed = parse_wavefront_25d_obj_cached(filename, cache_dir)
+            cached = parse_wavefront_25d_obj_cached(filename, cache_dir)
+            rebuilt = parse_wavefront_25d_obj_cached(filename, cache_dir, rebuild=True)
+            with open(filename, 'a') as fd:
+                fd.write('v 2 2 4\n')
+            updated = parse_wavefront_25d_obj_cached(filename, cache_dir)
+
+            self.assertNotIsInstance(parsed.points, np.memmap)
+            self.assertIsInstance(cached.points, np.memmap)
+            self.assertEqual(parsed.points.tolist(), cached.points.tolist())
+            self.assertEqual(parsed.facets.tolist(), cached.facets.tolist())
+            self.assertEqual(parsed.paving_point_order.tolist(), cached.paving_point_order.tolist())
+            self.assertEqual(parsed.boundaries.to_json(), cached.boundaries.to_json())
+            self.assertEqual(parsed.paving_dimensions, cached.paving_dimensions)
+            self.assertNotIsInstance(rebuilt.points, np.memmap)
+            self.assertEqual(4, len(updated.points))
+
+    def test_parse_wavefront_25d_obj_cached_compact(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, 'model.obj')
+            cache_dir = os.path.join(tmp_dir, 'cache')
+            with open(filename, 'w') as fd:
+                fd.write('v 500000 4100000 1\nv 500001 4100000 2\nv 500001 4100001 3\nf 1 2 3\n')
+
+            parsed = parse_wavefront_25d_obj_cached(filename, cache_dir, compact=True)
+            cached = parse_wavefront_25d_obj_cached(filename, cache_dir, compact=True)
+
+            for got in [parsed, cached]:
+                self.assertIsInstance(got.points, np.memmap)
+                self.assertEqual(np.float32, got.points.dtype)
+                self.assertEqual([[500000, 4100000, 1], [500001, 4100000, 2], [500001, 4100001, 3]],
+                                 got.absolute_points().tolist())
+            self.assertTrue(os.path.exists(os.path.join(cache_dir, 'compact_points.npy')))
@@ -1,64 +1,217 @@
-import re
+import hashlib
+import json
+import logging
+import os
+import shutil
 
 import numpy as np
 
+from odm_report_shot_coverage.models.height_field import HeightField, height_field_from_points
 from odm_report_shot_coverage.models.shot import Boundaries
 
 
 class Wavefront25D:
-    points: 'list[(float, float, float)]' = []
-    facets: 'list[(int, int, int)]' = []
+    points: np.ndarray
+    facets: np.ndarray
     boundaries: Boundaries
     paving_dimensions: (int, int)
-    paving_facets: 'list[list[list[int]]]'
+    # vertex indices sorted by paving cell (cell index being i * paving_dimensions[1] + j)
+    paving_point_order: np.ndarray
+    # paving_point_order[paving_offsets[c]:paving_offsets[c + 1]] are the vertices within cell c
+    paving_offsets: np.ndarray
+    # if set, the points are float32 coordinates relative to it (see compacted)
+    origin: np.ndarray = None
 
     def to_json(self) -> dict:
         return {
-            'points': self.points,
-            'facets': self.facets,
+            'points': self.absolute_points().tolist(),
+            'facets': self.facets.tolist(),
             'boundaries': self.boundaries.to_json(),
             'paving_dimensions': self.paving_dimensions,
-            'paving_facets': self.paving_facets,
         }
 
     def _compute_boundaries(self):
         self.boundaries = Boundaries(
-            x_min=min([pc[0] for pc in self.points]),
-            x_max=max([pc[0] for pc in self.points]),
-            y_min=min([pc[1] for pc in self.points]),
-            y_max=max([pc[1] for pc in self.points]),
-            z_min=min([pc[2] for pc in self.points]),
-            z_max=max([pc[2] for pc in self.points]),
+            x_min=float(self.points[:, 0].min()),
+            x_max=float(self.points[:, 0].max()),
+            y_min=float(self.points[:, 1].min()),
+            y_max=float(self.points[:, 1].max()),
+            z_min=float(self.points[:, 2].min()),
+            z_max=float(self.points[:, 2].max()),
         )
 
-    def _paving_indices(self, x: float, y: float) -> (int, int):
-        return int(
-            (x - self.boundaries.x_min) / (self.boundaries.x_max - self.boundaries.x_min * self.paving_dimensions[0])), \
-               int((y - self.boundaries.y_min) / (
-                       self.boundaries.y_max - self.boundaries.y_min * self.paving_dimensions[1]))
+    def _paving_indices(self, x: np.ndarray, y: np.ndarray) -> (np.ndarray, np.ndarray):
+        """paving cell (i, j) of x, y coordinates, clipped to the paving"""
+        (nb_x, nb_y) = self.paving_dimensions
+        width = max(self.boundaries.x_max - self.boundaries.x_min, np.finfo(float).tiny)
+        height = max(self.boundaries.y_max - self.boundaries.y_min, np.finfo(float).tiny)
+        i = np.floor((np.asarray(x) - self.boundaries.x_min) / width * nb_x).astype(np.int64)
+        j = np.floor((np.asarray(y) - self.boundaries.y_min) / height * nb_y).astype(np.int64)
+        return np.clip(i, 0, nb_x - 1), np.clip(j, 0, nb_y - 1)
 
-    def _compute_paving_facets(self):
-        self.paving_facets = [[[None] * self.paving_dimensions[1]] * self.paving_dimensions[0]]
-        for i_facet, facet in enumerate(self.facets):
-            idx = set()
-            for p in [self.points[i] for i in facet]:
-                (i, j) = self._paving_indices(p[0], p[1])
-                idx.add((i, j))
-            for k in idx:
-                if self.paving_facets[k[0]][k[1]] is None:
-                    self.paving_facets[k[0]][k[1]] = []
-                self.paving_facets[k[0]][k[1]].append(i_facet)
+    def _compute_paving(self):
+        self.paving_dimensions = _paving_sizes(self.boundaries, max(1, len(self.points) // _PAVING_CELL_POINTS))
+        self._compute_paving_points()
 
+    def _compute_paving_points(self):
+        (i, j) = self._paving_indices(self.points[:, 0], self.points[:, 1])
+        cells = i * self.paving_dimensions[1] + j
+        self.paving_point_order = np.argsort(cells, kind='stable')
+        counts = np.bincount(cells, minlength=self.paving_dimensions[0] * self.paving_dimensions[1])
+        self.paving_offsets = np.concatenate([[0], np.cumsum(counts)])
 
-_facet_pattern = re.compile('f (\\d+)/\\d+/\\d+ (\\d+)/\\d+/\\d+ (\\d+)/\\d+/\\d+')
+    def paving_ranges(self, area: Boundaries) -> np.ndarray:
+        """
+        Ranges in paving_point_order covering all the cells overlapping the area
+        :return: [start, end[ ranges
+        :rtype: np.ndarray of shape (K, 2)
+        """
+        if area.x_max < self.boundaries.x_min or area.x_min > self.boundaries.x_max or \
+                area.y_max < self.boundaries.y_min or area.y_min > self.boundaries.y_max:
+            return np.zeros((0, 2), dtype=np.int64)
+        (i_min, j_min) = self._paving_indices(area.x_min, area.y_min)
+        (i_max, j_max) = self._paving_indices(area.x_max, area.y_max)
+        rows = np.arange(i_min, i_max + 1) * self.paving_dimensions[1]
+        return np.stack([self.paving_offsets[rows + j_min], self.paving_offsets[rows + j_max + 1]], axis=1)
 
+    def paving_points_in(self, area: Boundaries) -> np.ndarray:
+        """
+        Indices of the vertices within the paving cells overlapping the area (a superset of the vertices within the area)
+        :return: sorted vertex indices
+        """
+        return paving_points_from_ranges(self.paving_point_order, self.paving_ranges(area))
 
-def _parse_facet_vertices(facet_str: str):
-    """Extract facet indices from line (but returns starting from 0)"""
-    m = _facet_pattern.fullmatch(facet_str)
-    if m is None:
+    def decimated(self, spacing: float) -> 'Wavefront25D':
+        """
+        A coarser mesh, by vertex clustering: the vertices are grouped by x/y grid cells of spacing side, each group
+        being replaced by its mean vertex, and the facets are remapped to the groups (the ones collapsing to a line or a
+        point being dropped, as well as the duplicates)
+        :param spacing: the grid cell side, in the mesh units (meters)
+        """
+        if spacing <= 0:
+            raise ValueError('The decimation spacing must be positive, got %g' % spacing)
+        all_points = self.absolute_points()
+        i = np.floor((all_points[:, 0] - self.boundaries.x_min) / spacing).astype(np.int64)
+        j = np.floor((all_points[:, 1] - self.boundaries.y_min) / spacing).astype(np.int64)
+        (_, groups) = np.unique(i * (j.max() + 1) + j, return_inverse=True)
+        groups = groups.ravel()
+        counts = np.bincount(groups)
+        points = np.stack([np.bincount(groups, weights=all_points[:, k]) / counts for k in range(3)], axis=1)
+
+        facets = groups[self.facets]
+        facets = facets[(facets[:, 0] != facets[:, 1]) & (facets[:, 1] != facets[:, 2]) & (facets[:, 0] != facets[:, 2])]
+        # duplicates are compared regardless of the vertex order, keeping the first facet orientation
+        (_, first) = np.unique(np.sort(facets, axis=1), axis=0, return_index=True)
+
+        wf = Wavefront25D()
+        wf.points = points
+        wf.facets = facets[np.sort(first)].astype(np.int32)
+        wf._compute_boundaries()
+        wf._compute_paving()
+        return wf
+
+    def compacted(self, points_file: str = None, chunk_size: int = 1000000) -> 'Wavefront25D':
+        """
+        The same model, its vertices as float32 coordinates relative to compact_origin (half the size of the float64
+        ones, with a sub-millimeter resolution up to a few kilometers away), converted chunk_size vertices at a time
+        :param points_file: the .npy file to write the vertices to, memory-mapped, instead of keeping them in memory
+        """
+        if self.origin is not None:
+            return self
+        origin = compact_origin(self.boundaries)
+        if points_file is None:
+            points = np.empty(self.points.shape, dtype=np.float32)
+        else:
+            points = np.lib.format.open_memmap(points_file, mode='w+', dtype=np.float32, shape=self.points.shape)
+        for start in range(0, len(self.points), chunk_size):
+            points[start:start + chunk_size] = self.points[start:start + chunk_size] - origin
+        if points_file is not None:
+            points.flush()
+        return self._with_points(points, origin)
+
+    def _with_points(self, points: np.ndarray, origin: np.ndarray) -> 'Wavefront25D':
+        wf = Wavefront25D()
+        (wf.points, wf.origin, wf.facets, wf.boundaries) = (points, origin, self.facets, self.boundaries)
+        wf.paving_dimensions = self.paving_dimensions
+        (wf.paving_point_order, wf.paving_offsets) = (self.paving_point_order, self.paving_offsets)
+        return wf
+
+    def absolute_points(self) -> np.ndarray:
+        """the vertices in the model coordinates, as float64 (a full copy if the model is compacted)"""
+        return self.points if self.origin is None else self.points + self.origin
+
+    def height_field(self) -> HeightField:
+        """The mean elevation of each paving cell"""
+        return height_field_from_points(self.absolute_points(), self.boundaries, self.paving_dimensions)
+
+
+def compact_origin(boundaries: Boundaries) -> np.ndarray:
+    """the origin of the compacted vertices: the model center, rounded to the meter"""
+    b = boundaries
+    return np.round([(b.x_min + b.x_max) / 2, (b.y_min + b.y_max) / 2, (b.z_min + b.z_max) / 2])
+
+
+def paving_points_from_ranges(paving_point_order: np.ndarray, ranges: np.ndarray) -> np.ndarray:
+    """Sorted vertex indices, from paving_ranges"""
+    if len(ranges) == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.sort(np.concatenate([paving_point_order[start:end] for (start, end) in ranges]))
+
+
+# average number of vertices per paving cell
+_PAVING_CELL_POINTS = 16
+
+
+def _parse_facet_vertices(facet_str: str, nb_points: int = None) -> tuple:
+    """
+    Extract facet indices from line (but returns starting from 0).
+    Handles the "f v", "f v/vt", "f v//vn" and "f v/vt/vn" forms, and negative (relative) indices given nb_points,
+    the number of vertices read so far
+    """
+    tokens = facet_str.split()
+    if len(tokens) < 4 or tokens[0] != 'f':
         raise Exception('Cannot parse facet "%s"' % facet_str)
-    return int(m.group(1)) - 1, int(m.group(2)) - 1, int(m.group(3)) - 1
+    indices = []
+    for token in tokens[1:]:
+        try:
+            i = int(token.partition('/')[0])
+        except ValueError:
+            raise Exception('Cannot parse facet "%s"' % facet_str)
+        if i < 0:
+            if nb_points is None:
+                raise Exception('Cannot resolve relative indices in facet "%s"' % facet_str)
+            i += nb_points + 1
+        indices.append(i - 1)
+    return tuple(indices)
+
+
+class _GrowableArray:
+    """A 2D numpy array to which rows are appended, doubling its capacity when full"""
+
+    def __init__(self, nb_columns: int, dtype, capacity: int = 1024):
+        self._array = np.empty((capacity, nb_columns), dtype=dtype)
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def extend(self, rows: np.ndarray):
+        if self._len + len(rows) > len(self._array):
+            capacity = max(2 * len(self._array), self._len + len(rows))
+            grown = np.empty((capacity, self._array.shape[1]), dtype=self._array.dtype)
+            grown[:self._len] = self._array[:self._len]
+            self._array = grown
+        self._array[self._len:self._len + len(rows)] = rows
+        self._len += len(rows)
+
+    def to_array(self) -> np.ndarray:
+        """The rows, the unused capacity being released"""
+        self._array = self._array[:self._len].copy()
+        return self._array
+
+
+# rows parsed as text before being flushed into the numpy arrays
+_PARSE_BUFFER_ROWS = 65536
 
 
 def _paving_sizes(boundaries: Boundaries, min_blocks: int) -> (int, int):
@@ -71,20 +224,149 @@ def _paving_sizes(boundaries: Boundaries, min_blocks: int) -> (int, int):
     return int(nb_x), int(nb_y)
 
 
-def parse_wavefront_25d_obj(filename):
-    wf = Wavefront25D()
-    with open(filename) as fd:
-        for line in [ln for ln in fd.readlines() if ln.startswith('v ')]:
-            v = line.replace('v ', '').split(' ')
-            (x, y, z) = float(v[0]), float(v[1]), float(v[2])
-            wf.points.append((x, y, z))
+def parse_wavefront_25d_obj(filename) -> Wavefront25D:
+    """
+    Parse the vertices and facets of a wavefront .obj file, in a single pass over the file lines.
+    Polygonal facets are split in triangles, as a fan around their first vertex.
+    """
+    points = _GrowableArray(3, np.float64)
+    facets = _GrowableArray(3, np.int32)
+    point_buffer = []
+    facet_buffer = []
+
+    def flush_points():
+        points.extend(np.array(point_buffer, dtype=np.float64).reshape((-1, 3)))
+        point_buffer.clear()
+
+    def flush_facets():
+        facets.extend(np.array(facet_buffer, dtype=np.int64).reshape((-1, 3)) - 1)
+        facet_buffer.clear()
 
     with open(filename) as fd:
-        for line in [ln for ln in fd.readlines() if ln.startswith('f ')]:
-            wf.facets.append(_parse_facet_vertices(line.strip()))
+        for line in fd:
+            if line.startswith('v '):
+                point_buffer.extend(line.split()[1:4])
+                if len(point_buffer) >= 3 * _PARSE_BUFFER_ROWS:
+                    flush_points()
+            elif line.startswith('f '):
+                tokens = line.split()
+                if len(tokens) == 4 and '-' not in line:
+                    facet_buffer.extend([t.partition('/')[0] for t in tokens[1:]])
+                else:
+                    indices = _parse_facet_vertices(line, len(points) + len(point_buffer) // 3)
+                    for k in range(1, len(indices) - 1):
+                        facet_buffer.extend([indices[0] + 1, indices[k] + 1, indices[k + 1] + 1])
+                if len(facet_buffer) >= 3 * _PARSE_BUFFER_ROWS:
+                    flush_facets()
+    flush_points()
+    flush_facets()
 
+    wf = Wavefront25D()
+    wf.points = points.to_array()
+    wf.facets = facets.to_array()
     wf._compute_boundaries()
-    wf.paving_dimensions = _paving_sizes(wf.boundaries, len(wf.points))
-    wf._compute_paving_facets()
+    wf._compute_paving()
+
+    return wf
+
+
+# bytes hashed at the start, middle and end of the .obj file for the cache key
+_CACHE_KEY_BLOCK_SIZE = 1 << 20
+_CACHE_ARRAYS = ['points', 'facets', 'paving_point_order', 'paving_offsets']
+# the float32 vertices of the compacted model, written on first use
+_CACHE_COMPACT_POINTS_FILE = 'compact_points.npy'
 
+
+def wavefront_25d_cache_key(filename: str) -> dict:
+    """
+    Identify an .obj file content: its size, modification time and a hash of blocks sampled at its start, middle and
+    end (hashing a several GB file would cost more than the parsing we want to skip)
+    """
+    stat = os.stat(filename)
+    digest = hashlib.sha1()
+    with open(filename, 'rb') as fd:
+        for offset in sorted({0, max(0, stat.st_size // 2 - _CACHE_KEY_BLOCK_SIZE // 2),
+                              max(0, stat.st_size - _CACHE_KEY_BLOCK_SIZE)}):
+            fd.seek(offset)
+            digest.update(fd.read(_CACHE_KEY_BLOCK_SIZE))
+    return {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha1': digest.hexdigest(),
+    }
+
+
+def save_wavefront_25d_cache(wf: Wavefront25D, cache_dir: str, key: dict):
+    """
+    Store the parsed model as .npy files, plus a mesh.json with the key and boundaries.
+    The directory is built aside then moved, so a concurrent or interrupted run never sees a partial cache.
+    """
+    tmp_dir = cache_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name in _CACHE_ARRAYS:
+        np.save(os.path.join(tmp_dir, name + '.npy'), np.ascontiguousarray(getattr(wf, name)))
+    with open(os.path.join(tmp_dir, 'mesh.json'), 'w') as fd:
+        json.dump({
+            'key': key,
+            'boundaries': wf.boundaries.to_json(),
+            'paving_dimensions': wf.paving_dimensions,
+        }, fd)
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.rename(tmp_dir, cache_dir)
+
+
+def load_wavefront_25d_cache(cache_dir: str, key: dict) -> Wavefront25D:
+    """
+    The cached model, its arrays being memory-mapped
+    :return: None if there is no cache for this key
+    """
+    try:
+        with open(os.path.join(cache_dir, 'mesh.json')) as fd:
+            meta = json.load(fd)
+    except (OSError, ValueError):
+        return None
+    if meta.get('key') != key:
+        return None
+    wf = Wavefront25D()
+    for name in _CACHE_ARRAYS:
+        setattr(wf, name, np.load(os.path.join(cache_dir, name + '.npy'), mmap_mode='r'))
+    b = meta['boundaries']
+    wf.boundaries = Boundaries(x_min=b['xMin'], x_max=b['xMax'], y_min=b['yMin'], y_max=b['yMax'], z_min=b['zMin'],
+                               z_max=b['zMax'])
+    wf.paving_dimensions = tuple(meta['paving_dimensions'])
     return wf
+
+
+def compact_wavefront_25d_cache(wf: Wavefront25D, cache_dir: str) -> Wavefront25D:
+    """
+    wf.compacted(), its float32 vertices being written in the cache the first time, then memory-mapped from it, so
+    that the float64 ones are never read again
+    :param wf: the model loaded from cache_dir
+    """
+    filename = os.path.join(cache_dir, _CACHE_COMPACT_POINTS_FILE)
+    if not os.path.exists(filename):
+        wf.compacted(filename + '.tmp')
+        os.replace(filename + '.tmp', filename)
+    return wf._with_points(np.load(filename, mmap_mode='r'), compact_origin(wf.boundaries))
+
+
+def parse_wavefront_25d_obj_cached(filename: str, cache_dir: str, rebuild: bool = False,
+                                   compact: bool = False) -> Wavefront25D:
+    """
+    Same as parse_wavefront_25d_obj, but reusing the binary cache in cache_dir if it was built from the same file
+    :param rebuild: parse the file and overwrite the cache, even if it is up to date
+    :param compact: return the compacted model (see compact_wavefront_25d_cache)
+    """
+    key = wavefront_25d_cache_key(filename)
+    wf = None if rebuild else load_wavefront_25d_cache(cache_dir, key)
+    if wf is not None:
+        logging.info('Loaded 2.5d model from cache %s' % cache_dir)
+    else:
+        wf = parse_wavefront_25d_obj(filename)
+        save_wavefront_25d_cache(wf, cache_dir, key)
+        logging.info('Saved 2.5d model cache %s' % cache_dir)
+        if compact:
+            # memory-mapped from the cache, for the parsed arrays to be released
+            wf = load_wavefront_25d_cache(cache_dir, key)
+    return compact_wavefront_25d_cache(wf, cache_dir) if compact else wf
@@ -0,0 +1,113 @@
+"""
+Shot coverage reports of several ODM projects in one process: the shot boundary worker pool is opened once and shared
+by all the projects, each project being parsed into its own reconstruction, and a failing project does not stop the
+others. A summary index page links to every report.
+"""
+import argparse
+import contextlib
+import html
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+from odm_report_shot_coverage.models.shot_boundary_pool import ShotBoundaryPool
+from odm_report_shot_coverage.scripts.options import parse_batch_args, report_dir
+from odm_report_shot_coverage.scripts.report import build_report
+from odm_report_shot_coverage.scripts.timings import json_parse_stage_timings
+
+
+def run_batch(project_dirs: 'list[str]', args: argparse.Namespace, pool: ShotBoundaryPool = None) -> 'list[dict]':
+    """
+    Build the report of each project, in turn
+    :param args: the options of add_report_arguments, applied to every project
+    :return: per project, its status ('ok' or 'failed'), elapsed seconds, and the report summary or the error
+    """
+    results = []
+    for project_dir in project_dirs:
+        logging.info('Processing project %s' % project_dir)
+        start = time.perf_counter()
+        result = {'project': project_dir}
+        try:
+            result.update(build_report(project_dir, args, pool))
+            result['status'] = 'ok'
+            logging.info('Project %s stages:\n%s' % (project_dir, json_parse_stage_timings(result['timings']).gantt()))
+        except Exception as e:
+            logging.exception('Project %s failed' % project_dir)
+            result.update({'status': 'failed', 'error': str(e)})
+        result['elapsed'] = time.perf_counter() - start
+        results.append(result)
+    return results
+
+
+def projects_per_hour(results: 'list[dict]', elapsed: float) -> float:
+    """the throughput of the successful projects"""
+    return 3600 * sum(1 for r in results if r['status'] == 'ok') / max(elapsed, 1e-9)
+
+
+def write_batch_index(results: 'list[dict]', elapsed: float, out_dir: str):
+    """The summary page, index.html, linking to each project report, and the same summary as batch_summary.json"""
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    summary = {'elapsed': elapsed, 'projectsPerHour': projects_per_hour(results, elapsed), 'projects': results}
+    with open('%s/batch_summary.json' % out_dir, 'w') as fd:
+        json.dump(summary, fd, indent=1)
+
+    rows = []
+    for result in results:
+        name = html.escape(os.path.basename(os.path.normpath(result['project'])))
+        if result['status'] == 'ok':
+            link = os.path.relpath('%s/index.html' % report_dir(result['project']), out_dir)
+            coverage = result['coverage']
+            rows.append('<tr><td><a href="%s">%s</a></td><td>%d</td><td>%.1f%%</td><td>%.1f</td><td>%.1f s</td></tr>' % (
+                html.escape(link), name, result['shots'], 100 * coverage['coveredRatio'], coverage['meanCount'],
+                result['elapsed']))
+        else:
+            rows.append('<tr class="failed"><td>%s</td><td colspan="3">failed: %s</td><td>%.1f s</td></tr>' % (
+                name, html.escape(result['error']), result['elapsed']))
+    with open('%s/index.html' % out_dir, 'w') as fd:
+        fd.write('''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Shot coverage reports</title>
+<style>
+body {font-family: sans-serif}
+td, th {padding: 2px 12px; text-align: right}
+td:first-child, th:first-child {text-align: left}
+tr.failed {color: #b00}
+</style>
+</head>
+<body>
+<h1>Shot coverage reports</h1>
+<p>%d projects in %.1f s (%.1f projects/hour)</p>
+<table>
+<tr><th>Project</th><th>Shots</th><th>Covered</th><th>Mean shots per cell</th><th>Time</th></tr>
+%s
+</table>
+</body>
+</html>
+''' % (len(results), elapsed, summary['projectsPerHour'], '\n'.join(rows)))
+
+
+def main(argv: 'list[str]' = None):
+    run(parse_batch_args(argv))
+
+
+def run(args: argparse.Namespace):
+    """the batch command, on the options of parse_batch_args"""
+    logging.basicConfig(level=logging.INFO)
+    workers = args.workers if args.workers > 0 else os.cpu_count()
+
+    start = time.perf_counter()
+    with ShotBoundaryPool(workers) if workers > 1 else contextlib.nullcontext() as pool:
+        results = run_batch(args.projects, args, pool)
+    elapsed = time.perf_counter() - start
+    write_batch_index(results, elapsed, args.output)
+
+    failed = [r['project'] for r in results if r['status'] != 'ok']
+    print('Shot coverage completed for %d projects in %.1f s (%.1f projects/hour)' % (
+        len(results) - len(failed), elapsed, projects_per_hour(results, elapsed)))
+    if len(failed) > 0:
+        print('Failed: %s' % ', '.join(failed))
+    print('Summary: %s/index.html' % args.output)
@@ -0,0 +1,60 @@
+"""
+The odm-report-shot-coverage command: one module per subcommand, only imported once its options are parsed, so that the
+quick commands (query, any --help or usage error) do not load what building a report needs (scipy, PIL, the report
+stages...).
+"""
+import importlib
+import os
+import sys
+
+from odm_report_shot_coverage.scripts.options import parse_report_args, parse_batch_args, parse_serve_args, \
+    parse_query_args
+
+# name: (options parser, module with a run(args) function, summary); report also runs without its name, by default
+SUBCOMMANDS = {
+    'report': (parse_report_args, 'odm_report_shot_coverage.scripts.report',
+               'build the shot coverage report of a project'),
+    'batch': (parse_batch_args, 'odm_report_shot_coverage.scripts.batch',
+              'build the reports of several projects, with a summary page'),
+    'serve': (parse_serve_args, 'odm_report_shot_coverage.scripts.serve',
+              'serve a report, computing its data as it is viewed'),
+    'query': (parse_query_args, 'odm_report_shot_coverage.scripts.query',
+              'list the shots covering a ground point of a built report'),
+}
+
+
+def usage() -> str:
+    lines = ['usage: odm-report-shot-coverage [report] PROJECT [options]',
+             '       odm-report-shot-coverage {%s} ... [options]' % ','.join(SUBCOMMANDS),
+             '',
+             'Build and explore OpenDroneMap shot coverage reports', '',
+             'subcommands (SUBCOMMAND --help for their options):']
+    lines += ['  %-8s %s' % (name, summary) for name, (_, _, summary) in SUBCOMMANDS.items()]
+    return '\n'.join(lines)
+
+
+def subcommand(argv: 'list[str]') -> (str, 'list[str]'):
+    """
+    The subcommand name and its arguments, report if the first argument is not a subcommand name, or is an ODM project
+    directory (with an odm_report folder) named like one
+    """
+    if argv[0] in SUBCOMMANDS and not os.path.isdir(os.path.join(argv[0], 'odm_report')):
+        return argv[0], argv[1:]
+    return 'report', argv
+
+
+def main(argv: 'list[str]' = None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) == 0:
+        sys.exit(usage())
+    if argv[0] in ('-h', '--help'):
+        print(usage())
+        return
+    (name, argv) = subcommand(argv)
+    (parse_args, module, _) = SUBCOMMANDS[name]
+    args = parse_args(argv)
+    importlib.import_module(module).run(args)
+
+
+if __name__ == '__main__':
+    main()
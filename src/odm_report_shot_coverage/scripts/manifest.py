@@ -0,0 +1,100 @@
+import hashlib
+import json
+import logging
+import os
+
+from odm_report_shot_coverage.models.shot import Shot, ShotBoundaries
+
+MANIFEST_FILE_NAME = 'manifest.json'
+
+
+def file_fingerprint(filename: str) -> dict:
+    """size and modification time of a file"""
+    stat = os.stat(filename)
+    return {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+    }
+
+
+def shot_fingerprint(shot: Shot, mesh_key: dict, settings: dict = None) -> str:
+    """
+    A hash of everything the shot boundaries depend upon: the shot pose, all the camera parameters, the mesh and the
+    computation settings
+    """
+    content = {
+        'imageName': shot.image_name,
+        'translation': [float(t) for t in shot.translation],
+        'rotation': [float(r) for r in shot.rotation],
+        'camera': vars(shot.camera),
+        'mesh': mesh_key,
+        'settings': settings or {},
+    }
+    return hashlib.sha1(json.dumps(content, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class ReportManifest:
+    """
+    The fingerprints of the inputs a report was built from, with the computed shot boundaries, so an incremental run
+    only redoes the work whose inputs have changed.
+    """
+    images: 'dict[str, dict]'
+    orthophoto: dict
+    shots: 'dict[str, dict]'
+
+    def __init__(self):
+        self.images = {}
+        self.orthophoto = None
+        self.shots = {}
+
+    def is_image_up_to_date(self, file_name: str, fingerprint: dict) -> bool:
+        return self.images.get(file_name) == fingerprint
+
+    def set_image(self, file_name: str, fingerprint: dict):
+        self.images[file_name] = fingerprint
+
+    def is_orthophoto_up_to_date(self, fingerprint: dict) -> bool:
+        return self.orthophoto == fingerprint
+
+    def shot_boundaries(self, image_name: str, fingerprint: str) -> ShotBoundaries:
+        """the previously computed boundaries, None if the shot fingerprint has changed"""
+        entry = self.shots.get(image_name)
+        if entry is None or entry['fingerprint'] != fingerprint:
+            return None
+        return ShotBoundaries([tuple(p) for p in entry['boundaries']['path']])
+
+    def set_shot_boundaries(self, image_name: str, fingerprint: str, boundaries: ShotBoundaries):
+        self.shots[image_name] = {
+            'fingerprint': fingerprint,
+            'boundaries': boundaries.to_json(),
+        }
+
+    def to_json(self) -> dict:
+        return {
+            'images': self.images,
+            'orthophoto': self.orthophoto,
+            'shots': self.shots,
+        }
+
+    def save(self, report_dir: str):
+        tmp_file = '%s/%s.tmp' % (report_dir, MANIFEST_FILE_NAME)
+        with open(tmp_file, 'w') as fd:
+            json.dump(self.to_json(), fd)
+        os.replace(tmp_file, '%s/%s' % (report_dir, MANIFEST_FILE_NAME))
+
+
+def load_report_manifest(report_dir: str) -> ReportManifest:
+    """The manifest of a previous run, an empty one if there is none"""
+    manifest = ReportManifest()
+    try:
+        with open('%s/%s' % (report_dir, MANIFEST_FILE_NAME)) as fd:
+            el = json.load(fd)
+    except FileNotFoundError:
+        return manifest
+    except ValueError:
+        logging.warning('Ignoring unreadable %s/%s' % (report_dir, MANIFEST_FILE_NAME))
+        return manifest
+    manifest.images = el.get('images', {})
+    manifest.orthophoto = el.get('orthophoto')
+    manifest.shots = el.get('shots', {})
+    return manifest
@@ -0,0 +1,143 @@
+"""
+The command line options of every subcommand, kept apart from the subcommands themselves so that parsing them (or
+printing their --help) does not load scipy, PIL and the models.
+"""
+import argparse
+import os
+
+from odm_report_shot_coverage.scripts.timings import TIMINGS_FILE_NAME, PROFILE_FILE_NAME
+
+# the independent stages: web copy, images, orthophoto and parsing
+MAX_CONCURRENT_STAGES = 4
+# the defaults of the models, checked against them by test_options
+BOUNDARY_MODES = ['hull', 'star']
+DEFAULT_LOOKUP_RESOLUTION = 512
+DEFAULT_PRECISION = 2
+DEFAULT_PORT = 8001
+# serialized boundaries chunks kept in memory by the server
+DEFAULT_CACHE_CHUNKS = 256
+
+
+def add_report_arguments(parser: argparse.ArgumentParser):
+    """The per project options, shared by the single project and batch commands"""
+    parser.add_argument("--workers", help="number of processes computing shot boundaries (0 for all cores)",
+                        type=int, default=1)
+    parser.add_argument("--threads", help="number of threads resizing the image thumbnails and encoding the "
+                                          "orthophoto tiles (0 for all cores)",
+                        type=int, default=0)
+    parser.add_argument("--no-cache", help="neither read nor write the binary cache of the 2.5d model",
+                        action='store_true')
+    parser.add_argument("--rebuild-cache", help="parse the 2.5d model again and overwrite its binary cache",
+                        action='store_true')
+    parser.add_argument("--incremental", help="only redo the work whose inputs changed since the previous run",
+                        action='store_true')
+    parser.add_argument("--occlusion", help="discard the mesh vertices hidden from the shot by other facets",
+                        action='store_true')
+    parser.add_argument("--occlusion-resolution", help="largest side of the occlusion depth buffer, in pixels",
+                        type=int, default=1024)
+    parser.add_argument("--boundary-mode", help="shot boundaries as a 24 points star polygon, or the exact convex hull",
+                        choices=BOUNDARY_MODES, default='star')
+    parser.add_argument("--footprint", help="project the 2.5d model vertices onto each shot, or intersect the frame "
+                                            "border rays with the 2.5d model height field (fast, for flat sites)",
+                        choices=['vertices', 'frustum'], default='vertices')
+    parser.add_argument("--sample-spacing", help="decimate the 2.5d model on a grid of that spacing (in meters) before "
+                                                 "computing the shot boundaries, for speed over accuracy",
+                        type=float, default=None)
+    parser.add_argument("--memory-budget", help="keep the 2.5d model vertices as float32 and project them by chunks, for "
+                                                "the shot boundaries to fit in that many MB (not with --occlusion)",
+                        type=float, default=None)
+    parser.add_argument("--coverage-scale", help="orthophoto pixels per side of a coverage raster cell",
+                        type=int, default=4)
+    parser.add_argument("--lookup-resolution", help="cells on the largest side of the grid indexing the shots covering "
+                                                    "each ground point", type=int, default=DEFAULT_LOOKUP_RESOLUTION)
+    parser.add_argument("--precision", help="decimals of the coordinates written for the web viewer",
+                        type=int, default=DEFAULT_PRECISION)
+    parser.add_argument("--thumbnail-size", help="largest side of the image thumbnails, in pixels",
+                        type=int, default=400)
+    parser.add_argument("--thumbnail-quality", help="JPEG quality of the image thumbnails",
+                        type=int, default=85)
+    parser.add_argument("--profile", help="write a cProfile dump (%s) and the stage timings (%s) next to the "
+                                          "report, the stages then running in turn in the main thread (their image "
+                                          "threads and the pool worker processes are not profiled)" % (
+                                              PROFILE_FILE_NAME, TIMINGS_FILE_NAME),
+                        action='store_true')
+    parser.add_argument("--concurrent-stages", help="maximum number of stages (images, orthophoto, parsing, shot "
+                                                    "boundaries...) run at the same time, 1 to run them in turn "
+                                                    "(0 for one per core, up to %d)" % MAX_CONCURRENT_STAGES,
+                        type=int, default=0)
+
+
+def thread_count(args: argparse.Namespace) -> int:
+    """the --threads of the image codecs, which release the GIL"""
+    return args.threads if args.threads > 0 else os.cpu_count()
+
+
+def report_dir(project_dir: str) -> str:
+    return project_dir + '/odm_report/shot_coverage'
+
+
+def cache_dir(project_dir: str) -> str:
+    """the binary cache of the 2.5d model, next to the report but out of the web app it publishes"""
+    return project_dir + '/odm_report/.shot_coverage_cache'
+
+
+def _check_report_arguments(parser: argparse.ArgumentParser, args: argparse.Namespace):
+    if args.occlusion and args.memory_budget is not None:
+        parser.error('--occlusion needs all the 2.5d model facets at once, and cannot run within --memory-budget')
+    if args.footprint == 'frustum':
+        # the frustum footprints neither project the vertices nor use the process pool
+        options = {'--occlusion': args.occlusion, '--boundary-mode': args.boundary_mode != 'star',
+                   '--workers': args.workers != 1, '--memory-budget': args.memory_budget is not None}
+        ignored = [option for (option, is_set) in options.items() if is_set]
+        if len(ignored) > 0:
+            parser.error('%s only apply to --footprint vertices' % ', '.join(ignored))
+
+
+def parse_report_args(argv: 'list[str]' = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='odm-report-shot-coverage [report]',
+                                     description='Build an OpenDroneMap shot coverage report')
+    parser.add_argument("project", help="the ODM project root folder",
+                        type=str)
+    add_report_arguments(parser)
+    args = parser.parse_args(argv)
+    _check_report_arguments(parser, args)
+    return args
+
+
+def parse_batch_args(argv: 'list[str]' = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='odm-report-shot-coverage batch',
+                                     description='Build the shot coverage reports of several OpenDroneMap projects')
+    parser.add_argument("projects", help="the ODM project root folders", type=str, nargs='+')
+    parser.add_argument("--output", help="where to write the summary index page", type=str, default='.')
+    add_report_arguments(parser)
+    args = parser.parse_args(argv)
+    _check_report_arguments(parser, args)
+    return args
+
+
+def parse_serve_args(argv: 'list[str]' = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='odm-report-shot-coverage serve',
+                                     description='Serve the shot coverage report of an OpenDroneMap project, '
+                                                 'computing the shot boundaries as they are viewed')
+    parser.add_argument("project", help="the ODM project root folder", type=str)
+    parser.add_argument("--host", help="the address to listen on", type=str, default='127.0.0.1')
+    parser.add_argument("--port", help="the port to listen on", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--cache-chunks", help="shot boundaries chunks kept in memory", type=int,
+                        default=DEFAULT_CACHE_CHUNKS)
+    add_report_arguments(parser)
+    args = parser.parse_args(argv)
+    _check_report_arguments(parser, args)
+    if not os.path.isdir(args.project):
+        parser.error('No ODM project directory %s' % args.project)
+    return args
+
+
+def parse_query_args(argv: 'list[str]' = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='odm-report-shot-coverage query',
+                                     description='List the shots covering a ground point, in the 2.5d model '
+                                                 'coordinates (as on the report map axes)')
+    parser.add_argument("project", help="the ODM project root folder, whose report is built", type=str)
+    parser.add_argument("x", type=float)
+    parser.add_argument("y", type=float)
+    parser.add_argument("--json", help="print the cell and image names as JSON", action='store_true')
+    return parser.parse_args(argv)
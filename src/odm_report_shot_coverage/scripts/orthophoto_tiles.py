@@ -0,0 +1,211 @@
+import json
+import logging
+import math
+import os
+import shutil
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+from tqdm import tqdm
+
+TILE_SIZE = 256
+TILES_DIR_NAME = 'orthophoto_tiles'
+
+_TIFF_COMPRESSION_NONE = 1
+_TIFF_COMPRESSION_DEFLATE = {8, 32946}
+_TIFF_PREDICTOR_HORIZONTAL = 2
+
+
+class TiffWindowReader:
+    """
+    Reads row windows of a TIFF image, decoding only the strips or tiles intersecting them.
+    Supports 8 bits chunky images, uncompressed or DEFLATE compressed (with or without horizontal predictor), which is
+    what ODM writes by default. Other layouts and modes (palette, CMYK, 16 bits...) are decoded at once and converted to
+    RGBA by Pillow, and windows cropped from the full image.
+    """
+    width: int
+    height: int
+    bands: int
+    segment_height: int
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        with Image.open(filename) as im:
+            self.width, self.height = im.size
+            self.mode = im.mode
+            tags = dict(im.tag_v2) if hasattr(im, 'tag_v2') else {}
+        self._full_image = None
+        self._segments = self._parse_segments(tags)
+        if self._segments is None:
+            logging.info('Orthophoto layout not supported for windowed reading, decoding it at once')
+            self.segment_height = self.height
+            self.bands = 4
+
+    def _parse_segments(self, tags: dict) -> 'list[(int, int, int, int, int, int)]':
+        """
+        (x, y, width, height, offset, byte count) of each strip or tile, in row major order,
+        None if the layout is not supported
+        """
+        if not tags:
+            return None
+        bits = tags.get(258, (1,))
+        bits = bits if isinstance(bits, tuple) else (bits,)
+        sample_format = tags.get(339, 1)
+        sample_format = sample_format if isinstance(sample_format, tuple) else (sample_format,)
+        self._compression = tags.get(259, _TIFF_COMPRESSION_NONE)
+        self._predictor = tags.get(317, 1)
+        if any(b != 8 for b in bits) or any(f != 1 for f in sample_format) or tags.get(284, 1) != 1 or \
+                self._compression not in {_TIFF_COMPRESSION_NONE} | _TIFF_COMPRESSION_DEFLATE or \
+                self._predictor not in (1, _TIFF_PREDICTOR_HORIZONTAL) or self.mode not in ('L', 'RGB', 'RGBA'):
+            return None
+        self.bands = tags.get(277, 1)
+        if self.bands != len(self.mode):
+            return None
+        if 324 in tags:
+            (seg_w, seg_h) = (tags[322], tags[323])
+            offsets, counts = tags[324], tags[325]
+            across = math.ceil(self.width / seg_w)
+        elif 273 in tags:
+            seg_w = self.width
+            seg_h = min(tags.get(278, self.height), self.height)
+            offsets, counts = tags[273], tags[279]
+            across = 1
+        else:
+            return None
+        offsets = offsets if isinstance(offsets, tuple) else (offsets,)
+        counts = counts if isinstance(counts, tuple) else (counts,)
+        positions = [((i % across) * seg_w, (i // across) * seg_h) for i in range(len(offsets))]
+        self.segment_height = seg_h
+        self._segments_across = across
+        return [(x, y, seg_w, seg_h, offset, count) for ((x, y), offset, count) in zip(positions, offsets, counts)]
+
+    def _decode_segment(self, fd, segment: (int, int, int, int, int, int)) -> np.ndarray:
+        (x, y, seg_w, seg_h, offset, count) = segment
+        fd.seek(offset)
+        data = fd.read(count)
+        if self._compression in _TIFF_COMPRESSION_DEFLATE:
+            data = zlib.decompress(data)
+        rows = len(data) // (seg_w * self.bands)
+        pixels = np.frombuffer(data, dtype=np.uint8, count=rows * seg_w * self.bands).reshape((rows, seg_w, self.bands))
+        if self._predictor == _TIFF_PREDICTOR_HORIZONTAL:
+            pixels = np.cumsum(pixels, axis=1, dtype=np.uint8)
+        return pixels
+
+    def read_rows(self, y_min: int, y_max: int) -> np.ndarray:
+        """
+        Pixels of rows [y_min, y_max[
+        :rtype: np.ndarray of shape (y_max - y_min, width, bands), dtype uint8, bands being 1, 3 or 4
+        """
+        if self._segments is None:
+            if self._full_image is None:
+                with Image.open(self.filename) as im:
+                    self._full_image = np.asarray(im.convert('RGBA'))
+            return self._full_image[y_min:y_max]
+
+        window = np.zeros((y_max - y_min, self.width, self.bands), dtype=np.uint8)
+        first = (y_min // self.segment_height) * self._segments_across
+        last = ((y_max - 1) // self.segment_height + 1) * self._segments_across
+        with open(self.filename, 'rb') as fd:
+            for segment in self._segments[first:last]:
+                (x, y, seg_w, seg_h, _, _) = segment
+                pixels = self._decode_segment(fd, segment)
+                top = max(y, y_min)
+                bottom = min(y + len(pixels), y_max, self.height)
+                right = min(x + seg_w, self.width)
+                if bottom > top:
+                    window[top - y_min:bottom - y_min, x:right] = pixels[top - y:bottom - y, :right - x]
+        return window
+
+
+def _to_rgba(pixels: np.ndarray) -> np.ndarray:
+    if pixels.shape[2] == 4:
+        return pixels
+    alpha = np.full(pixels.shape[:2] + (1,), 255, dtype=np.uint8)
+    if pixels.shape[2] == 1:
+        return np.concatenate([pixels, pixels, pixels, alpha], axis=2)
+    return np.concatenate([pixels, alpha], axis=2)
+
+
+def _tile_file(tiles_dir: str, zoom: int, x: int, y: int) -> str:
+    return '%s/%d/%d/%d.png' % (tiles_dir, zoom, x, y)
+
+
+def _save_tile(tiles_dir: str, zoom: int, x: int, y: int, pixels: np.ndarray):
+    """saves a tile, padded with transparent pixels up to TILE_SIZE, unless fully transparent"""
+    if not pixels[:, :, 3].any():
+        return
+    tile = np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8)
+    tile[:pixels.shape[0], :pixels.shape[1]] = pixels
+    Image.fromarray(tile, 'RGBA').save(_tile_file(tiles_dir, zoom, x, y))
+
+
+def _merge_children(tiles_dir: str, zoom: int, x: int, y: int):
+    """builds a tile from its four children at zoom + 1, downsampled by 2"""
+    merged = np.zeros((2 * TILE_SIZE, 2 * TILE_SIZE, 4), dtype=np.uint8)
+    found = False
+    for dx in range(2):
+        for dy in range(2):
+            child = _tile_file(tiles_dir, zoom + 1, 2 * x + dx, 2 * y + dy)
+            if os.path.exists(child):
+                with Image.open(child) as im:
+                    merged[dy * TILE_SIZE:(dy + 1) * TILE_SIZE, dx * TILE_SIZE:(dx + 1) * TILE_SIZE] = np.asarray(im)
+                found = True
+    if found:
+        Image.fromarray(merged, 'RGBA').reduce(2).save(_tile_file(tiles_dir, zoom, x, y))
+
+
+def orthophoto_max_zoom(width: int, height: int) -> int:
+    """zoom level at which the orthophoto is at its full resolution, the whole image fitting in one tile at zoom 0"""
+    return max(0, math.ceil(math.log2(max(width, height) / TILE_SIZE)))
+
+
+def build_orthophoto_tiles(src_file: str, target_dir: str, workers: int = 1) -> dict:
+    """
+    Cut the orthophoto into a pyramid of TILE_SIZE PNG tiles, target_dir/orthophoto_tiles/{zoom}/{x}/{y}.png, plus a
+    target_dir/orthophoto_tiles.json description.
+    The full resolution level is built from row windows of the source, one tile row at a time, each lower level by
+    merging the tiles of the level above. Tiles are encoded in a thread pool, fully transparent ones being skipped.
+    :return: the tiles description
+    """
+    reader = TiffWindowReader(src_file)
+    max_zoom = orthophoto_max_zoom(reader.width, reader.height)
+    tiles_dir = '%s/%s' % (target_dir, TILES_DIR_NAME)
+    shutil.rmtree(tiles_dir, ignore_errors=True)
+
+    def level_tiles(zoom: int) -> (int, int):
+        scale = 2 ** (max_zoom - zoom)
+        return math.ceil(reader.width / scale / TILE_SIZE), math.ceil(reader.height / scale / TILE_SIZE)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        (nb_x, nb_y) = level_tiles(max_zoom)
+        for x in range(nb_x):
+            Path('%s/%d/%d' % (tiles_dir, max_zoom, x)).mkdir(parents=True, exist_ok=True)
+        band_tiles = max(1, math.ceil(reader.segment_height / TILE_SIZE))
+        for band_y in tqdm(range(0, nb_y, band_tiles), desc='Tiling orthophoto'):
+            y_min = band_y * TILE_SIZE
+            band = _to_rgba(reader.read_rows(y_min, min(reader.height, y_min + band_tiles * TILE_SIZE)))
+            list(executor.map(
+                lambda xy: _save_tile(tiles_dir, max_zoom, xy[0], xy[1],
+                                      band[(xy[1] - band_y) * TILE_SIZE:(xy[1] - band_y + 1) * TILE_SIZE,
+                                           xy[0] * TILE_SIZE:(xy[0] + 1) * TILE_SIZE]),
+                [(x, y) for y in range(band_y, min(nb_y, band_y + band_tiles)) for x in range(nb_x)]))
+
+        for zoom in range(max_zoom - 1, -1, -1):
+            (nb_x, nb_y) = level_tiles(zoom)
+            for x in range(nb_x):
+                Path('%s/%d/%d' % (tiles_dir, zoom, x)).mkdir(parents=True, exist_ok=True)
+            list(executor.map(lambda xy: _merge_children(tiles_dir, zoom, xy[0], xy[1]),
+                              [(x, y) for x in range(nb_x) for y in range(nb_y)]))
+
+    description = {
+        'width': reader.width,
+        'height': reader.height,
+        'tileSize': TILE_SIZE,
+        'maxZoom': max_zoom,
+    }
+    with open('%s/%s.json' % (target_dir, TILES_DIR_NAME), 'w') as fd:
+        json.dump(description, fd)
+    return description
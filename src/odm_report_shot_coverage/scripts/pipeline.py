@@ -0,0 +1,64 @@
+"""
+Runs the report stages in a thread pool as soon as the stages they depend on are done, so that the image and orthophoto
+codecs (which release the GIL) overlap the 2.5d model parsing and the shot boundaries computation.
+"""
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, Future
+
+
+class Pipeline:
+    """
+    Stages are callables taking the results of the stages they depend on, run at most max_concurrency at a time, in the
+    order they were added among the ready ones.
+    If a stage raises, the stages not started yet are cancelled and the error is raised once the running ones are over.
+    With max_concurrency 1, the stages run in turn in the calling thread, e.g. for a profiler to see them.
+    """
+    max_concurrency: int
+
+    def __init__(self, max_concurrency: int = 4):
+        self.max_concurrency = max(1, max_concurrency)
+        self._stages = {}
+
+    def add(self, name: str, fn, after: 'list[str]' = ()):
+        """
+        :param fn: the stage function, called with the results of the after stages, in that order
+        :param after: the names of the stages to be completed first (already added)
+        """
+        if name in self._stages:
+            raise ValueError('Stage %s already added' % name)
+        for dependency in after:
+            if dependency not in self._stages:
+                raise ValueError('Stage %s depends on the unknown stage %s' % (name, dependency))
+        self._stages[name] = (fn, tuple(after))
+
+    def run(self) -> dict:
+        """
+        :return: the result of each stage, by name
+        """
+        results = {}
+        if self.max_concurrency == 1:
+            # the stages only depend on ones added before them
+            for (name, (fn, after)) in self._stages.items():
+                results[name] = fn(*[results[d] for d in after])
+            return results
+        pending = dict(self._stages)
+        running: 'dict[Future, str]' = {}
+        error = None
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            while len(pending) > 0 or len(running) > 0:
+                if error is None:
+                    ready = [name for (name, (_, after)) in pending.items() if all(d in results for d in after)]
+                    for name in ready[:self.max_concurrency - len(running)]:
+                        (fn, after) = pending.pop(name)
+                        running[executor.submit(fn, *[results[d] for d in after])] = name
+                elif len(running) == 0:
+                    break
+                (done, _) = wait(running.keys(), return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    if future.exception() is not None:
+                        error = error or future.exception()
+                    else:
+                        results[name] = future.result()
+        if error is not None:
+            raise error
+        return results
@@ -0,0 +1,38 @@
+"""
+Which shots cover a ground point of an already built report, answered from the shot lookup index written along the
+report (memory-mapped, so that only the queried cell is read), without parsing the project again.
+"""
+import argparse
+import json
+import sys
+
+from odm_report_shot_coverage.models.shot_lookup import load_shot_lookup, ShotLookup
+from odm_report_shot_coverage.scripts.options import parse_query_args, report_dir
+
+
+def query_shots(lookup: ShotLookup, x: float, y: float) -> dict:
+    """the point, its grid cell and the image names of the shots covering it"""
+    return {
+        'x': x,
+        'y': y,
+        'cell': lookup.cell_at(x, y),
+        'imageNames': lookup.image_names_at(x, y),
+    }
+
+
+def main(argv: 'list[str]' = None):
+    run(parse_query_args(argv))
+
+
+def run(args: argparse.Namespace):
+    """the query command, on the options of parse_query_args"""
+    try:
+        lookup = load_shot_lookup(report_dir(args.project) + '/data')
+    except FileNotFoundError:
+        sys.exit('No shot lookup in %s, build the report first' % report_dir(args.project))
+    result = query_shots(lookup, args.x, args.y)
+    if args.json:
+        print(json.dumps(result))
+        return
+    for image_name in result['imageNames']:
+        print(image_name)
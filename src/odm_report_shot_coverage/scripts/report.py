@@ -1,36 +1,117 @@
+import contextlib
+import cProfile
 import json
 import os
 import argparse
+import sys
+import time
 from shutil import copy, SameFileError
 import logging
-from tqdm import tqdm
 
+import numpy as np
 from PIL import Image
 from pathlib import Path
 
-from odm_report_shot_coverage.models.reconstruction import parse_reconstruction
-from odm_report_shot_coverage.models.shot import Boundaries
+from odm_report_shot_coverage.models.coverage import coverage_raster_from_shots
+from odm_report_shot_coverage.models.overlap import overlap_graph_from_boundaries
+from odm_report_shot_coverage.models.reconstruction import parse_reconstruction, Reconstruction, MemoryBudgetError
+from odm_report_shot_coverage.models.shot import Shot
+from odm_report_shot_coverage.models.shot_boundary_pool import ShotBoundaryPool
+from odm_report_shot_coverage.models.wavefront_25d import wavefront_25d_cache_key
+from odm_report_shot_coverage.scripts.manifest import ReportManifest, load_report_manifest, file_fingerprint, \
+    shot_fingerprint
+from odm_report_shot_coverage.scripts.options import parse_report_args, report_dir, cache_dir, thread_count, \
+    MAX_CONCURRENT_STAGES
+from odm_report_shot_coverage.scripts.pipeline import Pipeline
+from odm_report_shot_coverage.scripts.orthophoto_tiles import build_orthophoto_tiles, TILES_DIR_NAME
+from odm_report_shot_coverage.scripts.thumbnails import make_thumbnails
+from odm_report_shot_coverage.scripts.timings import StageTimings, projection_counters, json_parse_stage_timings, \
+    TIMINGS_FILE_NAME, PROFILE_FILE_NAME
+from odm_report_shot_coverage.scripts.viewer_data import write_viewer_data
 
 Image.MAX_IMAGE_PIXELS = 1000000000
 
 
-def _copy_orthophoto(src_dir: str, target_dir: str) -> Boundaries:
-    logging.info('Copying orthophoto')
-    im = Image.open('%s/odm_orthophoto/odm_orthophoto.tif' % src_dir)
-    im.save('%s/odm_orthophoto.png' % target_dir)
+def copy_orthophoto(src_dir: str, target_dir: str, manifest: ReportManifest, threads: int):
+    src_file = '%s/odm_orthophoto/odm_orthophoto.tif' % src_dir
+    fingerprint = file_fingerprint(src_file)
+    if manifest.is_orthophoto_up_to_date(fingerprint) and os.path.exists('%s/%s.json' % (target_dir, TILES_DIR_NAME)):
+        logging.info('Orthophoto is up to date')
+        return
+    logging.info('Tiling orthophoto')
+    build_orthophoto_tiles(src_file, target_dir, workers=threads)
+    Path('%s/odm_orthophoto.png' % target_dir).unlink(missing_ok=True)
+    manifest.orthophoto = fingerprint
 
 
-def _copy_images(src_dir: str, target_dir: str):
-    Path(target_dir).mkdir(parents=True, exist_ok=True)
-    target_size = 400
-    image_files = os.listdir(src_dir)
-    for file_name in tqdm(image_files, desc='Resizing images'):
-        im = Image.open('%s/%s' % (src_dir, file_name))
-        width, height = im.size
-        max_size = max(width, height)
-        new_size = (int(width * target_size / max_size), int(height * target_size / max_size))
-        im = im.resize(new_size)
-        im.save('%s/%s' % (target_dir, file_name))
+def compute_stale_shot_boundaries(project_dir: str, reconstruction: Reconstruction, manifest: ReportManifest,
+                                  workers: int, occlusion_resolution: int = None, boundary_mode: str = 'star',
+                                  footprint: str = 'vertices', pool: ShotBoundaryPool = None,
+                                  sample_spacing: float = None, shots: 'list[Shot]' = None,
+                                  memory_budget: float = None) -> 'list[Shot]':
+    """
+    Compute the boundaries of the shots whose fingerprint has changed, the others being taken from the manifest
+    :param shots: the only shots to look at; if None, all of them, the shots no longer in the project being dropped
+    from the manifest
+    :return: the shots whose boundaries were computed
+    """
+    mesh_key = wavefront_25d_cache_key('%s/odm_texturing_25d/odm_textured_model_geo.obj' % project_dir)
+    settings = {'occlusionResolution': occlusion_resolution, 'boundaryMode': boundary_mode, 'footprint': footprint,
+                'sampleSpacing': sample_spacing, 'compactPoints': memory_budget is not None}
+    fingerprints = {}
+    stale_shots = []
+    for shot in reconstruction.shots if shots is None else shots:
+        fingerprints[shot.image_name] = shot_fingerprint(shot, mesh_key, settings)
+        boundaries = manifest.shot_boundaries(shot.image_name, fingerprints[shot.image_name])
+        if boundaries is None:
+            stale_shots.append(shot)
+        else:
+            shot.boundaries = boundaries
+    logging.info('Computing %d shot boundaries (%d up to date)' % (len(stale_shots), len(fingerprints) - len(stale_shots)))
+    reconstruction.compute_shot_boundaries(workers=workers, shots=stale_shots, occlusion_resolution=occlusion_resolution,
+                                           boundary_mode=boundary_mode, footprint=footprint, pool=pool,
+                                           sample_spacing=sample_spacing, memory_budget=memory_budget)
+
+    if shots is None:
+        manifest.shots = {}
+    for shot in reconstruction.shots if shots is None else shots:
+        manifest.set_shot_boundaries(shot.image_name, fingerprints[shot.image_name], shot.boundaries)
+    return stale_shots
+
+
+def _write_coverage(project_dir: str, reconstruction: Reconstruction, target_dir: str, scale: int) -> dict:
+    """
+    The count of shots covering each cell of the orthophoto grid, one cell per scale x scale orthophoto pixels, as a
+    16 bits PNG plus its stats
+    """
+    with Image.open('%s/odm_orthophoto/odm_orthophoto.tif' % project_dir) as im:
+        (width, height) = im.size
+    raster = coverage_raster_from_shots((shot.boundaries for shot in reconstruction.shots),
+                                        reconstruction.orthophoto_boundaries,
+                                        max(1, width // scale), max(1, height // scale))
+    raster.save_png('%s/coverage.png' % target_dir)
+    stats = raster.stats()
+    with open('%s/coverage.json' % target_dir, 'w') as fd:
+        json.dump(stats, fd)
+    logging.info('Coverage: %.1f%% of the orthophoto covered, by %.1f shots on average' % (
+        100 * stats['coveredRatio'], stats['meanCount']))
+    return stats
+
+
+def _write_overlaps(reconstruction: Reconstruction, target_dir: str) -> dict:
+    """
+    The overlap graph of the shot footprints, as an adjacency list, plus its stats. The shots are in capture order, the
+    flight headings telling forward from side overlaps being taken from one shot to the next.
+    """
+    shots = reconstruction.capture_ordered_shots
+    graph = overlap_graph_from_boundaries([shot.boundaries for shot in shots],
+                                          np.array([shot.translation for shot in shots]).reshape((-1, 3)))
+    with open('%s/shot_overlaps.json' % target_dir, 'w') as fd:
+        json.dump(graph.to_json([shot.image_name for shot in shots]), fd, separators=(',', ':'))
+    stats = graph.stats()
+    logging.info('Overlaps: %d pairs, forward %.0f%%, side %.0f%% on average' % (
+        stats['pairs'], 100 * stats['meanForwardOverlap'], 100 * stats['meanSideOverlap']))
+    return stats
 
 
 def _copy_web_app(target_dir: str):
@@ -44,35 +125,143 @@ def _copy_web_app(target_dir: str):
                 pass
 
 
-def main():
-    logging.basicConfig(level=logging.INFO)
-    parser = argparse.ArgumentParser(description='Build an OpenDroneMap shot coverage report')
-    parser.add_argument("project", help="the ODM project root folder",
-                        type=str)
-    args = parser.parse_args()
-    project_dir = args.project
+def build_report(project_dir: str, args: argparse.Namespace, pool: ShotBoundaryPool = None) -> dict:
+    """
+    Build the shot coverage report of one project
+    :param args: the options of add_report_arguments
+    :param pool: an open pool to compute the shot boundaries with (one is opened per project if None and workers > 1)
+    :return: the number of shots, the coverage stats and the stage timings
+    """
+    if not os.path.isdir(project_dir):
+        raise FileNotFoundError('No ODM project directory %s' % project_dir)
+    if not args.profile:
+        return _build_report(project_dir, args, pool)
 
-    out_dir = project_dir + '/odm_report/shot_coverage'
+    profile = cProfile.Profile()
+    summary = profile.runcall(_build_report, project_dir, args, pool)
+    out_dir = report_dir(project_dir)
+    profile.dump_stats('%s/%s' % (out_dir, PROFILE_FILE_NAME))
+    with open('%s/%s' % (out_dir, TIMINGS_FILE_NAME), 'w') as fd:
+        json.dump(summary['timings'], fd, indent=1)
+    return summary
+
+
+def _build_report(project_dir: str, args: argparse.Namespace, pool: ShotBoundaryPool) -> dict:
+    workers = args.workers if args.workers > 0 else os.cpu_count()
+    timings = StageTimings()
+
+    out_dir = report_dir(project_dir)
+    mesh_cache_dir = None if args.no_cache else cache_dir(project_dir)
     Path(out_dir + '/data').mkdir(parents=True, exist_ok=True)
 
-    _copy_web_app(out_dir)
-    _copy_images(project_dir + '/images', out_dir + '/images')
-    _copy_orthophoto(project_dir, out_dir + '/data')
+    previous_manifest = load_report_manifest(out_dir)
+    manifest = previous_manifest if args.incremental else ReportManifest()
+    # thumbnails only depend on their source image and settings, so they are reused even in a full run
+    manifest.images = previous_manifest.images
+
+    def copy_web_app():
+        with timings.stage('web copy'):
+            _copy_web_app(out_dir)
+
+    def resize_images():
+        with timings.stage('image resize') as counters:
+            counters['resized'] = make_thumbnails(project_dir + '/images', out_dir + '/images', manifest,
+                                                  size=args.thumbnail_size, quality=args.thumbnail_quality,
+                                                  workers=thread_count(args))
+            counters['images'] = len(manifest.images)
 
-    logging.info('Parsing reconstruction')
-    reconstruction = parse_reconstruction(project_dir)
+    def tile_orthophoto():
+        with timings.stage('orthophoto'):
+            copy_orthophoto(project_dir, out_dir + '/data', manifest, thread_count(args))
 
-    logging.info('Computing shot boundaries')
-    reconstruction.compute_shot_boundaries()
+    def parse():
+        logging.info('Parsing reconstruction')
+        return parse_reconstruction(project_dir, cache_dir=mesh_cache_dir, rebuild_cache=args.rebuild_cache,
+                                    stage=timings.stage, compact=args.memory_budget is not None)
 
-    logging.info('Saving reconstruction_shots.json')
-    with open('%s/data/reconstruction_shots.json' % out_dir, 'w') as fd_out:
-        json.dump(reconstruction.to_json(), fd_out)
+    def compute_shot_boundaries(reconstruction: Reconstruction) -> Reconstruction:
+        logging.info('Computing shot boundaries')
+        with timings.stage('shot boundaries') as counters:
+            start = time.perf_counter()
+            computed = compute_stale_shot_boundaries(project_dir, reconstruction, manifest, workers,
+                                                     occlusion_resolution=args.occlusion_resolution if args.occlusion
+                                                     else None,
+                                                     boundary_mode=args.boundary_mode, footprint=args.footprint,
+                                                     pool=pool, sample_spacing=args.sample_spacing,
+                                                     memory_budget=args.memory_budget)
+            counters.update(projection_counters(computed, time.perf_counter() - start))
+            if args.memory_budget is not None:
+                counters['memoryBudgetMB'] = args.memory_budget
+            counters['upToDate'] = len(reconstruction.shots) - len(computed)
+            counters['vertices'] = len(reconstruction.sampled_mesh(args.sample_spacing).points)
+        return reconstruction
+
+    def write_coverage(reconstruction: Reconstruction) -> dict:
+        logging.info('Computing coverage raster')
+        with timings.stage('coverage'):
+            return _write_coverage(project_dir, reconstruction, out_dir + '/data', args.coverage_scale)
+
+    def write_overlaps(reconstruction: Reconstruction) -> dict:
+        logging.info('Computing shot overlaps')
+        with timings.stage('overlaps') as counters:
+            stats = _write_overlaps(reconstruction, out_dir + '/data')
+            counters['pairs'] = stats['pairs']
+            return stats
+
+    def write_shot_lookup(reconstruction: Reconstruction):
+        logging.info('Indexing the shots covering each ground cell')
+        with timings.stage('shot lookup') as counters:
+            lookup = reconstruction.shot_lookup(args.lookup_resolution)
+            lookup.save(out_dir + '/data')
+            counters['cells'] = lookup.width * lookup.height
+            counters['entries'] = len(lookup.shot_ids)
+
+    def write_shots(reconstruction: Reconstruction):
+        logging.info('Saving the shots index and boundaries')
+        with timings.stage('json write'):
+            write_viewer_data(reconstruction, out_dir + '/data', args.precision)
+
+    # the image and orthophoto codecs release the GIL, and overlap the parsing and the shot boundaries; cProfile only
+    # sees the thread it runs in, so the profiled stages run in turn in this one
+    pipeline = Pipeline(1 if args.profile else args.concurrent_stages if args.concurrent_stages > 0 else
+                        min(MAX_CONCURRENT_STAGES, os.cpu_count()))
+    pipeline.add('web copy', copy_web_app)
+    pipeline.add('parse', parse)
+    pipeline.add('image resize', resize_images)
+    pipeline.add('orthophoto', tile_orthophoto)
+    pipeline.add('shot boundaries', compute_shot_boundaries, after=['parse'])
+    pipeline.add('coverage', write_coverage, after=['shot boundaries'])
+    pipeline.add('overlaps', write_overlaps, after=['shot boundaries'])
+    pipeline.add('shot lookup', write_shot_lookup, after=['shot boundaries'])
+    pipeline.add('json write', write_shots, after=['shot boundaries'])
+    pipeline.add('manifest', lambda *_: manifest.save(out_dir), after=['image resize', 'orthophoto', 'shot boundaries'])
+    # the pool forks its workers before the pipeline threads start, a child forked while they run could inherit the locks
+    # they hold
+    own_pool = pool is None and workers > 1 and args.footprint == 'vertices'
+    with ShotBoundaryPool(workers) if own_pool else contextlib.nullcontext(pool) as pool:
+        results = pipeline.run()
+    return {'shots': len(results['parse'].shots), 'coverage': results['coverage'], 'overlap': results['overlaps'],
+            'timings': timings.to_json()}
+
+
+def main(argv: 'list[str]' = None):
+    run(parse_report_args(argv))
+
+
+def run(args: argparse.Namespace):
+    """the report command, on the options of parse_report_args"""
+    logging.basicConfig(level=logging.INFO)
+    try:
+        summary = build_report(args.project, args)
+    except MemoryBudgetError as e:
+        sys.exit(str(e))
 
+    print(json_parse_stage_timings(summary['timings']).gantt())
     print('Shot coverage completed')
     print('To open the results page, launch:')
-    print('python -m http.server --directory %s 8001' % out_dir)
+    print('python -m http.server --directory %s 8001' % report_dir(args.project))
     print('And open http://localhost:8001 (or change port value if already taken)')
+    print('(or serve it with: odm-report-shot-coverage serve %s)' % args.project)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,363 @@
+"""
+An asyncio web server over an ODM project, serving the report web app as soon as the project is parsed (the 2.5d model
+through its binary cache), each piece of data being computed on its first request instead of the whole report first:
+  * the shot boundaries, by chunks of the viewer, in a worker thread, kept serialized in a memory LRU cache and in the
+    report manifest, so that they survive a restart
+  * the image thumbnails, one at a time
+  * the shot lookup index, once all the boundaries are there
+The orthophoto tiles are built in the background. Every response carries an ETag, answered with a 304 when the
+browser already has it.
+"""
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Executor
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+from odm_report_shot_coverage.models.reconstruction import parse_reconstruction, projection_chunk_size, \
+    MemoryBudgetError
+from odm_report_shot_coverage.models.shot_boundary_pool import ShotBoundaryPool
+from odm_report_shot_coverage.models.shot_lookup import SHOT_LOOKUP_FILE_NAME, SHOT_LOOKUP_BINARY_FILE_NAME
+from odm_report_shot_coverage.scripts.manifest import ReportManifest, load_report_manifest, file_fingerprint
+from odm_report_shot_coverage.scripts.options import parse_serve_args, report_dir, cache_dir, thread_count, \
+    DEFAULT_CACHE_CHUNKS
+from odm_report_shot_coverage.scripts.report import compute_stale_shot_boundaries, copy_orthophoto
+from odm_report_shot_coverage.scripts.thumbnails import is_image_file, make_thumbnail
+from odm_report_shot_coverage.scripts.viewer_data import shots_index, boundaries_chunk, BOUNDARIES_DIR_NAME, \
+    BOUNDARIES_CHUNK_SIZE, SHOTS_INDEX_FILE_NAME
+
+WEB_DIR = os.path.dirname(__file__) + '/web'
+
+_CHUNK_PATH = re.compile(r'^/data/%s/(\d+)\.json$' % BOUNDARIES_DIR_NAME)
+_IMAGE_PATH = re.compile(r'^/images/([^/]+)$')
+_REASONS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            500: 'Internal Server Error'}
+# thumbnails and orthophoto tiles only change with their source, the rest is revalidated on every use
+_IMMUTABLE_CACHE_CONTROL = 'max-age=3600'
+_REVALIDATE_CACHE_CONTROL = 'no-cache'
+# the manifest is rewritten whole, at most that often (in seconds) while shots are computed, and when closing
+_MANIFEST_SAVE_INTERVAL = 60
+
+
+class Response:
+    status: int
+    body: bytes
+    content_type: str
+    etag: str
+    cache_control: str
+
+    def __init__(self, status: int, body: bytes = b'', content_type: str = 'text/plain', etag: str = None,
+                 cache_control: str = _REVALIDATE_CACHE_CONTROL):
+        self.status = status
+        self.body = body
+        self.content_type = content_type
+        self.etag = etag
+        self.cache_control = cache_control
+
+
+def json_response(el) -> Response:
+    body = json.dumps(el, separators=(',', ':')).encode('utf-8')
+    return Response(200, body, 'application/json', '"%s"' % hashlib.sha1(body).hexdigest()[:20])
+
+
+def file_response(filename: str, cache_control: str = _REVALIDATE_CACHE_CONTROL) -> Response:
+    """the file content, its ETag being its modification time and size, a 404 if there is no such file"""
+    try:
+        stat = os.stat(filename)
+        with open(filename, 'rb') as fd:
+            body = fd.read()
+    except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+        return Response(404, b'Not found')
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    return Response(200, body, content_type, '"%x-%x"' % (stat.st_mtime_ns, stat.st_size), cache_control)
+
+
+def _contained_file(base_dir: str, relative_path: str) -> str:
+    """the file of base_dir at relative_path, None if the path goes out of base_dir"""
+    base_dir = os.path.realpath(base_dir)
+    filename = os.path.realpath(os.path.join(base_dir, relative_path.lstrip('/')))
+    if not filename.startswith(base_dir + os.sep):
+        return None
+    return filename
+
+
+class LruCache:
+    """The values most recently got or put, up to max_size of them"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._values = OrderedDict()
+
+    def get(self, key):
+        """the value, None if not cached"""
+        if key not in self._values:
+            return None
+        self._values.move_to_end(key)
+        return self._values[key]
+
+    def put(self, key, value):
+        self._values[key] = value
+        self._values.move_to_end(key)
+        while len(self._values) > self.max_size:
+            self._values.popitem(last=False)
+
+    def __len__(self):
+        return len(self._values)
+
+
+class ReportServer:
+    """
+    The CPU bound work runs in executors, so the event loop keeps answering: a single thread computes the shot
+    boundaries (it owns the reconstruction and the shot entries of the manifest, and spreads the shots over the pool
+    if one is given), a pool of threads resizes the images and another thread tiles the orthophoto. Concurrent requests
+    for the same piece of data wait for the same computation.
+    """
+    project_dir: str
+    out_dir: str
+    chunks: LruCache
+
+    def __init__(self, project_dir: str, args: argparse.Namespace, cache_chunks: int = DEFAULT_CACHE_CHUNKS,
+                 pool: ShotBoundaryPool = None):
+        """
+        :param args: the options of add_report_arguments
+        :param pool: an open pool to compute the shot boundaries with, in the compute thread
+        """
+        self.project_dir = project_dir
+        self.out_dir = report_dir(project_dir)
+        self.chunks = LruCache(cache_chunks)
+        self.reconstruction = None
+        self.manifest = ReportManifest()
+        self._args = args
+        self._workers = args.workers if args.workers > 0 else os.cpu_count()
+        self._pool = pool
+        self._shots_index = None
+        self._manifest_saved_at = time.monotonic()
+        self._lookup_built = False
+        self._pending = {}
+        # image thumbnails are recorded from the image threads, while the compute thread saves the manifest
+        self._images_lock = threading.Lock()
+        self._compute_executor = ThreadPoolExecutor(max_workers=1)
+        self._image_executor = ThreadPoolExecutor(max_workers=thread_count(args))
+        self._orthophoto_executor = ThreadPoolExecutor(max_workers=1)
+
+    def load(self):
+        """parse the project and take the shot boundaries and thumbnails of the previous runs"""
+        Path(self.out_dir + '/data').mkdir(parents=True, exist_ok=True)
+        self.reconstruction = parse_reconstruction(self.project_dir,
+                                                   cache_dir=None if self._args.no_cache else cache_dir(self.project_dir),
+                                                   rebuild_cache=self._args.rebuild_cache,
+                                                   compact=self._args.memory_budget is not None)
+        if self._args.memory_budget is not None and self._args.sample_spacing is None:
+            # fail now rather than on the first boundaries request
+            projection_chunk_size(self._args.memory_budget, self.reconstruction.mesh, self._workers)
+        self.manifest = load_report_manifest(self.out_dir)
+        self._shots_index = json_response(shots_index(self.reconstruction, self._args.precision))
+
+    def close(self):
+        """wait for the running computations and save the manifest"""
+        for executor in [self._orthophoto_executor, self._image_executor]:
+            executor.shutdown()
+        self._compute_executor.submit(self._save_manifest).result()
+        self._compute_executor.shutdown()
+
+    async def serve(self, host: str, port: int, started: asyncio.Future = None):
+        """
+        Serve until cancelled
+        :param started: set to the bound (host, port) once listening, e.g. to get the port picked for port 0
+        """
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        asyncio.get_running_loop().run_in_executor(self._orthophoto_executor, self._build_orthophoto)
+        address = server.sockets[0].getsockname()[:2]
+        logging.info('Serving %s on http://%s:%d' % (self.project_dir, *address))
+        if started is not None:
+            started.set_result(address)
+        async with server:
+            await server.serve_forever()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """HTTP/1.1 GET and HEAD requests, the connection being kept alive unless the client asks to close it"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    (name, _, value) = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                parts = request_line.decode('latin-1').split()
+                if len(parts) != 3:
+                    await self._write(writer, 'GET', Response(400, b'Bad request'), False)
+                    break
+                (method, target, version) = parts
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                await self._write(writer, method, await self._respond(method, target, headers), keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, method: str, target: str, headers: dict) -> Response:
+        if method not in ('GET', 'HEAD'):
+            return Response(405, b'Method not allowed')
+        try:
+            response = await self.get(unquote(urlsplit(target).path))
+        except Exception:
+            logging.exception('Failed to serve %s' % target)
+            return Response(500, b'Internal server error')
+        if response.status == 200 and response.etag is not None and headers.get('if-none-match') == response.etag:
+            return Response(304, etag=response.etag, cache_control=response.cache_control)
+        return response
+
+    @staticmethod
+    async def _write(writer: asyncio.StreamWriter, method: str, response: Response, keep_alive: bool):
+        lines = ['HTTP/1.1 %d %s' % (response.status, _REASONS[response.status]),
+                 'Content-Type: %s' % response.content_type,
+                 'Content-Length: %d' % len(response.body),
+                 'Cache-Control: %s' % response.cache_control,
+                 'Connection: %s' % ('keep-alive' if keep_alive else 'close')]
+        if response.etag is not None:
+            lines.append('ETag: %s' % response.etag)
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        if method != 'HEAD':
+            writer.write(response.body)
+        await writer.drain()
+
+    async def get(self, path: str) -> Response:
+        """the response to a GET of the path, the data being computed if needed"""
+        if path == '/':
+            path = '/index.html'
+        if path == '/data/' + SHOTS_INDEX_FILE_NAME:
+            return self._shots_index
+        match = _CHUNK_PATH.match(path)
+        if match is not None:
+            return await self._boundaries_chunk(int(match.group(1)))
+        match = _IMAGE_PATH.match(path)
+        if match is not None:
+            return await self._image(match.group(1))
+        if path in ('/data/' + SHOT_LOOKUP_FILE_NAME, '/data/' + SHOT_LOOKUP_BINARY_FILE_NAME):
+            if not self._lookup_built:
+                await self._once('lookup', self._compute_executor, self._build_shot_lookup)
+                self._lookup_built = True
+            return file_response(self.out_dir + path)
+        if path.startswith('/data/'):
+            # whatever a previous report run or the background tiling wrote, the tiles never changing under a name
+            filename = _contained_file(self.out_dir + '/data', path[len('/data'):])
+            cache_control = _IMMUTABLE_CACHE_CONTROL if path.endswith('.png') else _REVALIDATE_CACHE_CONTROL
+            return Response(404, b'Not found') if filename is None else file_response(filename, cache_control)
+        filename = _contained_file(WEB_DIR, path)
+        return Response(404, b'Not found') if filename is None else file_response(filename)
+
+    async def _once(self, key, executor: Executor, fn, *args):
+        """run fn in the executor, or wait for the run already started under the same key"""
+        future = self._pending.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+            self._pending[key] = future
+            future.add_done_callback(lambda _: self._pending.pop(key, None))
+        # a client hanging up must not cancel the computation the others wait for
+        return await asyncio.shield(future)
+
+    async def _boundaries_chunk(self, chunk: int) -> Response:
+        if chunk * BOUNDARIES_CHUNK_SIZE >= len(self.reconstruction.shots):
+            return Response(404, b'Not found')
+        response = self.chunks.get(chunk)
+        if response is None:
+            response = await self._once(('chunk', chunk), self._compute_executor, self._compute_chunk, chunk)
+            self.chunks.put(chunk, response)
+        return response
+
+    async def _image(self, file_name: str) -> Response:
+        src_file = '%s/images/%s' % (self.project_dir, file_name)
+        if not is_image_file(file_name) or not os.path.isfile(src_file):
+            return Response(404, b'Not found')
+        target_file = '%s/images/%s' % (self.out_dir, file_name)
+        fingerprint = dict(file_fingerprint(src_file), thumbnail_size=self._args.thumbnail_size,
+                           thumbnail_quality=self._args.thumbnail_quality)
+        if not self.manifest.is_image_up_to_date(file_name, fingerprint) or not os.path.exists(target_file):
+            await self._once(('image', file_name), self._image_executor, self._make_thumbnail, src_file, target_file,
+                             fingerprint)
+        return file_response(target_file, _IMMUTABLE_CACHE_CONTROL)
+
+    def _make_thumbnail(self, src_file: str, target_file: str, fingerprint: dict):
+        Path(os.path.dirname(target_file)).mkdir(parents=True, exist_ok=True)
+        make_thumbnail(src_file, target_file, self._args.thumbnail_size, self._args.thumbnail_quality)
+        with self._images_lock:
+            self.manifest.set_image(os.path.basename(target_file), fingerprint)
+
+    def _compute_shot_boundaries(self, shots: list):
+        """in the compute thread: the stale boundaries of the shots, saved in the manifest"""
+        args = self._args
+        computed = compute_stale_shot_boundaries(self.project_dir, self.reconstruction, self.manifest, self._workers,
+                                                 occlusion_resolution=args.occlusion_resolution if args.occlusion
+                                                 else None,
+                                                 boundary_mode=args.boundary_mode, footprint=args.footprint,
+                                                 pool=self._pool, sample_spacing=args.sample_spacing, shots=shots,
+                                                 memory_budget=args.memory_budget)
+        if len(computed) > 0 and time.monotonic() - self._manifest_saved_at > _MANIFEST_SAVE_INTERVAL:
+            self._save_manifest()
+
+    def _compute_chunk(self, chunk: int) -> Response:
+        shots = self.reconstruction.shots[chunk * BOUNDARIES_CHUNK_SIZE:(chunk + 1) * BOUNDARIES_CHUNK_SIZE]
+        self._compute_shot_boundaries(shots)
+        return json_response(boundaries_chunk(self.reconstruction, chunk, self._args.precision))
+
+    def _build_shot_lookup(self):
+        self._compute_shot_boundaries(self.reconstruction.shots)
+        self.reconstruction.shot_lookup(self._args.lookup_resolution).save(self.out_dir + '/data')
+
+    def _build_orthophoto(self):
+        try:
+            copy_orthophoto(self.project_dir, self.out_dir + '/data', self.manifest, thread_count(self._args))
+        except Exception:
+            logging.exception('Failed to tile the orthophoto')
+            return
+        self._compute_executor.submit(self._save_manifest)
+
+    def _save_manifest(self):
+        """in the compute thread, the only one changing the shot entries"""
+        with self._images_lock:
+            images = dict(self.manifest.images)
+        manifest = ReportManifest()
+        (manifest.images, manifest.orthophoto, manifest.shots) = (images, self.manifest.orthophoto, self.manifest.shots)
+        manifest.save(self.out_dir)
+        self._manifest_saved_at = time.monotonic()
+
+
+def main(argv: 'list[str]' = None):
+    run(parse_serve_args(argv))
+
+
+def run(args: argparse.Namespace):
+    """the serve command, on the options of parse_serve_args"""
+    logging.basicConfig(level=logging.INFO)
+    workers = args.workers if args.workers > 0 else os.cpu_count()
+
+    with ShotBoundaryPool(workers) if workers > 1 else contextlib.nullcontext() as pool:
+        server = ReportServer(args.project, args, args.cache_chunks, pool)
+        try:
+            server.load()
+        except MemoryBudgetError as e:
+            sys.exit(str(e))
+        try:
+            asyncio.run(server.serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
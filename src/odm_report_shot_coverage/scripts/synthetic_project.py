@@ -0,0 +1,191 @@
+"""
+Synthetic ODM projects, to test and benchmark the report at any scale: a nadir lawnmower survey over a wavy height field,
+with the files the report reads (cameras.json, odm_report/shots.geojson, odm_report/stats.json, the 2.5d model .obj,
+the orthophoto GeoTIFF and its corners, and the images).
+
+    python -m odm_report_shot_coverage.scripts.synthetic_project TARGET_DIR [--shots 1000] [--vertices 1000000]
+"""
+import argparse
+import json
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+from tqdm import tqdm
+
+from odm_report_shot_coverage.models.camera import json_parse_camera
+
+CAMERA_NAME = 'synthetic 4000 3000 perspective 0.6'
+CAMERA_JSON = {
+    'projection_type': 'perspective',
+    'width': 4000,
+    'height': 3000,
+    'focal_x': 0.6,
+    'focal_y': 0.6,
+}
+
+
+def synthetic_height_field(x_range: (float, float), y_range: (float, float), z_range: (float, float),
+                           nb_vertices: int, seed: int = 42) -> (np.ndarray, np.ndarray):
+    """
+    A wavy height field of about nb_vertices vertices on a regular grid, two facets per grid cell
+    :return: the vertices, of shape (N, 3), and the facets, of shape (M, 3)
+    """
+    rng = np.random.default_rng(seed)
+    ratio = (x_range[1] - x_range[0]) / (y_range[1] - y_range[0])
+    nb_y = max(2, int(np.sqrt(nb_vertices / ratio)))
+    nb_x = max(2, int(nb_vertices / nb_y))
+    xs, ys = np.meshgrid(np.linspace(x_range[0], x_range[1], nb_x), np.linspace(y_range[0], y_range[1], nb_y))
+    zs = _height(xs, ys, z_range)
+    zs += rng.normal(0, (z_range[1] - z_range[0]) / 50, zs.shape)
+
+    points = np.stack([xs.ravel(), ys.ravel(), zs.ravel()], axis=1)
+    corners = (np.arange(nb_y - 1)[:, np.newaxis] * nb_x + np.arange(nb_x - 1)).ravel()
+    facets = np.concatenate([
+        np.stack([corners, corners + 1, corners + nb_x], axis=1),
+        np.stack([corners + 1, corners + nb_x + 1, corners + nb_x], axis=1),
+    ]).astype(np.int32)
+    return points, facets
+
+
+def _height(xs: np.ndarray, ys: np.ndarray, z_range: (float, float)) -> np.ndarray:
+    return (z_range[0] + z_range[1]) / 2 + (z_range[1] - z_range[0]) / 4 * np.sin(xs / 3) * np.cos(ys / 5)
+
+
+def write_obj(points: np.ndarray, facets: np.ndarray, filename: str):
+    """The vertices and facets of a 2.5d model, as a wavefront .obj file"""
+    with open(filename, 'w') as fd:
+        np.savetxt(fd, points, fmt='v %.6f %.6f %.6f')
+        np.savetxt(fd, np.asarray(facets).reshape((-1, 3)) + 1, fmt='f %d %d %d')
+
+
+def survey_poses(nb_shots: int, altitude: float = 10, overlap: float = 0.7, seed: int = 42) -> \
+        (np.ndarray, np.ndarray, float):
+    """
+    The positions and rotations of a nadir lawnmower survey, flown with the synthetic camera, consecutive shots
+    overlapping by about the given ratio, with a little attitude noise
+    :return: the positions, the rotation vectors and the ground footprint side of a shot
+    """
+    rng = np.random.default_rng(seed)
+    camera = json_parse_camera(CAMERA_NAME, CAMERA_JSON)
+    footprint = 2 * altitude * min(camera._width_rel_max, camera._height_rel_max) / camera.focal
+    step = footprint * (1 - overlap)
+    nb_x = max(1, int(np.ceil(np.sqrt(nb_shots))))
+
+    i = np.arange(nb_shots)
+    row = i // nb_x
+    # back and forth along the rows
+    column = np.where(row % 2 == 0, i % nb_x, nb_x - 1 - i % nb_x)
+    positions = np.stack([column * step, row * step, np.full(nb_shots, float(altitude))], axis=1)
+    rotations = np.tile([np.pi, 0, 0], (nb_shots, 1)) + rng.normal(0, np.radians(2), (nb_shots, 3))
+    return positions, rotations, footprint
+
+
+def _write_images(target_dir: str, image_names: 'list[str]', width: int, seed: int):
+    """JPEG stand-ins for the shots, crops of a single noisy gradient, at the camera aspect ratio"""
+    Path(target_dir).mkdir(parents=True, exist_ok=True)
+    height = width * CAMERA_JSON['height'] // CAMERA_JSON['width']
+    rng = np.random.default_rng(seed)
+    ys, xs = np.mgrid[0:2 * height, 0:2 * width]
+    base = np.stack([xs * 255 // (2 * width), ys * 255 // (2 * height), (xs + ys) % 256], axis=2)
+    base = np.clip(base + rng.normal(0, 12, base.shape), 0, 255).astype(np.uint8)
+    for (k, image_name) in enumerate(tqdm(image_names, desc='Writing synthetic images')):
+        x = (k * 37) % width
+        y = (k * 23) % height
+        Image.fromarray(base[y:y + height, x:x + width]).save('%s/%s' % (target_dir, image_name), quality=90)
+
+
+def _write_orthophoto(target_dir: str, x_range: (float, float), y_range: (float, float), z_range: (float, float),
+                      max_side: int):
+    """An RGBA GeoTIFF colored by the height field (north up), and its corners file"""
+    Path(target_dir).mkdir(parents=True, exist_ok=True)
+    ratio = (x_range[1] - x_range[0]) / (y_range[1] - y_range[0])
+    (width, height) = (max_side, max(1, int(max_side / ratio))) if ratio >= 1 else (max(1, int(max_side * ratio)), max_side)
+    xs, ys = np.meshgrid(np.linspace(x_range[0], x_range[1], width), np.linspace(y_range[1], y_range[0], height))
+    level = (_height(xs, ys, z_range) - z_range[0]) / max(z_range[1] - z_range[0], 1e-9)
+    rgba = np.stack([80 + 120 * level, 140 + 60 * level, 60 + 40 * (1 - level), np.full(level.shape, 255)], axis=2)
+    Image.fromarray(rgba.astype(np.uint8), 'RGBA').save('%s/odm_orthophoto.tif' % target_dir,
+                                                        compression='tiff_adobe_deflate')
+    with open('%s/odm_orthophoto_corners.txt' % target_dir, 'w') as fd:
+        fd.write('%f %f %f %f' % (x_range[0], y_range[0], x_range[1], y_range[1]))
+
+
+def write_synthetic_project(target_dir: str, nb_shots: int = 100, nb_vertices: int = 100000, altitude: float = 10,
+                            overlap: float = 0.7, image_width: int = 1000, orthophoto_side: int = 2000,
+                            with_images: bool = True, seed: int = 42):
+    """
+    Write a synthetic ODM project, its native coordinates being the ones of the 2.5d model
+    :param nb_shots: the number of shots, on a square grid
+    :param nb_vertices: the approximate number of vertices of the 2.5d model, spanning the survey plus a footprint margin
+    :param image_width: width of the written images (the camera being declared 4000 x 3000)
+    :param orthophoto_side: largest side of the orthophoto, in pixels
+    :param with_images: write the images (the report does not need them to compute the shot boundaries)
+    """
+    (positions, rotations, footprint) = survey_poses(nb_shots, altitude, overlap, seed)
+    x_range = (positions[:, 0].min() - footprint, positions[:, 0].max() + footprint)
+    y_range = (positions[:, 1].min() - footprint, positions[:, 1].max() + footprint)
+    z_range = (-1, 1)
+    image_names = ['SYNTH%05d.jpeg' % i for i in range(nb_shots)]
+
+    Path(target_dir).mkdir(parents=True, exist_ok=True)
+    with open('%s/cameras.json' % target_dir, 'w') as fd:
+        json.dump({CAMERA_NAME: CAMERA_JSON}, fd, indent=4)
+
+    Path('%s/odm_report' % target_dir).mkdir(exist_ok=True)
+    features = [{
+        'type': 'Feature',
+        'properties': {
+            'filename': image_name,
+            'focal': CAMERA_JSON['focal_x'],
+            'width': CAMERA_JSON['width'],
+            'height': CAMERA_JSON['height'],
+            'capture_time': 1600000000 + 2 * i,
+            'translation': position,
+            'rotation': rotation,
+        },
+        'geometry': {'type': 'Point', 'coordinates': position},
+    } for (i, (image_name, position, rotation)) in enumerate(zip(image_names, positions.tolist(), rotations.tolist()))]
+    with open('%s/odm_report/shots.geojson' % target_dir, 'w') as fd:
+        json.dump({'type': 'FeatureCollection', 'features': features}, fd)
+
+    logging.info('Writing a synthetic 2.5d model of about %d vertices' % nb_vertices)
+    (points, facets) = synthetic_height_field(x_range, y_range, z_range, nb_vertices, seed)
+    bbox = dict(zip(['minx', 'miny', 'minz'], points.min(axis=0).tolist()))
+    bbox.update(zip(['maxx', 'maxy', 'maxz'], points.max(axis=0).tolist()))
+    with open('%s/odm_report/stats.json' % target_dir, 'w') as fd:
+        json.dump({'point_cloud_statistics': {'stats': {'bbox': {'native': {'bbox': bbox}}}}}, fd)
+    Path('%s/odm_texturing_25d' % target_dir).mkdir(exist_ok=True)
+    write_obj(points, facets, '%s/odm_texturing_25d/odm_textured_model_geo.obj' % target_dir)
+    del points, facets
+
+    _write_orthophoto('%s/odm_orthophoto' % target_dir, x_range, y_range, z_range, orthophoto_side)
+    if with_images:
+        _write_images('%s/images' % target_dir, image_names, image_width, seed)
+    else:
+        Path('%s/images' % target_dir).mkdir(exist_ok=True)
+
+
+def main(argv: 'list[str]' = None):
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='Write a synthetic OpenDroneMap project')
+    parser.add_argument("target", help="the project directory to write", type=str)
+    parser.add_argument("--shots", help="number of shots", type=int, default=100)
+    parser.add_argument("--vertices", help="approximate number of vertices of the 2.5d model", type=int, default=100000)
+    parser.add_argument("--altitude", help="flight height above the ground", type=float, default=10)
+    parser.add_argument("--overlap", help="overlap ratio of consecutive shots", type=float, default=0.7)
+    parser.add_argument("--image-width", help="width of the written images, in pixels", type=int, default=1000)
+    parser.add_argument("--orthophoto-side", help="largest side of the orthophoto, in pixels", type=int, default=2000)
+    parser.add_argument("--no-images", help="do not write the images", action='store_true')
+    parser.add_argument("--seed", help="random seed", type=int, default=42)
+    args = parser.parse_args(argv)
+    if os.path.exists(args.target) and len(os.listdir(args.target)) > 0:
+        parser.error('%s is not empty' % args.target)
+    write_synthetic_project(args.target, args.shots, args.vertices, args.altitude, args.overlap, args.image_width,
+                            args.orthophoto_side, not args.no_images, args.seed)
+    print('Synthetic project written in %s' % args.target)
+
+
+if __name__ == '__main__':
+    main()
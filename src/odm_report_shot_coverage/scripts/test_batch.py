@@ -0,0 +1,51 @@
+import argparse
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from odm_report_shot_coverage.scripts.batch import run_batch, write_batch_index, projects_per_hour
+from odm_report_shot_coverage.scripts.options import add_report_arguments
+
+
+def _args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    add_report_arguments(parser)
+    return parser.parse_args([])
+
+
+class TestBatch(TestCase):
+    def test_failing_project_does_not_stop_the_batch(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            missing = [os.path.join(tmp_dir, 'missing-%d' % i) for i in range(2)]
+
+            with self.assertLogs(level='ERROR'):
+                got = run_batch(missing, _args())
+
+            self.assertEqual(missing, [r['project'] for r in got])
+            self.assertEqual(['failed', 'failed'], [r['status'] for r in got])
+            self.assertFalse(os.path.exists(missing[0]))
+
+    def test_write_batch_index(self):
+        results = [
+            {'project': '/data/flight-1', 'status': 'ok', 'elapsed': 10.0, 'shots': 60,
+             'coverage': {'coveredRatio': 0.75, 'meanCount': 4.5}},
+            {'project': '/data/<flight-2>', 'status': 'failed', 'elapsed': 1.0, 'error': 'no cameras.json'},
+        ]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            write_batch_index(results, 36.0, tmp_dir + '/summary')
+
+            with open(tmp_dir + '/summary/index.html') as fd:
+                page = fd.read()
+            with open(tmp_dir + '/summary/batch_summary.json') as fd:
+                summary = json.load(fd)
+
+        self.assertIn('href="%s"' % os.path.relpath('/data/flight-1/odm_report/shot_coverage/index.html',
+                                                    tmp_dir + '/summary'), page)
+        self.assertIn('75.0%', page)
+        self.assertIn('&lt;flight-2&gt;', page)
+        self.assertEqual(100.0, summary['projectsPerHour'])
+        self.assertEqual(results, summary['projects'])
+
+    def test_projects_per_hour(self):
+        self.assertEqual(2.0, projects_per_hour([{'status': 'ok'}, {'status': 'failed'}], 1800))
@@ -0,0 +1,76 @@
+import contextlib
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from unittest import TestCase
+
+from odm_report_shot_coverage.models.shot import Boundaries, ShotBoundaries
+from odm_report_shot_coverage.models.shot_lookup import shot_lookup_from_shots
+from odm_report_shot_coverage.scripts.cli import main, subcommand
+from odm_report_shot_coverage.scripts.options import report_dir
+
+SRC_DIR = os.path.join(os.path.dirname(__file__), '..', '..')
+# what only building a report needs
+HEAVY_MODULES = {'scipy', 'PIL', 'tqdm', 'geojson', 'odm_report_shot_coverage.scripts.report'}
+
+
+def _imported_modules(argv: 'list[str]') -> 'set[str]':
+    """the modules loaded once the command ran, in a fresh interpreter"""
+    command = '''import json, sys
+from odm_report_shot_coverage.scripts.cli import main
+try:
+    main(%r)
+except SystemExit:
+    pass
+print(json.dumps(sorted(sys.modules)), file=sys.stderr)''' % argv
+    result = subprocess.run([sys.executable, '-c', command], capture_output=True, text=True,
+                            env=dict(os.environ, PYTHONPATH=os.path.abspath(SRC_DIR)), check=True)
+    return set(json.loads(result.stderr.strip().splitlines()[-1]))
+
+
+class TestCli(TestCase):
+    def test_usage(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            main(['--help'])
+
+        self.assertEqual(['report', 'batch', 'serve', 'query'],
+                         re.findall(r'^  (\w+) ', out.getvalue(), flags=re.MULTILINE))
+        with self.assertRaises(SystemExit):
+            main([])
+
+    def test_help_imports(self):
+        for argv in [['--help'], ['report', '--help'], ['serve', '--help'], ['batch', '--help'], ['query', '--help']]:
+            with self.subTest(argv=argv):
+                modules = _imported_modules(argv)
+
+                self.assertEqual(set(), (HEAVY_MODULES | {'numpy'}) & modules)
+
+    def test_query_imports(self):
+        lookup = shot_lookup_from_shots([ShotBoundaries([(0, 0), (6, 0), (6, 5), (0, 5)])], ['a.jpeg'],
+                                        Boundaries(x_min=0, x_max=10, y_min=0, y_max=5))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.makedirs(report_dir(tmp_dir) + '/data')
+            lookup.save(report_dir(tmp_dir) + '/data')
+
+            modules = _imported_modules(['query', tmp_dir, '5', '2.5'])
+
+        self.assertIn('odm_report_shot_coverage.scripts.query', modules)
+        self.assertEqual(set(), HEAVY_MODULES & modules)
+
+    def test_project_named_like_a_subcommand(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.makedirs(tmp_dir + '/query/odm_report')
+            os.makedirs(tmp_dir + '/serve')
+            cwd = os.getcwd()
+            os.chdir(tmp_dir)
+            try:
+                self.assertEqual(('report', ['query', '--workers', '2']), subcommand(['query', '--workers', '2']))
+                self.assertEqual(('serve', ['project']), subcommand(['serve', 'project']))
+                self.assertEqual(('report', ['serve']), subcommand(['report', 'serve']))
+            finally:
+                os.chdir(cwd)
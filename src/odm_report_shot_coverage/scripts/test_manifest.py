@@ -0,0 +1,51 @@
+import tempfile
+from unittest import TestCase
+
+from odm_report_shot_coverage.models.shot import ShotBoundaries
+from odm_report_shot_coverage.models.test_fixtures import TestFixtures as Fixtures
+from odm_report_shot_coverage.scripts.manifest import ReportManifest, load_report_manifest, shot_fingerprint
+
+_mesh_key = {'size': 10, 'mtime_ns': 20, 'sha1': 'abc'}
+
+
+class TestManifest(TestCase):
+    def test_shot_fingerprint_is_stable(self):
+        self.assertEqual(shot_fingerprint(Fixtures.a_shot(), _mesh_key), shot_fingerprint(Fixtures.a_shot(), _mesh_key))
+
+    def test_shot_fingerprint_changes(self):
+        shot = Fixtures.a_shot()
+        reference = shot_fingerprint(shot, _mesh_key)
+
+        moved = Fixtures.a_shot()
+        moved.translation = (0, 0, 0)
+        other_camera = Fixtures.a_shot()
+        other_camera.camera.k2 = 0.1
+
+        self.assertNotEqual(reference, shot_fingerprint(moved, _mesh_key))
+        self.assertNotEqual(reference, shot_fingerprint(other_camera, _mesh_key))
+        self.assertNotEqual(reference, shot_fingerprint(shot, dict(_mesh_key, sha1='def')))
+        self.assertNotEqual(reference, shot_fingerprint(shot, _mesh_key, {'occlusionResolution': 1024}))
+
+    def test_save_load(self):
+        manifest = ReportManifest()
+        manifest.set_image('a.jpeg', {'size': 1, 'mtime_ns': 2})
+        manifest.orthophoto = {'size': 3, 'mtime_ns': 4}
+        manifest.set_shot_boundaries('a.jpeg', 'abcd', ShotBoundaries([(1.5, 2), (3, 4)]))
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            manifest.save(tmp_dir)
+            got = load_report_manifest(tmp_dir)
+
+        self.assertTrue(got.is_image_up_to_date('a.jpeg', {'size': 1, 'mtime_ns': 2}))
+        self.assertFalse(got.is_image_up_to_date('a.jpeg', {'size': 1, 'mtime_ns': 5}))
+        self.assertTrue(got.is_orthophoto_up_to_date({'size': 3, 'mtime_ns': 4}))
+        self.assertEqual([(1.5, 2), (3, 4)], got.shot_boundaries('a.jpeg', 'abcd').path)
+        self.assertIsNone(got.shot_boundaries('a.jpeg', 'efgh'))
+        self.assertIsNone(got.shot_boundaries('b.jpeg', 'abcd'))
+
+    def test_load_missing(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            got = load_report_manifest(tmp_dir)
+
+        self.assertEqual({}, got.shots)
+        self.assertIsNone(got.orthophoto)
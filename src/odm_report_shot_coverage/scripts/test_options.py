@@ -0,0 +1,35 @@
+import contextlib
+import io
+import os
+from unittest import TestCase
+
+from odm_report_shot_coverage.models.shot import BOUNDARY_BUILDERS
+from odm_report_shot_coverage.models.shot_lookup import DEFAULT_LOOKUP_RESOLUTION
+from odm_report_shot_coverage.scripts import options
+from odm_report_shot_coverage.scripts.viewer_data import DEFAULT_PRECISION
+
+
+class TestOptions(TestCase):
+    def test_defaults_match_the_models(self):
+        self.assertEqual(sorted(BOUNDARY_BUILDERS.keys()), options.BOUNDARY_MODES)
+        self.assertEqual(DEFAULT_LOOKUP_RESOLUTION, options.DEFAULT_LOOKUP_RESOLUTION)
+        self.assertEqual(DEFAULT_PRECISION, options.DEFAULT_PRECISION)
+
+    def test_parse_report_args(self):
+        args = options.parse_report_args(['project', '--memory-budget', '500'])
+
+        self.assertEqual(('project', 500, 'star'), (args.project, args.memory_budget, args.boundary_mode))
+        with self.assertRaises(SystemExit):
+            options.parse_report_args(['project', '--memory-budget', '500', '--occlusion'])
+
+    def test_frustum_footprint_options(self):
+        args = options.parse_report_args(['project', '--footprint', 'frustum', '--sample-spacing', '0.5'])
+
+        self.assertEqual('frustum', args.footprint)
+        for option in [['--occlusion'], ['--boundary-mode', 'hull'], ['--workers', '4'], ['--memory-budget', '500']]:
+            with self.subTest(option=option), self.assertRaises(SystemExit), contextlib.redirect_stderr(io.StringIO()):
+                options.parse_report_args(['project', '--footprint', 'frustum'] + option)
+
+    def test_thread_count(self):
+        self.assertEqual(os.cpu_count(), options.thread_count(options.parse_report_args(['project'])))
+        self.assertEqual(3, options.thread_count(options.parse_report_args(['project', '--threads', '3'])))
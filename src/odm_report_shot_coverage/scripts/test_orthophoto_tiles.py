@@ -0,0 +1,76 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+from PIL import Image
+
+from odm_report_shot_coverage.scripts.orthophoto_tiles import TiffWindowReader, build_orthophoto_tiles, \
+    orthophoto_max_zoom, TILE_SIZE
+
+
+def _an_orthophoto(width: int, height: int) -> Image.Image:
+    rng = np.random.default_rng(3)
+    pixels = rng.integers(0, 256, (height, width, 4), dtype=np.uint8)
+    pixels[:, :width // 4, 3] = 0
+    return Image.fromarray(pixels, 'RGBA')
+
+
+class TestOrthophotoTiles(TestCase):
+    def test_orthophoto_max_zoom(self):
+        self.assertEqual(0, orthophoto_max_zoom(200, 100))
+        self.assertEqual(1, orthophoto_max_zoom(300, 100))
+        self.assertEqual(3, orthophoto_max_zoom(1080, 712))
+
+    def test_read_rows_matches_pillow(self):
+        given = _an_orthophoto(300, 170)
+        expected = np.asarray(given)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for compression in ('raw', 'tiff_adobe_deflate'):
+                filename = '%s/%s.tif' % (tmp_dir, compression)
+                given.save(filename, compression=compression)
+                reader = TiffWindowReader(filename)
+
+                got = reader.read_rows(37, 121)
+
+                np.testing.assert_array_equal(expected[37:121], got, err_msg=compression)
+
+    def test_build_orthophoto_tiles_from_other_modes(self):
+        for mode in ('LA', 'P'):
+            given = _an_orthophoto(300, 170).convert(mode)
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                given.save(tmp_dir + '/odm_orthophoto.tif', compression='tiff_adobe_deflate')
+
+                with Image.open(tmp_dir + '/odm_orthophoto.tif') as im:
+                    expected = np.asarray(im.convert('RGBA'))
+
+                build_orthophoto_tiles(tmp_dir + '/odm_orthophoto.tif', tmp_dir, workers=2)
+
+                full_res = np.asarray(Image.open(tmp_dir + '/orthophoto_tiles/1/0/0.png'))
+            np.testing.assert_array_equal(expected[:, :TILE_SIZE], full_res[:170], err_msg=mode)
+
+    def test_build_orthophoto_tiles(self):
+        given = _an_orthophoto(600, 300)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            given.save(tmp_dir + '/odm_orthophoto.tif', compression='tiff_adobe_deflate')
+
+            got = build_orthophoto_tiles(tmp_dir + '/odm_orthophoto.tif', tmp_dir, workers=2)
+
+            with open(tmp_dir + '/orthophoto_tiles.json') as fd:
+                self.assertEqual(got, json.load(fd))
+            levels = {int(z): sorted('%s/%s' % (x, y) for x in os.listdir('%s/orthophoto_tiles/%s' % (tmp_dir, z))
+                                     for y in os.listdir('%s/orthophoto_tiles/%s/%s' % (tmp_dir, z, x)))
+                      for z in os.listdir(tmp_dir + '/orthophoto_tiles')}
+            full_res = np.asarray(Image.open(tmp_dir + '/orthophoto_tiles/2/1/0.png'))
+            overview = Image.open(tmp_dir + '/orthophoto_tiles/0/0/0.png')
+            overview_size = overview.size
+
+        self.assertEqual({'width': 600, 'height': 300, 'tileSize': TILE_SIZE, 'maxZoom': 2}, got)
+        self.assertEqual({
+            0: ['0/0.png'],
+            1: ['0/0.png', '1/0.png'],
+            2: ['0/0.png', '0/1.png', '1/0.png', '1/1.png', '2/0.png', '2/1.png'],
+        }, levels)
+        np.testing.assert_array_equal(np.asarray(given)[:TILE_SIZE, TILE_SIZE:2 * TILE_SIZE], full_res)
+        self.assertEqual((TILE_SIZE, TILE_SIZE), overview_size)
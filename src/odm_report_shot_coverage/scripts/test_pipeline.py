@@ -0,0 +1,79 @@
+import threading
+import time
+from unittest import TestCase
+
+from odm_report_shot_coverage.scripts.pipeline import Pipeline
+
+
+class TestPipeline(TestCase):
+    def test_dependencies(self):
+        events = []
+        pipeline = Pipeline(4)
+        pipeline.add('a', lambda: events.append('a') or 1)
+        pipeline.add('b', lambda: events.append('b') or 2)
+        pipeline.add('sum', lambda a, b: events.append('sum') or a + b, after=['a', 'b'])
+        pipeline.add('double', lambda s: s * 2, after=['sum'])
+
+        got = pipeline.run()
+
+        self.assertEqual({'a': 1, 'b': 2, 'sum': 3, 'double': 6}, got)
+        self.assertEqual('sum', events[-1])
+
+    def test_concurrency_is_bounded(self):
+        lock = threading.Lock()
+        running = [0, 0]
+
+        def stage():
+            with lock:
+                running[0] += 1
+                running[1] = max(running[1], running[0])
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+
+        pipeline = Pipeline(2)
+        for i in range(6):
+            pipeline.add(str(i), stage)
+
+        pipeline.run()
+
+        self.assertEqual(2, running[1])
+
+    def test_stages_overlap(self):
+        # each stage only finishes once all of them started, which never happens if they run one after the other
+        started = threading.Barrier(3, timeout=10)
+        pipeline = Pipeline(3)
+        for i in range(3):
+            pipeline.add(str(i), started.wait)
+
+        got = pipeline.run()
+
+        self.assertEqual({0, 1, 2}, set(got.values()))
+
+    def test_single_stage_at_a_time_runs_in_the_calling_thread(self):
+        pipeline = Pipeline(1)
+        pipeline.add('a', threading.get_ident)
+        pipeline.add('b', lambda a: (a, threading.get_ident()), after=['a'])
+
+        got = pipeline.run()
+
+        self.assertEqual((threading.get_ident(), threading.get_ident()), got['b'])
+
+    def test_error_cancels_the_next_stages(self):
+        done = []
+
+        def fail():
+            raise IOError('no orthophoto')
+
+        pipeline = Pipeline(1)
+        pipeline.add('fail', fail)
+        pipeline.add('other', lambda: done.append('other'))
+        pipeline.add('after', lambda _: done.append('after'), after=['fail'])
+
+        with self.assertRaises(IOError):
+            pipeline.run()
+        self.assertEqual([], done)
+
+    def test_unknown_dependency(self):
+        with self.assertRaises(ValueError):
+            Pipeline().add('b', lambda a: a, after=['a'])
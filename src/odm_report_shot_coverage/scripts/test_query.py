@@ -0,0 +1,35 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from odm_report_shot_coverage.models.shot import Boundaries, ShotBoundaries
+from odm_report_shot_coverage.models.shot_lookup import shot_lookup_from_shots
+from odm_report_shot_coverage.scripts.options import report_dir
+from odm_report_shot_coverage.scripts.query import main
+
+
+class TestQuery(TestCase):
+    def test_main(self):
+        lookup = shot_lookup_from_shots([ShotBoundaries([(0, 0), (6, 0), (6, 5), (0, 5)]),
+                                         ShotBoundaries([(4, 0), (10, 0), (10, 5), (4, 5)])],
+                                        ['a.jpeg', 'b.jpeg'], Boundaries(x_min=0, x_max=10, y_min=0, y_max=5))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.makedirs(report_dir(tmp_dir) + '/data')
+            lookup.save(report_dir(tmp_dir) + '/data')
+
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                main([tmp_dir, '5', '2.5'])
+                main([tmp_dir, '8', '1', '--json'])
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(['a.jpeg', 'b.jpeg'], lines[:2])
+        self.assertEqual(['b.jpeg'], json.loads(lines[2])['imageNames'])
+
+    def test_main_without_report(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with self.assertRaises(SystemExit):
+                main([tmp_dir, '0', '0'])
@@ -0,0 +1,94 @@
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from odm_report_shot_coverage.scripts.manifest import load_report_manifest, MANIFEST_FILE_NAME
+from odm_report_shot_coverage.scripts.options import add_report_arguments, report_dir
+from odm_report_shot_coverage.scripts.serve import ReportServer, LruCache
+from odm_report_shot_coverage.scripts.synthetic_project import write_synthetic_project
+
+
+async def _get(port: int, path: str, headers: dict = None) -> (int, dict, bytes):
+    """the status, headers and body of a GET on a new connection"""
+    (reader, writer) = await asyncio.open_connection('127.0.0.1', port)
+    lines = ['GET %s HTTP/1.1' % path, 'Host: localhost', 'Connection: close'] + \
+            ['%s: %s' % h for h in (headers or {}).items()]
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+    response = await reader.read()
+    writer.close()
+    (head, _, body) = response.partition(b'\r\n\r\n')
+    head_lines = head.decode('latin-1').split('\r\n')
+    response_headers = {k.lower(): v.strip() for (k, _, v) in (h.partition(':') for h in head_lines[1:])}
+    return int(head_lines[0].split()[1]), response_headers, body
+
+
+class TestServe(TestCase):
+    def test_lru_cache(self):
+        cache = LruCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+
+        self.assertEqual([1, None, 3], [cache.get(k) for k in 'abc'])
+        self.assertEqual(2, len(cache))
+
+    def test_serve(self):
+        parser = argparse.ArgumentParser()
+        add_report_arguments(parser)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            write_synthetic_project(tmp_dir, nb_shots=9, nb_vertices=5000, image_width=200, orthophoto_side=300)
+            server = ReportServer(tmp_dir, parser.parse_args([]))
+            server.load()
+            with open('%s/%s' % (report_dir(tmp_dir), MANIFEST_FILE_NAME), 'w') as fd:
+                fd.write('{}')
+
+            async def requests():
+                started = asyncio.get_running_loop().create_future()
+                serving = asyncio.ensure_future(server.serve('127.0.0.1', 0, started))
+                (_, port) = await started
+                try:
+                    return [
+                        await _get(port, '/'),
+                        await _get(port, '/data/shots_index.json'),
+                        await _get(port, '/data/shot_boundaries/0.json'),
+                        await _get(port, '/images/SYNTH00003.jpeg'),
+                        await _get(port, '/data/shot_boundaries/1.json'),
+                        await _get(port, '/../../setup.cfg'),
+                        await _get(port, '/data/../' + MANIFEST_FILE_NAME),
+                    ]
+                finally:
+                    serving.cancel()
+
+            results = asyncio.run(requests())
+            chunk_etag = results[2][1]['etag']
+
+            async def revalidate():
+                started = asyncio.get_running_loop().create_future()
+                serving = asyncio.ensure_future(server.serve('127.0.0.1', 0, started))
+                (_, port) = await started
+                try:
+                    return await _get(port, '/data/shot_boundaries/0.json', {'If-None-Match': chunk_etag})
+                finally:
+                    serving.cancel()
+
+            not_modified = asyncio.run(revalidate())
+            server.close()
+            manifest = load_report_manifest(report_dir(tmp_dir))
+            thumbnails = os.listdir(report_dir(tmp_dir) + '/images')
+
+        self.assertEqual(200, results[0][0])
+        self.assertIn(b'<html', results[0][2].lower())
+        self.assertEqual(9, len(json.loads(results[1][2])['shots']['imageName']))
+        self.assertEqual((200, 'application/json'), (results[2][0], results[2][1]['content-type']))
+        self.assertEqual(9, len(json.loads(results[2][2])))
+        self.assertEqual((200, 'image/jpeg'), (results[3][0], results[3][1]['content-type']))
+        self.assertEqual(404, results[4][0])
+        self.assertEqual(404, results[5][0])
+        self.assertEqual(404, results[6][0])
+        self.assertEqual((304, b''), (not_modified[0], not_modified[2]))
+        self.assertEqual(9, len(manifest.shots))
+        self.assertEqual(['SYNTH00003.jpeg'], thumbnails)
@@ -0,0 +1,48 @@
+import argparse
+import json
+import os
+import pstats
+import tempfile
+from unittest import TestCase
+
+from odm_report_shot_coverage.models.reconstruction import parse_reconstruction
+from odm_report_shot_coverage.scripts.options import add_report_arguments, report_dir, cache_dir
+from odm_report_shot_coverage.scripts.report import build_report
+from odm_report_shot_coverage.scripts.synthetic_project import write_synthetic_project
+
+
+class TestSyntheticProject(TestCase):
+    def test_parse_reconstruction(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            write_synthetic_project(tmp_dir, nb_shots=12, nb_vertices=5000, with_images=False)
+
+            got = parse_reconstruction(tmp_dir)
+
+        self.assertEqual(12, len(got.shots))
+        self.assertAlmostEqual(5000, len(got.mesh.points), delta=100)
+        self.assertEqual(['SYNTH00000.jpeg', 'SYNTH00001.jpeg'], [s.image_name for s in got.shots[:2]])
+        # the native coordinates are the 2.5d model ones: shots stay above the mesh
+        self.assertTrue(all(got.mesh.boundaries.x_min < s.translation[0] < got.mesh.boundaries.x_max for s in got.shots))
+        self.assertTrue(all(s.translation[2] > got.mesh.boundaries.z_max for s in got.shots))
+
+    def test_build_report(self):
+        parser = argparse.ArgumentParser()
+        add_report_arguments(parser)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            write_synthetic_project(tmp_dir, nb_shots=9, nb_vertices=5000, image_width=200, orthophoto_side=300)
+
+            got = build_report(tmp_dir, parser.parse_args(['--profile']))
+
+            self.assertEqual(9, got['shots'])
+            self.assertGreater(got['coverage']['coveredRatio'], 0.3)
+            self.assertEqual(9, len(os.listdir(report_dir(tmp_dir) + '/images')))
+            # the mesh cache is not published with the web app
+            self.assertTrue(os.path.isdir(cache_dir(tmp_dir) + '/mesh'))
+            self.assertNotIn('cache', os.listdir(report_dir(tmp_dir)))
+            with open(report_dir(tmp_dir) + '/timings.json') as fd:
+                timings = json.load(fd)
+            profiled = {name for (_, _, name) in pstats.Stats(report_dir(tmp_dir) + '/profile.pstats').stats}
+        # the stages themselves, not only the main thread waiting for them
+        self.assertTrue({'parse_reconstruction', 'compute_shot_boundaries', 'make_thumbnails'} <= profiled)
+        boundaries_stage = [s for s in timings['stages'] if s['stage'] == 'shot boundaries'][0]
+        self.assertEqual(9, boundaries_stage['counters']['shots'])
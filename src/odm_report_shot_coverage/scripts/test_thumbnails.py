@@ -0,0 +1,40 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from PIL import Image
+
+from odm_report_shot_coverage.scripts.manifest import ReportManifest
+from odm_report_shot_coverage.scripts.thumbnails import make_thumbnails, is_image_file
+
+
+class TestThumbnails(TestCase):
+    def test_is_image_file(self):
+        self.assertTrue(is_image_file('GOPR3082.jpeg'))
+        self.assertTrue(is_image_file('DJI_0001.JPG'))
+        self.assertFalse(is_image_file('.DS_Store'))
+        self.assertFalse(is_image_file('notes.txt'))
+
+    def test_make_thumbnails(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            src_dir = tmp_dir + '/images'
+            target_dir = tmp_dir + '/thumbnails'
+            os.makedirs(src_dir)
+            Image.new('RGB', (1600, 1200), (10, 20, 30)).save(src_dir + '/a.jpeg')
+            Image.new('RGB', (600, 800), (10, 20, 30)).save(src_dir + '/b.jpeg')
+            with open(src_dir + '/notes.txt', 'w') as fd:
+                fd.write('not an image')
+            manifest = ReportManifest()
+
+            make_thumbnails(src_dir, target_dir, manifest, size=200, workers=2)
+            sizes = {f: Image.open('%s/%s' % (target_dir, f)).size for f in os.listdir(target_dir)}
+            mtime = os.stat(target_dir + '/a.jpeg').st_mtime_ns
+            make_thumbnails(src_dir, target_dir, manifest, size=200, workers=2)
+            kept_mtime = os.stat(target_dir + '/a.jpeg').st_mtime_ns
+            make_thumbnails(src_dir, target_dir, manifest, size=100, workers=2)
+            resized = Image.open(target_dir + '/a.jpeg').size
+
+        self.assertEqual({'a.jpeg': (200, 150), 'b.jpeg': (150, 200)}, sizes)
+        self.assertEqual(mtime, kept_mtime)
+        self.assertEqual((100, 75), resized)
+        self.assertEqual({'a.jpeg', 'b.jpeg'}, set(manifest.images.keys()))
@@ -0,0 +1,75 @@
+import multiprocessing
+import os
+import time
+from unittest import TestCase, skipUnless
+
+from odm_report_shot_coverage.models.shot import ShotBoundaries
+from odm_report_shot_coverage.models.test_fixtures import TestFixtures as Fixtures
+from odm_report_shot_coverage.scripts.timings import StageTimings, projection_counters, _live_children_peak_rss_mb
+
+
+def _shot(image_name: str, boundaries: ShotBoundaries):
+    shot = Fixtures.a_shot()
+    shot.image_name = image_name
+    shot.boundaries = boundaries
+    return shot
+
+
+class TestStageTimings(TestCase):
+    def test_stage(self):
+        timings = StageTimings()
+
+        with self.assertLogs(level='INFO'):
+            with timings.stage('first') as counters:
+                time.sleep(0.01)
+                counters['items'] = 3
+            with timings.stage('second'):
+                pass
+
+        self.assertEqual(['first', 'second'], [s['stage'] for s in timings.stages])
+        self.assertEqual({'items': 3}, timings.stages[0]['counters'])
+        self.assertGreaterEqual(timings.stages[0]['elapsed'], 0.01)
+        self.assertGreater(timings.stages[0]['peakRssMB'], 0)
+        self.assertEqual(timings.total_elapsed(), timings.to_json()['stagesElapsed'])
+
+    @skipUnless(os.path.exists('/proc/self/status'), 'needs /proc')
+    def test_live_children_peak_rss(self):
+        with multiprocessing.Pool(1) as pool:
+            pool.apply(time.sleep, (0,))
+
+            self.assertGreater(_live_children_peak_rss_mb(), 0)
+
+    def test_gantt(self):
+        timings = StageTimings()
+        timings.stages = [
+            {'stage': 'parse', 'start': 1.0, 'elapsed': 2.0},
+            {'stage': 'thumbnails', 'start': 1.0, 'elapsed': 4.0},
+            {'stage': 'boundaries', 'start': 3.0, 'elapsed': 1.0},
+        ]
+
+        got = timings.gantt(width=8).split('\n')
+
+        self.assertEqual([
+            'parse      |####    |    0.00 s +   2.00 s',
+            'thumbnails |########|    0.00 s +   4.00 s',
+            'boundaries |    ##  |    2.00 s +   1.00 s',
+            '            wall 4.00 s, stages sum 7.00 s',
+        ], got)
+
+    def test_projection_counters(self):
+        counted = ShotBoundaries([(0, 0)])
+        counted.nb_projected = 200
+        counted.nb_in_frame = 50
+        other = ShotBoundaries([(0, 0)])
+        other.nb_projected = 100
+        other.nb_in_frame = 75
+        shots = [_shot('a.jpeg', counted), _shot('b.jpeg', other), _shot('c.jpeg', ShotBoundaries([]))]
+
+        got = projection_counters(shots, 2.0)
+
+        self.assertEqual(2, got['shots'])
+        self.assertEqual(300, got['pointsProjected'])
+        self.assertEqual(150, got['pointsPerSecond'])
+        self.assertEqual({'a.jpeg': 0.25, 'b.jpeg': 0.75}, got['inFrameRatio'])
+        self.assertEqual(0.5, got['inFrameRatioMean'])
+        self.assertEqual(0.25, got['inFrameRatioMin'])
@@ -0,0 +1,61 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from odm_report_shot_coverage.models.reconstruction import Reconstruction
+from odm_report_shot_coverage.models.shot import Boundaries, ShotBoundaries
+from odm_report_shot_coverage.models.test_fixtures import TestFixtures as Fixtures
+from odm_report_shot_coverage.models.wavefront_25d import Wavefront25D
+from odm_report_shot_coverage.scripts.viewer_data import shots_index, boundaries_chunks, write_viewer_data, \
+    BOUNDARIES_CHUNK_SIZE, BOUNDARIES_DIR_NAME, SHOTS_INDEX_FILE_NAME, LEGACY_FILE_NAME
+
+
+def _a_reconstruction(nb_shots: int) -> Reconstruction:
+    reconstruction = Reconstruction()
+    camera = Fixtures.a_camera_gopro8_linear()
+    camera.name = 'gopro8'
+    reconstruction.add_camera(camera.name, camera)
+    for i in range(nb_shots):
+        shot = Fixtures.a_shot()
+        shot.camera = camera
+        shot.image_name = '%03d.jpeg' % (nb_shots - 1 - i)
+        shot.translation = (i + 0.123456, 2.0, 3.987654)
+        shot.boundaries = ShotBoundaries([(i + 0.001, 1.23456), (i + 1.5, 2.0)])
+        reconstruction.add_shot(shot)
+    reconstruction.mesh = Wavefront25D()
+    reconstruction.mesh.boundaries = Boundaries(x_min=0, x_max=10, y_min=0, y_max=5, z_min=-1, z_max=1)
+    reconstruction.orthophoto_boundaries = reconstruction.mesh.boundaries
+    return reconstruction
+
+
+class TestViewerData(TestCase):
+    def test_shots_index(self):
+        got = shots_index(_a_reconstruction(3), precision=1)
+
+        self.assertEqual(['000.jpeg', '001.jpeg', '002.jpeg'], got['shots']['imageName'])
+        self.assertEqual(['gopro8'] * 3, got['shots']['camera'])
+        self.assertEqual([2.1, 2.0, 4.0], got['shots']['translation'][0])
+        self.assertEqual(3000, got['cameras']['gopro8']['width'])
+        self.assertEqual(1, got['precision'])
+
+    def test_boundaries_chunks(self):
+        got = boundaries_chunks(_a_reconstruction(BOUNDARIES_CHUNK_SIZE + 2), precision=2)
+
+        self.assertEqual([BOUNDARIES_CHUNK_SIZE, 2], [len(c) for c in got])
+        # in image name order, as the index
+        self.assertEqual([[BOUNDARIES_CHUNK_SIZE + 1, 1.23], [BOUNDARIES_CHUNK_SIZE + 2.5, 2.0]], got[0][0])
+
+    def test_write_viewer_data_replaces_previous_files(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.makedirs(os.path.join(tmp_dir, BOUNDARIES_DIR_NAME))
+            for file_name in [LEGACY_FILE_NAME, os.path.join(BOUNDARIES_DIR_NAME, '7.json')]:
+                with open(os.path.join(tmp_dir, file_name), 'w') as fd:
+                    fd.write('{}')
+
+            write_viewer_data(_a_reconstruction(3), tmp_dir)
+
+            self.assertEqual(['0.json'], os.listdir(os.path.join(tmp_dir, BOUNDARIES_DIR_NAME)))
+            self.assertFalse(os.path.exists(os.path.join(tmp_dir, LEGACY_FILE_NAME)))
+            with open(os.path.join(tmp_dir, SHOTS_INDEX_FILE_NAME)) as fd:
+                self.assertEqual(3, len(json.load(fd)['shots']['imageName']))
@@ -0,0 +1,64 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from PIL import Image
+from tqdm import tqdm
+
+from odm_report_shot_coverage.scripts.manifest import ReportManifest, file_fingerprint
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.tif', '.tiff'}
+
+
+def is_image_file(file_name: str) -> bool:
+    return os.path.splitext(file_name)[1].lower() in IMAGE_EXTENSIONS
+
+
+def make_thumbnail(src_file: str, target_file: str, size: int, quality: int):
+    """
+    Resize an image so its largest side is size pixels.
+    JPEG images are decoded in draft mode, letting the decoder downscale by 1/2, 1/4 or 1/8 in the DCT domain,
+    and never below the thumbnail size, before the final Lanczos resampling.
+    """
+    with Image.open(src_file) as im:
+        width, height = im.size
+        max_size = max(width, height)
+        new_size = (max(1, int(width * size / max_size)), max(1, int(height * size / max_size)))
+        if im.format == 'JPEG':
+            im.draft('RGB', new_size)
+        thumbnail = im.resize(new_size, Image.LANCZOS, reducing_gap=3.0)
+        thumbnail.save(target_file, quality=quality)
+
+
+def make_thumbnails(src_dir: str, target_dir: str, manifest: ReportManifest, size: int = 400, quality: int = 85,
+                    workers: int = 1) -> int:
+    """
+    Resize the images of src_dir into target_dir, in a thread pool (image decoding and resampling release the GIL).
+    Non image files are ignored, and thumbnails already built from the same source with the same size and quality
+    are kept.
+    :return: the number of images resized
+    """
+    Path(target_dir).mkdir(parents=True, exist_ok=True)
+    image_files = sorted([f for f in os.listdir(src_dir) if is_image_file(f)])
+    for file_name in set(manifest.images.keys()) - set(image_files):
+        Path('%s/%s' % (target_dir, file_name)).unlink(missing_ok=True)
+        del manifest.images[file_name]
+
+    todo = []
+    for file_name in image_files:
+        fingerprint = dict(file_fingerprint('%s/%s' % (src_dir, file_name)), thumbnail_size=size,
+                           thumbnail_quality=quality)
+        if not manifest.is_image_up_to_date(file_name, fingerprint) or \
+                not os.path.exists('%s/%s' % (target_dir, file_name)):
+            todo.append((file_name, fingerprint))
+
+    def resize(task: (str, dict)) -> (str, dict):
+        file_name, fingerprint = task
+        make_thumbnail('%s/%s' % (src_dir, file_name), '%s/%s' % (target_dir, file_name), size, quality)
+        return task
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for file_name, fingerprint in tqdm(executor.map(resize, todo), total=len(todo),
+                                           desc='Resizing images (%d up to date)' % (len(image_files) - len(todo))):
+            manifest.set_image(file_name, fingerprint)
+    return len(todo)
@@ -0,0 +1,145 @@
+"""
+Stage timers of a report run: start, elapsed and CPU time, peak resident memory and counters per stage, logged as each
+stage ends, saved as timings.json next to the report and summarized as a Gantt chart.
+"""
+import contextlib
+import logging
+import multiprocessing
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TIMINGS_FILE_NAME = 'timings.json'
+PROFILE_FILE_NAME = 'profile.pstats'
+
+
+def peak_rss_mb() -> (float, float):
+    """
+    The peak resident memory of the current process and of its largest child process (e.g. pool workers), in MB,
+    (None, None) if it cannot be measured on this platform.
+    The rusage of the children only counts the terminated ones: on Linux, the peak of the live ones (the workers of a
+    pool still open) is read from /proc, elsewhere they only count once the pool is closed.
+    """
+    if resource is None:
+        return None, None
+    # kB on Linux, bytes on macOS
+    unit = 1 / 2 ** 20 if sys.platform == 'darwin' else 1 / 2 ** 10
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit,
+            max(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit, _live_children_peak_rss_mb()))
+
+
+def _live_children_peak_rss_mb() -> float:
+    """the largest peak resident memory (VmHWM) of the live child processes, 0 without /proc"""
+    peak = 0
+    for child in multiprocessing.active_children():
+        try:
+            with open('/proc/%d/status' % child.pid) as fd:
+                peak = max([peak] + [int(line.split()[1]) / 2 ** 10 for line in fd if line.startswith('VmHWM:')])
+        except OSError:
+            pass
+    return peak
+
+
+class StageTimings:
+    """
+    The stages of a run, in their order of completion.
+    Each stage records its start (in seconds since the timings creation), its elapsed and CPU seconds (the CPU time is
+    process wide, so shared by the stages running concurrently), the peak RSS reached so far (which is when a stage
+    raises it that shows) and the counters set by the stage itself.
+    """
+    stages: 'list[dict]'
+
+    def __init__(self):
+        self.stages = []
+        self._origin = time.perf_counter()
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> dict:
+        """
+        Time the enclosed block
+        :return: the stage counters, to be filled by the block
+        """
+        counters = {}
+        start = time.perf_counter()
+        start_cpu = time.process_time()
+        yield counters
+        elapsed = time.perf_counter() - start
+        (peak_rss, peak_rss_children) = peak_rss_mb()
+        self.stages.append({
+            'stage': name,
+            'start': start - self._origin,
+            'elapsed': elapsed,
+            'cpu': time.process_time() - start_cpu,
+            'peakRssMB': peak_rss,
+            'peakRssChildrenMB': peak_rss_children,
+            'counters': counters,
+        })
+        logging.info('Stage %s: %.2f s%s' % (name, elapsed, '' if peak_rss is None else ', peak RSS %.0f MB' % peak_rss))
+
+    def total_elapsed(self) -> float:
+        """the sum of the stage elapsed times"""
+        return sum(s['elapsed'] for s in self.stages)
+
+    def wall_elapsed(self) -> float:
+        """from the first stage start to the last stage end"""
+        if len(self.stages) == 0:
+            return 0
+        return max(s['start'] + s['elapsed'] for s in self.stages) - min(s['start'] for s in self.stages)
+
+    def gantt(self, width: int = 50) -> str:
+        """The stages by start time, as bars over the run wall time, followed by the wall and summed times"""
+        if len(self.stages) == 0:
+            return ''
+        origin = min(s['start'] for s in self.stages)
+        scale = width / max(self.wall_elapsed(), 1e-9)
+        name_width = max(len(s['stage']) for s in self.stages)
+        lines = []
+        for stage in sorted(self.stages, key=lambda s: s['start']):
+            begin = min(width - 1, int(round((stage['start'] - origin) * scale)))
+            end = max(begin + 1, int(round((stage['start'] - origin + stage['elapsed']) * scale)))
+            bar = (' ' * begin + '#' * (end - begin)).ljust(width)
+            lines.append('%s |%s| %7.2f s +%7.2f s' % (stage['stage'].ljust(name_width), bar, stage['start'] - origin,
+                                                       stage['elapsed']))
+        lines.append('%s  wall %.2f s, stages sum %.2f s' % (' ' * name_width, self.wall_elapsed(), self.total_elapsed()))
+        return '\n'.join(lines)
+
+    def to_json(self) -> dict:
+        return {
+            'elapsed': self.wall_elapsed(),
+            'stagesElapsed': self.total_elapsed(),
+            'stages': self.stages,
+        }
+
+
+def json_parse_stage_timings(el: dict) -> StageTimings:
+    timings = StageTimings()
+    timings.stages = el['stages']
+    return timings
+
+
+def projection_counters(shots: list, elapsed: float) -> dict:
+    """
+    The vertex projection counters of the shots whose boundaries were computed from the mesh vertices
+    :param elapsed: the seconds spent computing them, for the throughput
+    :return: the number of shots, of projected vertices, the vertices projected per second and the in-frame ratio
+    per shot (by image name, with its mean and min)
+    """
+    ratios = {}
+    nb_projected = 0
+    for shot in shots:
+        if shot.boundaries is None or shot.boundaries.nb_projected is None:
+            continue
+        nb_projected += shot.boundaries.nb_projected
+        ratios[shot.image_name] = shot.boundaries.in_frame_ratio()
+    return {
+        'shots': len(ratios),
+        'pointsProjected': nb_projected,
+        'pointsPerSecond': nb_projected / elapsed if elapsed > 0 else None,
+        'inFrameRatioMean': sum(ratios.values()) / len(ratios) if len(ratios) > 0 else None,
+        'inFrameRatioMin': min(ratios.values()) if len(ratios) > 0 else None,
+        'inFrameRatio': ratios,
+    }
@@ -0,0 +1,74 @@
+"""
+The shots, as loaded by the web viewer: a compact index with what the map needs at first (image names, translations,
+rotations and cameras), and the shot boundaries in chunk files, only fetched when a shot is hovered or selected.
+"""
+import json
+import os
+import shutil
+
+import numpy as np
+
+from odm_report_shot_coverage.models.reconstruction import Reconstruction
+
+SHOTS_INDEX_FILE_NAME = 'shots_index.json'
+BOUNDARIES_DIR_NAME = 'shot_boundaries'
+# the former single file, with all the boundaries
+LEGACY_FILE_NAME = 'reconstruction_shots.json'
+# shots per boundaries file
+BOUNDARIES_CHUNK_SIZE = 64
+# decimals of the coordinates, in the 2.5d model units
+DEFAULT_PRECISION = 2
+
+
+def _rounded(values, decimals: int) -> list:
+    return np.round(np.asarray(values, dtype=float), decimals).tolist()
+
+
+def shots_index(reconstruction: Reconstruction, precision: int = DEFAULT_PRECISION) -> dict:
+    """
+    The shot attributes as columns, in image name order, coordinates being rounded to precision decimals and
+    rotations (in radians) to two more
+    """
+    shots = reconstruction.shots
+    return {
+        'precision': precision,
+        'chunkSize': BOUNDARIES_CHUNK_SIZE,
+        'cameras': {n: c.to_json() for n, c in reconstruction.cameras.items()},
+        'boundaries': reconstruction.mesh.boundaries.to_json(),
+        'orthophotoBoundaries': reconstruction.orthophoto_boundaries.to_json(),
+        'shots': {
+            'imageName': [s.image_name for s in shots],
+            'camera': [s.camera.name for s in shots],
+            'translation': _rounded([s.translation for s in shots], precision),
+            'rotationEulerXYZ': _rounded([s.rotation_euler_xyz for s in shots], precision + 2),
+        },
+    }
+
+
+def boundaries_chunk(reconstruction: Reconstruction, chunk: int, precision: int = DEFAULT_PRECISION) -> list:
+    """The boundary paths of the shots of one chunk, rounded to precision decimals"""
+    shots = reconstruction.shots[chunk * BOUNDARIES_CHUNK_SIZE:(chunk + 1) * BOUNDARIES_CHUNK_SIZE]
+    return [_rounded(s.boundaries.path, precision) for s in shots]
+
+
+def boundaries_chunks(reconstruction: Reconstruction, precision: int = DEFAULT_PRECISION) -> 'list[list]':
+    """The boundary paths, rounded to precision decimals, by chunks of BOUNDARIES_CHUNK_SIZE shots"""
+    nb_chunks = (len(reconstruction.shots) + BOUNDARIES_CHUNK_SIZE - 1) // BOUNDARIES_CHUNK_SIZE
+    return [boundaries_chunk(reconstruction, i, precision) for i in range(nb_chunks)]
+
+
+def write_viewer_data(reconstruction: Reconstruction, target_dir: str, precision: int = DEFAULT_PRECISION):
+    """
+    Write the shots index and the boundaries chunks ({BOUNDARIES_DIR_NAME}/{chunk}.json), replacing the ones of a
+    previous run as well as the former single file
+    """
+    chunks_dir = os.path.join(target_dir, BOUNDARIES_DIR_NAME)
+    shutil.rmtree(chunks_dir, ignore_errors=True)
+    os.makedirs(chunks_dir)
+    for (i, chunk) in enumerate(boundaries_chunks(reconstruction, precision)):
+        with open(os.path.join(chunks_dir, '%d.json' % i), 'w') as fd:
+            json.dump(chunk, fd, separators=(',', ':'))
+    with open(os.path.join(target_dir, SHOTS_INDEX_FILE_NAME), 'w') as fd:
+        json.dump(shots_index(reconstruction, precision), fd, separators=(',', ':'))
+    if os.path.exists(os.path.join(target_dir, LEGACY_FILE_NAME)):
+        os.remove(os.path.join(target_dir, LEGACY_FILE_NAME))
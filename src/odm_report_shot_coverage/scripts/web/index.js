@@ -19,17 +19,24 @@ function loadData() {
 
     const projectDir = './data'
 
-    d3.json(`${projectDir}/reconstruction_shots.json`)
-        .then(r => {
-            const rec = parseReconstruction(r);
+    const orthophoto = {};
+    let shotLookup = null;
+
+    Promise.all([
+        d3.json(`${projectDir}/shots_index.json`)
+            .then(parseShotsIndex)
+            // reports built before the split ship all the boundaries in one file
+            .catch(() => d3.json(`${projectDir}/reconstruction_shots.json`).then(parseReconstruction)),
+        d3.json(`${projectDir}/orthophoto_tiles.json`).catch(() => null)
+    ])
+        .then(([rec, tiles]) => {
             initScales(rec);
             //setupPoints(rec);
             refreshShots(rec);
-            const ob = rec.orthophotoBoundaries;
-            elOrthoImage
-                .attr('x', scales.x(ob.xMin))
-                .attr('y', scales.y(ob.yMax))
-                .attr('width', scales.x(ob.xMax) - scales.x(ob.xMin))
+            orthophoto.boundaries = rec.orthophotoBoundaries;
+            orthophoto.tiles = tiles;
+            refreshOrthophoto(d3.zoomIdentity);
+            elMapContainer.on('click', () => highlightCoveringShots(rec));
         })
 
 
@@ -52,6 +59,103 @@ function loadData() {
         return rec;
     }
 
+    function parseShotsIndex(json) {
+        const columns = json.shots;
+        const rec = {
+            shots: columns.imageName.map((imageName, i) => {
+                const camera = json.cameras[columns.camera[i]];
+                return {
+                    index: i,
+                    imageName: imageName,
+                    camera: camera,
+                    translation: columns.translation[i],
+                    rotationEulerXYZ: columns.rotationEulerXYZ[i],
+                    originalDimensions: {width: camera.width, height: camera.height},
+                    isSelected: false
+                };
+            }),
+            cameras: json.cameras,
+            boundaries: json.boundaries,
+            orthophotoBoundaries: json.orthophotoBoundaries,
+            chunkSize: json.chunkSize,
+            // boundaries chunk loading promises, by chunk index
+            chunks: {}
+        };
+        rec.coordsDomain = {
+            x: [rec.boundaries.xMin, rec.boundaries.xMax],
+            y: [rec.boundaries.yMin, rec.boundaries.yMax],
+        }
+        return rec;
+    }
+
+    // resolves once the shot boundaries are there, fetching the chunk of shots they are stored with on first call
+    function loadBoundaries(shot, reconstruction) {
+        if (shot.boundaries) {
+            return Promise.resolve(shot);
+        }
+        const chunk = Math.floor(shot.index / reconstruction.chunkSize);
+        if (!reconstruction.chunks[chunk]) {
+            reconstruction.chunks[chunk] = d3.json(`${projectDir}/shot_boundaries/${chunk}.json`)
+                .then(paths => paths.forEach((path, i) => {
+                    reconstruction.shots[chunk * reconstruction.chunkSize + i].boundaries = {path};
+                }));
+        }
+        return reconstruction.chunks[chunk].then(() => shot);
+    }
+
+    // resolves to the shots covering each ground cell, fetched on the first click on the map
+    function loadShotLookup() {
+        if (!shotLookup) {
+            shotLookup = Promise.all([
+                d3.json(`${projectDir}/shot_lookup.json`),
+                fetch(`${projectDir}/shot_lookup.bin`).then(response => response.arrayBuffer())
+            ]).then(([header, buffer]) => {
+                const nbCells = header.width * header.height;
+                const ShotIds = header.shotIdType === 'uint16' ? Uint16Array : Uint32Array;
+                return {
+                    ...header,
+                    indptr: new Uint32Array(buffer, 0, nbCells + 1),
+                    shotIds: new ShotIds(buffer, 4 * (nbCells + 1), header.nbEntries)
+                };
+            });
+        }
+        return shotLookup;
+    }
+
+    // the image names of the shots covering the ground point, at the lookup grid resolution
+    function imageNamesAt(lookup, x, y) {
+        const b = lookup.boundaries;
+        const i = Math.floor((x - b.xMin) / (b.xMax - b.xMin) * lookup.width);
+        const j = Math.floor((b.yMax - y) / (b.yMax - b.yMin) * lookup.height);
+        if (i < 0 || i >= lookup.width || j < 0 || j >= lookup.height) {
+            return [];
+        }
+        const cell = j * lookup.width + i;
+        return Array.from(lookup.shotIds.subarray(lookup.indptr[cell], lookup.indptr[cell + 1]))
+            .map(id => lookup.imageName[id]);
+    }
+
+    function highlightCoveringShots(reconstruction) {
+        const [px, py] = d3.mouse(elMap.node());
+        const point = [scales.x.invert(px), scales.y.invert(py)];
+        loadShotLookup()
+            .then(lookup => {
+                const covering = new Set(imageNamesAt(lookup, point[0], point[1]));
+                reconstruction.shots.forEach(s => s.isCovering = covering.has(s.imageName));
+                elLookupPoint
+                    .selectAll('circle.lookup-point')
+                    .data([point])
+                    .join('circle')
+                    .classed('lookup-point', true)
+                    .attr('r', 4)
+                    .attr('cx', p => scales.x(p[0]))
+                    .attr('cy', p => scales.y(p[1]));
+                refreshShots(reconstruction);
+            })
+            // reports built before the shot lookup have nothing to highlight
+            .catch(() => null);
+    }
+
     function setupDimensions(width, height) {
         dimensions.total.width = width;
         dimensions.total.height = height;
@@ -88,7 +192,7 @@ function loadData() {
 
     function toggleShot(shot, reconstruction) {
         shot.isSelected = !shot.isSelected;
-        refreshShots(reconstruction)
+        loadBoundaries(shot, reconstruction).then(() => refreshShots(reconstruction));
     }
 
     function refreshShots(reconstruction) {
@@ -102,12 +206,13 @@ function loadData() {
             })
         elShotCoverage
             .selectAll('path.shot-coverage')
-            .data(reconstruction.shots)
+            .data(reconstruction.shots.filter(s => s.boundaries), s => s.imageName)
             .join(
                 function (enter) {
                     enter
                         .append('path')
                         .classed('shot-coverage', true)
+                        .classed('is-selected', s => s.isSelected)
                         .attr('name', s => s.imageName)
                         .attr('d', s => {
                             const p = [...s.boundaries.path];
@@ -130,22 +235,97 @@ function loadData() {
                     enter
                         .append('circle')
                         .classed('shot', true)
+                        .classed('is-covering', s => s.isCovering)
                         .attr('name', s => s.imageName)
                         .attr('r', 7)
                         .attr('cx', s => scales.x(s.translation[0]))
                         .attr('cy', s => scales.y(s.translation[1]))
                         .on('mouseover', s => {
                             showShot(s);
+                            loadBoundaries(s, reconstruction);
                         })
-                        .on('click', s => toggleShot(s, reconstruction));
+                        .on('click', s => {
+                            d3.event.stopPropagation();
+                            toggleShot(s, reconstruction);
+                        });
                 },
                 function (update) {
                     update
                         .classed('is-selected', s => s.isSelected)
+                        .classed('is-covering', s => s.isCovering)
                 }
             )
     }
 
+    function refreshOrthophoto(transform) {
+        const ob = orthophoto.boundaries;
+        if (!ob) {
+            return;
+        }
+        const tiles = orthophoto.tiles;
+        if (!tiles) {
+            // reports built before the orthophoto tiling ship one single image
+            elOrthophoto
+                .selectAll('image.orthophoto')
+                .data([`${projectDir}/odm_orthophoto.png`])
+                .join('image')
+                .classed('orthophoto', true)
+                .attr('href', d => d)
+                .attr('x', scales.x(ob.xMin))
+                .attr('y', scales.y(ob.yMax))
+                .attr('width', scales.x(ob.xMax) - scales.x(ob.xMin));
+            return;
+        }
+
+        // map size of a full resolution orthophoto pixel, and the zoom level closest to one screen pixel per tile pixel
+        const pixelWidth = (scales.x(ob.xMax) - scales.x(ob.xMin)) / tiles.width;
+        const pixelHeight = (scales.y(ob.yMin) - scales.y(ob.yMax)) / tiles.height;
+        const zoom = Math.max(0, Math.min(tiles.maxZoom,
+            tiles.maxZoom + Math.ceil(Math.log2(pixelWidth * transform.k))));
+        const tilePixels = Math.pow(2, tiles.maxZoom - zoom) * tiles.tileSize;
+        const tileWidth = tilePixels * pixelWidth;
+        const tileHeight = tilePixels * pixelHeight;
+
+        // only the tiles intersecting the visible part of the map
+        const left = scales.x(ob.xMin);
+        const top = scales.y(ob.yMax);
+        const xRange = [
+            Math.max(0, Math.floor((transform.invertX(0) - left) / tileWidth)),
+            Math.min(Math.ceil(tiles.width / tilePixels), Math.ceil((transform.invertX(dimensions.map.width) - left) / tileWidth))
+        ];
+        const yRange = [
+            Math.max(0, Math.floor((transform.invertY(0) - top) / tileHeight)),
+            Math.min(Math.ceil(tiles.height / tilePixels), Math.ceil((transform.invertY(dimensions.map.height) - top) / tileHeight))
+        ];
+        const visibleTiles = [];
+        for (let x = xRange[0]; x < xRange[1]; x++) {
+            for (let y = yRange[0]; y < yRange[1]; y++) {
+                visibleTiles.push({zoom, x, y});
+            }
+        }
+
+        elOrthophoto
+            .selectAll('image.orthophoto-tile')
+            .data(visibleTiles, t => `${t.zoom}/${t.x}/${t.y}`)
+            .join(
+                function (enter) {
+                    enter
+                        .append('image')
+                        .classed('orthophoto-tile', true)
+                        .attr('preserveAspectRatio', 'none')
+                        .attr('x', t => left + t.x * tileWidth)
+                        .attr('y', t => top + t.y * tileHeight)
+                        .attr('width', tileWidth)
+                        .attr('height', tileHeight)
+                        // fully transparent tiles are not written
+                        .on('error', function () {
+                            d3.select(this).style('visibility', 'hidden');
+                        })
+                        .attr('href', t => `${projectDir}/orthophoto_tiles/${t.zoom}/${t.x}/${t.y}.png`);
+                }
+            );
+    }
+
     function showShot(shot) {
         const el = d3.select('#selected-camera');
         el.style('display', 'inherit');
@@ -193,8 +373,9 @@ function loadData() {
         elMapContainer.insert('g')
             .attr('id', 'map');
 
-    const elOrthoImage = elMap.insert('image')
-        .attr('href', `${projectDir}/odm_orthophoto.png`);
+    const elOrthophoto = elMap
+        .insert('g')
+        .classed('orthophoto', true);
 
     const elPoints = elMap
         .insert('g')
@@ -204,6 +385,10 @@ function loadData() {
         .insert('g')
         .classed('shot-coverage', true);
 
+    const elLookupPoint = elMap
+        .insert('g')
+        .classed('lookup-point', true);
+
     const elShots = elMap
         .insert('g')
         .classed('shots', true);
@@ -225,6 +410,7 @@ function loadData() {
 
     function handleZoom() {
         elMap.attr('transform', d3.event.transform);
+        refreshOrthophoto(d3.event.transform);
         elAxes.x.call(axes.x.scale(d3.event.transform.rescaleX(scales.x)));
         elAxes.y.call(axes.y.scale(d3.event.transform.rescaleY(scales.y)));
     }